@@ -1,8 +1,27 @@
+# -*- encoding: utf-8 -*-
+# Generated by cfn.codegen from CloudFormationResourceSpecification.json, do not edit.
 from cfn.core import Resource, Attribute, Property
 
-class WaitConditionHandle(Resource): pass
 
 class WaitCondition(Resource):
+    Condition = Attribute()
+    CreationPolicy = Attribute()
+    Data = Attribute()
+    DeletionPolicy = Attribute()
     DependsOn = Attribute()
+    Metadata = Attribute()
+    UpdatePolicy = Attribute()
+    UpdateReplacePolicy = Attribute()
+
     Handle = Property()
     Timeout = Property()
+
+
+class WaitConditionHandle(Resource):
+    Condition = Attribute()
+    CreationPolicy = Attribute()
+    DeletionPolicy = Attribute()
+    DependsOn = Attribute()
+    Metadata = Attribute()
+    UpdatePolicy = Attribute()
+    UpdateReplacePolicy = Attribute()
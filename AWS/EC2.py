@@ -1,25 +1,42 @@
+# -*- encoding: utf-8 -*-
+# Generated by cfn.codegen from CloudFormationResourceSpecification.json, do not edit.
 from cfn.core import Resource, Attribute, Property
+from AWS._properties import UserData
 
-class UserData(Property):
-
-    def to_json(self):
-        return {'Fn::Base64': self.value}
 
 class Instance(Resource):
+    _shadowed_attributes = ('AvailabilityZone',)
+    Condition = Attribute()
+    CreationPolicy = Attribute()
+    DeletionPolicy = Attribute()
+    DependsOn = Attribute()
     Metadata = Attribute()
     PrivateDnsName = Attribute()
     PrivateIp = Attribute()
+    PublicDnsName = Attribute()
+    PublicIp = Attribute()
+    UpdatePolicy = Attribute()
+    UpdateReplacePolicy = Attribute()
 
     AvailabilityZone = Property()
+    IamInstanceProfile = Property()
     ImageId = Property()
     InstanceType = Property()
-    SubnetId = Property()
     KeyName = Property()
     SecurityGroupIds = Property()
-    IamInstanceProfile = Property()
+    SubnetId = Property()
     UserData = UserData()
 
+
 class Volume(Resource):
+    Condition = Attribute()
+    CreationPolicy = Attribute()
+    DeletionPolicy = Attribute()
+    DependsOn = Attribute()
+    Metadata = Attribute()
+    UpdatePolicy = Attribute()
+    UpdateReplacePolicy = Attribute()
+
     AvailabilityZone = Property()
     Iops = Property()
     Size = Property()
@@ -27,7 +44,16 @@ class Volume(Resource):
     Tags = Property()
     VolumeType = Property()
 
+
 class VolumeAttachment(Resource):
+    Condition = Attribute()
+    CreationPolicy = Attribute()
+    DeletionPolicy = Attribute()
+    DependsOn = Attribute()
+    Metadata = Attribute()
+    UpdatePolicy = Attribute()
+    UpdateReplacePolicy = Attribute()
+
     Device = Property()
     InstanceId = Property()
     VolumeId = Property()
@@ -1,17 +1,63 @@
-from cfn.core import Resource, Property, Attribute
+# -*- encoding: utf-8 -*-
+# Generated by cfn.codegen from CloudFormationResourceSpecification.json, do not edit.
+from cfn.core import Resource, Attribute, Property
 
-class User(Resource):
-    Policies = Property()
-
-class Policy(Resource):
-    PolicyName = Property()
-    PolicyDocument = Property()
 
 class AccessKey(Resource):
-    UserName = Property()
+    Condition = Attribute()
+    CreationPolicy = Attribute()
+    DeletionPolicy = Attribute()
+    DependsOn = Attribute()
+    Metadata = Attribute()
     SecretAccessKey = Attribute()
+    UpdatePolicy = Attribute()
+    UpdateReplacePolicy = Attribute()
+
+    Serial = Property()
+    Status = Property()
+    UserName = Property()
+
 
 class InstanceProfile(Resource):
+    Arn = Attribute()
+    Condition = Attribute()
+    CreationPolicy = Attribute()
+    DeletionPolicy = Attribute()
+    DependsOn = Attribute()
+    Metadata = Attribute()
+    UpdatePolicy = Attribute()
+    UpdateReplacePolicy = Attribute()
+
     Path = Property()
     Roles = Property()
 
+
+class Policy(Resource):
+    Condition = Attribute()
+    CreationPolicy = Attribute()
+    DeletionPolicy = Attribute()
+    DependsOn = Attribute()
+    Metadata = Attribute()
+    UpdatePolicy = Attribute()
+    UpdateReplacePolicy = Attribute()
+
+    Groups = Property()
+    PolicyDocument = Property()
+    PolicyName = Property()
+    Roles = Property()
+    Users = Property()
+
+
+class User(Resource):
+    Arn = Attribute()
+    Condition = Attribute()
+    CreationPolicy = Attribute()
+    DeletionPolicy = Attribute()
+    DependsOn = Attribute()
+    Metadata = Attribute()
+    UpdatePolicy = Attribute()
+    UpdateReplacePolicy = Attribute()
+
+    Groups = Property()
+    Path = Property()
+    Policies = Property()
@@ -1,8 +1,24 @@
+# -*- encoding: utf-8 -*-
+# Generated by cfn.codegen from CloudFormationResourceSpecification.json, do not edit.
 from cfn.core import Resource, Attribute, Property
 
+
 class RecordSet(Resource):
+    Condition = Attribute()
+    CreationPolicy = Attribute()
+    DeletionPolicy = Attribute()
+    DependsOn = Attribute()
+    Metadata = Attribute()
+    UpdatePolicy = Attribute()
+    UpdateReplacePolicy = Attribute()
+
+    AliasTarget = Property()
+    Comment = Property()
+    HostedZoneId = Property()
     HostedZoneName = Property()
     Name = Property()
-    Type = Property()
     ResourceRecords = Property()
+    SetIdentifier = Property()
     TTL = Property()
+    Type = Property()
+    Weight = Property()
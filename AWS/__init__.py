@@ -1,3 +1,66 @@
+"""CloudFormation resource types, one submodule per AWS service
+
+Submodules are imported on first attribute access, so ``import AWS`` stays
+cheap and ``AWS.EC2.Instance`` works without ``import AWS.EC2``.
+"""
+import imp
+import importlib
+import re
+import sys
+import types
+
 from cfn.core import Resource
 StackName = Resource('AWS::StackName')
 Region = Resource('AWS::Region')
+
+
+def resource_class(type_name):
+    """Return the class for a type like 'AWS::EC2::Instance', or None"""
+    parts = type_name.split('::')
+    if len(parts) != 3 or parts[0] != __name__:
+        return None
+    module = _import_service(sys.modules[__name__], parts[1])
+    if module is None:
+        return None
+    cls = getattr(module, parts[2], None)
+    if isinstance(cls, type) and issubclass(cls, Resource):
+        return cls
+    return None
+
+
+class _LazyModule(types.ModuleType):
+    def __getattr__(self, name):
+        # only called for attributes which are not set yet
+        if name.startswith('_'):
+            raise AttributeError(name)
+        module = _import_service(self, name)
+        if module is None:
+            raise AttributeError(name)
+        return module
+
+
+_identifier = re.compile(r'[A-Za-z_][A-Za-z0-9_]*\Z')
+
+
+def _import_service(package, name):
+    """Import the submodule name of package, or return None if there is no
+    such submodule. ImportErrors of a submodule which exists, e.g. of its
+    own imports, are raised."""
+    if not _identifier.match(name):
+        return None
+    try:
+        found, _, _ = imp.find_module(name, package.__path__)
+    except ImportError:
+        return None
+    if found is not None:
+        found.close()
+    return importlib.import_module(package.__name__ + '.' + name)
+
+
+# Python 2 has no module level __getattr__, so replace this module by an
+# instance of _LazyModule. Keep the original around, its globals would be
+# cleared when it gets garbage collected.
+_lazy_module = _LazyModule(__name__, __doc__)
+_lazy_module.__dict__.update(sys.modules[__name__].__dict__)
+_lazy_module._original_module = sys.modules[__name__]
+sys.modules[__name__] = _lazy_module
@@ -0,0 +1,13 @@
+from cfn.core import Property
+
+class UserData(Property):
+
+    def to_json(self):
+        return {'Fn::Base64': self.value}
+
+    @staticmethod
+    def from_json(value):
+        # used by cfn.loader
+        if isinstance(value, dict) and value.keys() == ['Fn::Base64']:
+            return value['Fn::Base64']
+        raise ValueError('UserData is not Fn::Base64 encoded')
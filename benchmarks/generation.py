@@ -0,0 +1,228 @@
+# -*- encoding: utf-8 -*-
+"""Benchmark building and rendering synthetic stacks of many resources
+
+    python benchmarks/generation.py [--sizes 10 1000] [--repeat 3] [--fleets] [--save] [--compare]
+
+Every run happens in a fresh interpreter, once for resolve_references and
+once for to_json, so the peak memory (maximum resident set size) of each of
+them is measured separately: ``<phase>_rss_kb`` is the peak after building
+the stack and running that phase, ``construct_rss_kb`` the peak before it.
+``--save`` writes the results to the baseline file, ``--compare`` compares
+them with it and exits with status 1 if a timing or a peak grew by more than
+the tolerance.
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+DEFAULT_SIZES = (10, 1000, 10000, 100000)
+DEFAULT_BASELINE = os.path.join(ROOT, 'benchmarks', 'baseline.json')
+PHASES = ('construct', 'name', 'resolve_references', 'to_json')
+# phases run in their own interpreter, after construct and name
+SEPARATE_PHASES = ('resolve_references', 'to_json')
+MEMORY = ('construct_rss_kb',) + tuple(phase + '_rss_kb' for phase in SEPARATE_PHASES)
+
+
+def build_resources(size):
+    """Create ``size`` resources, a quarter of each kind
+
+    Each node has an instance with facts in its metadata, a volume attached
+    to it and a DNS record pointing at it, so the stack has properties,
+    attributes, cross resource references and {Attribute|..} strings. The
+    user data of an instance refers to the address of its parent in a binary
+    tree of the instances, see _peer, so the stack has no cycles.
+    """
+    import AWS
+    from cfn.util import Facts
+
+    resources = []
+    instances = []
+    for i in range(size // 4 or 1):
+        instance = AWS.EC2.Instance('Node{0}'.format(i))
+        facts = Facts()
+        facts['node'] = i
+        facts['region'] = AWS.Region
+        facts['dns_name'] = 'node{0}.{1}.example.com.'.format(i, AWS.Region)
+        instance.Metadata = {'AWS::CloudFormation::Init': {'config': {
+            'files': {'/etc/facts.yaml': {'content': facts}}}}}
+        instance.ImageId = 'ami-12345678'
+        instance.InstanceType = 'm1.small'
+        peer = _peer(i)
+        instance.UserData = '#!/bin/bash\necho {0}\n'.format(
+            AWS.Region if peer is None else instances[peer].PrivateIp)
+        instances.append(instance)
+        volume = AWS.EC2.Volume(AvailabilityZone='eu-west-1a', Size=80)
+        attachment = AWS.EC2.VolumeAttachment(Device='/dev/xvdd',
+                                              InstanceId=instance,
+                                              VolumeId=volume)
+        record = AWS.Route53.RecordSet(
+            HostedZoneName='example.com.',
+            Name='{0}.'.format(instance.PrivateDnsName),
+            Type='A',
+            ResourceRecords=[instance.PrivateIp],
+            TTL=60)
+        resources.extend((instance, volume, attachment, record))
+    return resources[:size]
+
+
+def build_fleets(size):
+    """The resources of build_resources, created with cfn.fleet"""
+    import AWS
+    from cfn.fleet import Fleet
+    from cfn.util import Facts
+
+    count = size // 4 or 1
+    names = ['Node{0}'.format(i) for i in range(count)]
+    metadata = []
+    for i in range(count):
+        facts = Facts()
+        facts['node'] = i
+        facts['region'] = AWS.Region
+        facts['dns_name'] = 'node{0}.{1}.example.com.'.format(i, AWS.Region)
+        metadata.append({'AWS::CloudFormation::Init': {'config': {
+            'files': {'/etc/facts.yaml': {'content': facts}}}}})
+    instances = Fleet(AWS.EC2.Instance, names, columns={
+        'Metadata': metadata,
+        'UserData': ['#!/bin/bash\necho {0}\n'.format(
+            AWS.Region if _peer(i) is None else
+            '{{Attribute|{0}|PrivateIp}}'.format(names[_peer(i)]))
+            for i in range(count)],
+    }, ImageId='ami-12345678', InstanceType='m1.small')
+    volumes = Fleet(AWS.EC2.Volume, count, AvailabilityZone='eu-west-1a', Size=80)
+    attachments = Fleet(AWS.EC2.VolumeAttachment, count, columns={
+        'InstanceId': instances.resources, 'VolumeId': volumes.resources},
+        Device='/dev/xvdd')
+    private_ips = instances.attribute('PrivateIp')
+    records = Fleet(AWS.Route53.RecordSet, count, columns={
+        'Name': ['{0}.'.format(a) for a in instances.attribute('PrivateDnsName')],
+        'ResourceRecords': [[ip] for ip in private_ips],
+    }, HostedZoneName='example.com.', Type='A', TTL=60)
+    resources = []
+    for node in zip(instances, volumes, attachments, records):
+        resources.extend(node)
+    return resources[:size]
+
+
+def _peer(i):
+    """The index of the instance whose address instance i uses, None for the
+    first one"""
+    return (i - 1) // 2 if i else None
+
+
+def run(size, phase, fleets=False):
+    """Time construct, name and one of SEPARATE_PHASES for one size, in this
+    process"""
+    from cfn.core import Stack, resolve_references, to_json
+
+    result = {}
+    start = time.time()
+    resources = build_fleets(size) if fleets else build_resources(size)
+    result['construct'] = time.time() - start
+
+    start = time.time()
+    stack = Stack(*resources)
+    result['name'] = time.time() - start
+    result['construct_rss_kb'] = _max_rss_kb()
+
+    start = time.time()
+    if phase == 'resolve_references':
+        resolve_references(stack)
+    else:
+        result['bytes'] = len(to_json(stack))
+    result[phase] = time.time() - start
+    result[phase + '_rss_kb'] = _max_rss_kb()
+    return result
+
+
+def _max_rss_kb():
+    # kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def run_in_subprocess(size, repeat, fleets=False):
+    """Run every phase of one size repeat times, each in a fresh interpreter,
+    keeping the best value of every measure"""
+    best = {}
+    for phase in SEPARATE_PHASES:
+        for _ in range(repeat):
+            output = subprocess.check_output(
+                [sys.executable, os.path.abspath(__file__), '--single', str(size),
+                 '--phase', phase] + (['--fleets'] if fleets else []))
+            for key, value in json.loads(output).items():
+                best[key] = min(value, best.get(key, value))
+    return best
+
+
+def compare(results, baseline, tolerance):
+    """Return a list of regressions of results against baseline"""
+    regressions = []
+    for size, timings in sorted(results.items(), key=lambda item: int(item[0])):
+        if size not in baseline:
+            continue
+        for key in PHASES + MEMORY:
+            if key not in baseline[size]:
+                continue
+            old, new = baseline[size][key], timings[key]
+            # ignore noise in very short timings
+            if key in PHASES and new < 0.01:
+                continue
+            if new > old * (1 + tolerance):
+                regressions.append('{0} resources, {1}: {2:.4g} -> {3:.4g} (+{4:.0%})'.format(
+                    size, key, old, new, new / old - 1))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='runs per size, the best one counts (default: 3)')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save', action='store_true',
+                        help='write the results to the baseline file')
+    parser.add_argument('--compare', action='store_true',
+                        help='compare the results with the baseline file')
+    parser.add_argument('--tolerance', type=float, default=0.3,
+                        help='allowed relative growth (default: 0.3)')
+    parser.add_argument('--fleets', action='store_true',
+                        help='create the resources with cfn.fleet')
+    parser.add_argument('--single', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--phase', choices=SEPARATE_PHASES, default='to_json',
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.single:
+        print(json.dumps(run(args.single, args.phase, args.fleets)))
+        return 0
+
+    results = {}
+    print(('{:>8}' + ' {:>10}' * 7).format(
+        'size', *(PHASES[:2] + ('resolve', 'to_json', 'built MB', 'resolve MB', 'to_json MB'))))
+    for size in args.sizes:
+        result = results[str(size)] = run_in_subprocess(size, args.repeat, args.fleets)
+        print(('{:>8}' + ' {:>10.4f}' * 4 + ' {:>10.1f}' * 3).format(
+            size, *([result[phase] for phase in PHASES]
+                    + [result[key] / 1024.0 for key in MEMORY])))
+
+    status = 0
+    if args.compare:
+        with open(args.baseline) as baseline:
+            regressions = compare(results, json.load(baseline), args.tolerance)
+        for regression in regressions:
+            print('REGRESSION ' + regression)
+        status = 1 if regressions else 0
+    if args.save:
+        with open(args.baseline, 'w') as baseline:
+            json.dump(results, baseline, indent=2, sort_keys=True)
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
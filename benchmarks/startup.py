@@ -0,0 +1,51 @@
+# -*- encoding: utf-8 -*-
+"""Measure how long it takes to import the AWS resource catalog
+
+Every measurement runs in a fresh interpreter, so nothing is cached:
+
+    python benchmarks/startup.py [-n REPEAT]
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CASES = [
+    ('python', 'pass'),
+    ('import cfn.core', 'import cfn.core'),
+    ('import AWS', 'import AWS'),
+    ('AWS.EC2.Instance', 'import AWS; AWS.EC2.Instance'),
+    ('all AWS modules', 'import AWS.CloudFormation, AWS.EC2, AWS.IAM, AWS.Route53'),
+]
+
+TIMER = '''
+import time
+start = time.time()
+{statement}
+print(time.time() - start)
+'''
+
+
+def measure(statement, repeat):
+    """Return the best of repeat runs, in seconds"""
+    timings = []
+    for _ in range(repeat):
+        output = subprocess.check_output(
+            [sys.executable, '-c', TIMER.format(statement=statement)],
+            cwd=ROOT)
+        timings.append(float(output))
+    return min(timings)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-n', '--repeat', type=int, default=10)
+    args = parser.parse_args(argv)
+    for name, statement in CASES:
+        print('{0:>10.2f} ms  {1}'.format(measure(statement, args.repeat) * 1000, name))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+# -*- encoding: utf-8 -*-
+"""Generate the AWS.* resource modules from a CloudFormation resource
+specification
+
+    python -m cfn.codegen [--specification FILE] [--output-dir DIR]
+
+Every ``AWS::Service::Type`` in the specification becomes a Resource
+subclass ``Type`` in ``AWS/Service.py``, with an Attribute for each of its
+``Fn::GetAtt`` attributes and for the attributes every resource can have
+(DependsOn, Metadata...), and a Property for each of its properties.
+Attributes named like a property are only listed in ``_shadowed_attributes``,
+for checks of ``Fn::GetAtt``.
+Properties which need special treatment use the Property subclasses from
+``AWS._properties`` listed in CUSTOM_PROPERTIES.
+"""
+import argparse
+import json
+import keyword
+import os
+import re
+from collections import defaultdict
+
+from cfn.core import Resource
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_SPECIFICATION = os.path.join(
+    ROOT, 'specification', 'CloudFormationResourceSpecification.json')
+DEFAULT_OUTPUT_DIR = os.path.join(ROOT, 'AWS')
+
+# attributes which are not part of a type's specification, because every
+# resource can have them
+TEMPLATE_ATTRIBUTES = ('Condition', 'CreationPolicy', 'DeletionPolicy',
+                       'DependsOn', 'Metadata', 'UpdatePolicy',
+                       'UpdateReplacePolicy')
+
+# type -> {property name: Property subclass in AWS._properties}
+CUSTOM_PROPERTIES = {
+    'AWS::EC2::Instance': {'UserData': 'UserData'},
+}
+
+HEADER = '''\
+# -*- encoding: utf-8 -*-
+# Generated by cfn.codegen from {specification}, do not edit.
+from cfn.core import Resource, Attribute, Property
+'''
+
+_identifier = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+
+def generate(specification, custom_properties=CUSTOM_PROPERTIES,
+             specification_name='the resource specification'):
+    """Return {module name: module source} for a loaded specification"""
+    services = defaultdict(dict)
+    for type_name, resource_type in specification.get('ResourceTypes', {}).items():
+        parts = type_name.split('::')
+        if (len(parts) != 3 or parts[0] != 'AWS'
+                or not _is_member_name(parts[1])
+                or not _is_member_name(parts[2])):
+            continue
+        services[parts[1]][parts[2]] = (type_name, resource_type)
+
+    modules = {}
+    for service, resource_types in services.items():
+        custom_classes = set()
+        classes = []
+        for class_name, (type_name, resource_type) in sorted(resource_types.items()):
+            custom = custom_properties.get(type_name, {})
+            custom_classes.update(custom.values())
+            classes.append(_generate_class(class_name, resource_type, custom))
+        source = HEADER.format(specification=specification_name)
+        if custom_classes:
+            source += 'from AWS._properties import {0}\n'.format(
+                ', '.join(sorted(custom_classes)))
+        modules[service] = source + ''.join(classes)
+    return modules
+
+
+def _generate_class(class_name, resource_type, custom_properties):
+    properties = set(name for name in resource_type.get('Properties', {})
+                     if _is_member_name(name))
+    attributes = set(name for name in resource_type.get('Attributes', {})
+                     if _is_member_name(name))
+    attributes.update(TEMPLATE_ATTRIBUTES)
+    # a property and an attribute can share a name, e.g. the
+    # AvailabilityZone of an EC2 instance, but a class can only have one;
+    # the attribute is still known to Fn::GetAtt checks
+    shadowed = attributes & properties
+    attributes -= properties
+
+    lines = ['', '', 'class {0}(Resource):'.format(class_name)]
+    if shadowed:
+        lines.append('    _shadowed_attributes = {0!r}'.format(
+            tuple(str(name) for name in sorted(shadowed))))
+    lines.extend('    {0} = Attribute()'.format(name)
+                 for name in sorted(attributes))
+    if properties:
+        lines.append('')
+    lines.extend('    {0} = {1}()'.format(name, custom_properties.get(name, 'Property'))
+                 for name in sorted(properties))
+    return '\n'.join(lines) + '\n'
+
+
+def _is_member_name(name):
+    # names like 'Endpoint.Address' or the Resource API itself can not be
+    # used as class members
+    return (bool(_identifier.match(name)) and not keyword.iskeyword(name)
+            and name != 'name' and not hasattr(Resource, name))
+
+
+def write_modules(modules, output_dir):
+    for service, source in modules.items():
+        with open(os.path.join(output_dir, service + '.py'), 'w') as module:
+            module.write(source)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Generate AWS resource modules from a CloudFormation '
+                    'resource specification')
+    parser.add_argument('--specification', default=DEFAULT_SPECIFICATION)
+    parser.add_argument('--output-dir', default=DEFAULT_OUTPUT_DIR)
+    args = parser.parse_args(argv)
+    with open(args.specification) as specification:
+        modules = generate(json.load(specification),
+                           specification_name=os.path.basename(args.specification))
+    write_modules(modules, args.output_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -2,23 +2,205 @@
 import json
 import re
 import logging
-from functools import wraps
-from inspect import getmembers
+import threading
+from collections import OrderedDict
+from operator import itemgetter
+
+from cfn import tracing, validation
+from cfn.graph import DependencyGraph
+from cfn.parameters import ParameterChecker
+from cfn.tracing import traced as _log_call
+from cfn.util import Facts, Parameter, Ref, GetAtt, _Reference
+
+def to_json(o, compact=False):
+    return ''.join(iter_json(o, compact))
+
+
+def dump_json(o, fp, compact=False):
+    """Write the template for ``o`` to the file-like object ``fp``."""
+    for chunk in iter_json(o, compact):
+        fp.write(chunk)
+
+
+def iter_json(o, compact=False):
+    """Yield the template for ``o`` as chunks of JSON text.
+
+    The output is the same as ``json.dumps(resolve_references(o), indent=2,
+    sort_keys=True)``, but references are resolved while the tree is walked,
+    so no resolved copy of the whole template is ever built. With compact,
+    the output has no whitespace, like ``separators=(',', ':')``.
+    """
+    return _iter_json(o, None if compact else 0, True)
+
+
+def _layout(level):
+    """Return the opening, item separator, closing and key separator for a
+    list or dict at an indentation level, and the level of its items.
+
+    Level None means compact output.
+    """
+    if level is None:
+        return '', ',', '', ':', None
+    layout = _layouts.get(level)
+    if layout is None:
+        newline_indent = '\n' + ' ' * (2 * (level + 1))
+        layout = _layouts[level] = (newline_indent, ', ' + newline_indent,
+                                    '\n' + ' ' * (2 * level), ': ', level + 1)
+    return layout
+
+
+_layouts = {}
+
+
+def _iter_json(o, level, resolve, refs=None):
+    # refs collects (object, reference) pairs for every object replaced by
+    # its reference, see _iter_cached_json
+    if resolve:
+        if hasattr(o, 'ref'):
+            ref = o.ref()
+            if refs is not None:
+                refs.append((o, ref))
+            o, resolve = ref, False
+        elif type(o) is _ResourceTemplate and (o.cache or o.fragments is not None):
+            for chunk in _iter_cached_json(o.resource, level, o.cache, o.fragments):
+                yield chunk
+            return
+        elif type(o) is Facts:
+            yield _facts_json(o, level)
+            return
+        elif hasattr(o, 'to_json'):
+            for chunk in _iter_json(_unresolved_json(o), level, True, refs):
+                yield chunk
+            return
+        elif isinstance(o, basestring):
+            o, resolve = resolve_references_in_string(o), False
 
-from cfn.util import Parameter
-
-def to_json(o):
-    resolved = resolve_references(o)
-    return json.dumps(resolved, indent=2, sort_keys=True)
-
-
-def _log_call(func):
-    @wraps(func)
-    def log(*args, **kwargs):
-        logging.debug('calling %s with %s', func.__name__, (args, kwargs))
-        return func(*args, **kwargs)
-
-    return log
+    if isinstance(o, basestring):
+        yield _encode_string(o)
+    elif isinstance(o, (list, tuple)):
+        if not o:
+            yield '[]'
+            return
+        opening, separator, closing, _, item_level = _layout(level)
+        yield '[' + opening
+        first = True
+        for value in o:
+            if not first:
+                yield separator
+            first = False
+            for chunk in _iter_json(value, item_level, resolve, refs):
+                yield chunk
+        yield closing + ']'
+    elif isinstance(o, dict):
+        if not o:
+            yield '{}'
+            return
+        opening, separator, closing, key_separator, item_level = _layout(level)
+        if isinstance(o, _Reference):
+            yield _reference_json(o, opening, closing, key_separator, item_level)
+            return
+        yield '{' + opening
+        first = True
+        for key, value in sorted(o.items(), key=itemgetter(0)):
+            if not first:
+                yield separator
+            first = False
+            yield _encode_key(key) + key_separator
+            for chunk in _iter_json(value, item_level, resolve, refs):
+                yield chunk
+        yield closing + '}'
+    else:
+        yield json.dumps(o)
+
+
+def _iter_cached_json(resource, level, in_memory=True, fragments=None):
+    """Serialize a resource, reusing its last output if it is still valid.
+
+    The output is cached on the resource together with the references it
+    contains. It is reused as long as the resource was not modified through
+    __setattr__ and all referenced objects still produce the same reference,
+    e.g. were not renamed. Without a cached output on the resource, the
+    output is looked up in fragments, a cfn.fragments.FragmentCache.
+    """
+    cached = resource.__dict__.get('_cached_json')
+    if in_memory and cached is not None and cached[0] == level:
+        for o, ref in cached[2]:
+            current = o.ref()
+            # references are canonical, so they are usually the same object
+            if current is not ref and current != ref:
+                break
+        else:
+            yield cached[1]
+            return
+    if fragments is not None:
+        key = fragments.key(resource, level)
+        text = fragments.get(key)
+        if text is not None:
+            yield text
+            return
+    refs = []
+    text = ''.join(_iter_json(_unresolved_json(resource), level, True, refs))
+    if in_memory:
+        # bypass __setattr__, which would drop the cache again
+        resource.__dict__['_cached_json'] = (level, text, refs)
+    if fragments is not None:
+        fragments.put(key, text)
+    yield text
+
+
+def _facts_json(facts, level):
+    """Serialize Facts, reusing the output as long as they render the same"""
+    rendered = facts._render()
+    cached = facts.__dict__.get('_cached_json')
+    if cached is not None and cached[0] is rendered and cached[1] == level:
+        return cached[2]
+    # the template of Facts has its references resolved already
+    text = ''.join(_iter_json(facts._template(), level, False))
+    if rendered is facts._rendered:
+        facts.__dict__['_cached_json'] = (rendered, level, text)
+    return text
+
+
+def _reference_json(reference, opening, closing, key_separator, item_level):
+    # the names were encoded once, when the reference was created
+    if type(reference) is Ref:
+        value = reference._encoded[0]
+        key = '"Ref"'
+    else:
+        list_opening, list_separator, list_closing, _, _ = _layout(item_level)
+        value = '[' + list_opening + list_separator.join(reference._encoded) + list_closing + ']'
+        key = '"Fn::GetAtt"'
+    return '{' + opening + key + key_separator + value + closing + '}'
+
+
+_encode_string = json.encoder.encode_basestring_ascii
+
+
+def _encode_key(key):
+    if isinstance(key, basestring):
+        return _encode_string(key)
+    # same coercion json.dumps applies to non-string keys
+    return _encode_string(json.dumps(key))
+
+
+# to_json implementations which only resolve references in a template built by
+# a _template method. Resolving references twice gives the same result as
+# resolving them once, so the serializer can skip the inner resolution and
+# walk the template directly.
+_templates = {}
+
+
+def _unresolved_json(o):
+    to_json = type(o).to_json
+    to_json = getattr(to_json, '__func__', to_json)
+    template = _templates.get(getattr(to_json, '__wrapped__', to_json))
+    if template is None:
+        return o.to_json()
+    return template(o)
+
+
+def _register_template(cls):
+    _templates[cls.__dict__['to_json']] = cls.__dict__['_template']
 
 
 @_log_call
@@ -26,7 +208,7 @@ def resolve_references(o):
     if hasattr(o, 'ref'):
         return o.ref()
     if hasattr(o, 'to_json'):
-        return resolve_references(o.to_json())
+        return resolve_references(_unresolved_json(o))
     if isinstance(o, (list, tuple)):
         return [resolve_references(i) for i in o]
     if isinstance(o, dict):
@@ -41,47 +223,99 @@ _reference_regex = re.compile(r'''
         (
             (?:
                 # ex.: {Attribute|ResourceName|AttrName}
-                Attribute \| [^|]+ \| [^|]+
+                Attribute \| [^|}]+ \| [^|}]+
             )
             |
             (?:
                 # ex.: {Resource|ResourceName}}
-                Resource \| [^|]+
+                Resource \| [^|}]+
             )
             |
             (?:
                 # ex.: {Parameter|param1}}
-                Parameter \| [^|]+
+                Parameter \| [^|}]+
             )
         )
     }
     |
-    ( [^{]+ ) # not a reference
+    ( [^{]+ | { ) # not a reference, e.g. ${HOME} in a shell script
     ''', re.VERBOSE)
 
 
 def resolve_references_in_string(a_string):
-    matches = _reference_regex.findall(a_string)
-    result = []
-    for reference, literal in matches:
+    if '{' not in a_string:
+        # no references, the string resolves to itself
+        return a_string
+    tokens = _tokenize(a_string)
+    if not tokens:
+        return a_string
+    if len(tokens) == 1:
+        return tokens[0]
+    return cfn_join(list(tokens))
+
+
+_TOKEN_CACHE_SIZE = 4096
+_token_cache = OrderedDict()
+# stacks are rendered and loaded in several threads at once, see cfn.pipeline
+_token_lock = threading.Lock()
+
+
+def _tokenize(a_string):
+    """Split a string into literals and Ref and GetAtt references.
+
+    Results are cached in a bounded LRU cache, which is shared by all
+    threads. They are immutable, only the lists returned by
+    resolve_references_in_string are built fresh from them on every call.
+    """
+    with _token_lock:
+        tokens = _token_cache.pop(a_string, None)
+        if tokens is not None:
+            _token_cache[a_string] = tokens
+            return tokens
+    # split outside the lock, another thread may cache the same string
+    tokens = tuple(_split_references(a_string))
+    with _token_lock:
+        _token_cache.pop(a_string, None)
+        while len(_token_cache) >= _TOKEN_CACHE_SIZE:
+            _token_cache.popitem(last=False)
+        _token_cache[a_string] = tokens
+    return tokens
+
+
+def _split_references(a_string):
+    """Split a string into literals and Ref and GetAtt references, without
+    the cache of _tokenize"""
+    tokens = []
+    for reference, literal in _reference_regex.findall(a_string):
         if literal:
-            result.append(literal)
+            if tokens and isinstance(tokens[-1], basestring):
+                # a brace which does not start a reference
+                tokens[-1] += literal
+            else:
+                tokens.append(literal)
         if reference:
             parts = reference.split('|')
             if parts[0] in ('Resource', 'Parameter'):
-                result.append({'Ref': parts[1]})
+                tokens.append(Ref(parts[1]))
             else:
-                result.append({"Fn::GetAtt": [parts[1], parts[2]]})
-    if len(result) == 1:
-        return result[0]
-    elif len(result) > 1:
-        return cfn_join(result)
-    return a_string
+                tokens.append(GetAtt(parts[1], parts[2]))
+    return tokens
 
 
 class ResourceCollection(object):
+    # Keep the serialized output of every resource and only serialize
+    # resources again when they were changed. Values which are modified in
+    # place (e.g. a list property which is appended to) are not noticed, call
+    # invalidate() on their resource after doing so.
+    cache_resources_json = False
+    # a cfn.fragments.FragmentCache to share serialized resources between
+    # stacks and runs, found by the structure of the resources. Like above,
+    # call invalidate() on resources whose values were modified in place.
+    fragment_cache = None
+
     def __init__(self, *resources, **kwargs):
         self.resources = {}
+        self._name_counters = {}
         resources = [r for r in resources if isinstance(r, Resource)]
         for name, resource in kwargs.items():
             if not isinstance(resource, Resource):
@@ -90,13 +324,41 @@ class ResourceCollection(object):
                 resource.name = name
             resources.append(resource)
         for r in resources:
-            if not r.name:
-                for i in [''] + range(1, 1000):
-                    simple_type_name = re.split('::', r.type())[-1]
-                    r.name = simple_type_name + str(i)
-                    if r.name not in self.resources:
-                        break
-            self.resources[r.name] = r
+            self.add(r)
+
+    def add(self, resource):
+        """Add a resource, naming it after its type if it has no name yet.
+
+        Unnamed resources get the first free name of the form ``Instance``,
+        ``Instance1``, ``Instance2``... The next number to try is remembered
+        per type, so naming is constant time per resource.
+        """
+        if not resource.name:
+            simple_type_name = resource.type().rsplit('::', 1)[-1]
+            i = self._name_counters.get(simple_type_name, 0)
+            name = simple_type_name + (str(i) if i else '')
+            while name in self.resources:
+                i += 1
+                name = simple_type_name + str(i)
+            self._name_counters[simple_type_name] = i + 1
+            # nothing can refer to an unnamed resource yet, so there are no
+            # cached references to invalidate, see _renamed
+            resource.__dict__['name'] = name
+        self.resources[resource.name] = resource
+        return resource
+
+    def dependency_graph(self):
+        """Return the DependencyGraph of this collection's resources.
+
+        The graph is kept between calls and brought up to date with the
+        resources' cached dependencies, so only changed resources are
+        looked at again.
+        """
+        graph = self.__dict__.get('_dependency_graph')
+        if graph is None:
+            graph = self._dependency_graph = DependencyGraph(self)
+        graph.update()
+        return graph
 
     @_log_call
     def to_json(self):
@@ -105,6 +367,28 @@ class ResourceCollection(object):
             result.update({'Resources': dict((k, v.to_json()) for k, v in self.resources.items())})
         return result
 
+    def _template(self):
+        result = {}
+        if self.resources:
+            cache = self.cache_resources_json
+            fragments = self.fragment_cache
+            result.update({'Resources': dict((k, _ResourceTemplate(v, cache, fragments))
+                                             for k, v in self.resources.items())})
+        return result
+
+
+class _ResourceTemplate(object):
+    """Stands in for a resource's template until the serializer reaches it"""
+    __slots__ = ('resource', 'cache', 'fragments')
+
+    def __init__(self, resource, cache=False, fragments=None):
+        self.resource = resource
+        self.cache = cache
+        self.fragments = fragments
+
+    def to_json(self):
+        return _unresolved_json(self.resource)
+
 
 class Stack(ResourceCollection):
     def __init__(self, *resources_and_parameters, **kwargs):
@@ -112,6 +396,9 @@ class Stack(ResourceCollection):
         self.Description = ''
         self.Outputs = {}
         self.Parameters = {}
+        self.Mappings = {}
+        self.Conditions = {}
+        self.Metadata = {}
 
         for name, parameter in kwargs.items() + [(p.name, p) for p in resources_and_parameters if isinstance(p, Parameter)]:
             if not isinstance(parameter, Parameter):
@@ -133,6 +420,47 @@ class Stack(ResourceCollection):
         if self.Outputs:
             outputs = resolve_references(self.Outputs)
             rc.update({'Outputs': outputs})
+        for section in ('Mappings', 'Conditions', 'Metadata'):
+            value = getattr(self, section)
+            if value:
+                rc[section] = resolve_references(value)
+        return rc
+
+    def validate(self):
+        """Check all references of the stack in one pass.
+
+        Raises cfn.validation.ValidationError listing every reference to a
+        missing resource, parameter or attribute, with its path.
+        """
+        validation.validate(self)
+
+    def bind(self, parameter_values):
+        """Check values for the stack's parameters and return the values of
+        all parameters, with defaults for missing ones.
+
+        Raises cfn.validation.ValidationError listing every value which
+        violates the constraints of its parameter, see cfn.parameters.
+        """
+        return ParameterChecker(self.Parameters).bind(parameter_values)
+
+    def bind_all(self, parameter_value_sets):
+        """bind() a list or dict of sets of values, compiling the constraints
+        of the parameters once"""
+        return ParameterChecker(self.Parameters).bind_all(parameter_value_sets)
+
+    def _template(self):
+        rc = ResourceCollection._template(self)
+        rc.update({'AWSTemplateFormatVersion': self.AWSTemplateFormatVersion})
+        if self.Description:
+            rc.update({'Description': self.Description})
+        if self.Parameters:
+            rc.update({'Parameters': dict((k, dict(v)) for k, v in self.Parameters.items())})
+        if self.Outputs:
+            rc.update({'Outputs': self.Outputs})
+        for section in ('Mappings', 'Conditions', 'Metadata'):
+            value = getattr(self, section)
+            if value:
+                rc[section] = value
         return rc
 
 
@@ -141,9 +469,31 @@ def cfn_join(sequence, glue=''):
 
 
 class Property(object):
+    # Properties declared on a Resource class are copied to an instance the
+    # first time they are accessed on it, see __get__. Instances which only
+    # set a few of their properties only pay for those.
+    __slots__ = ('resource', 'value', 'name')
+
     def __init__(self, resource=None, value=None):
         self.resource = resource
         self.value = value
+        self.name = None
+
+    def __get__(self, resource, resource_class):
+        if resource is None:
+            return self
+        if '_row' in resource.__dict__:
+            # a member of a cfn.fleet.Fleet, its values are still in columns
+            resource._materialize()
+            return getattr(resource, self.name)
+        if self.name is None:
+            # added to the class after its plan was made
+            type(resource)._plan()
+        # properties with a default were copied in Resource.__init__
+        prop = self.__class__(resource=resource)
+        prop.name = self.name
+        resource.__dict__[self.name] = prop
+        return prop
 
     @_log_call
     def to_json(self):
@@ -154,15 +504,33 @@ class Property(object):
 
         return resolve_references(result)
 
+    def _template(self):
+        return self.value
+
 
 class Attribute(object):
+    # copied to instances on first access, like Property
+    __slots__ = ('resource', 'name', 'value')
+
     def __init__(self, resource=None, name=None, value=None):
         self.resource = resource
         self.name = name
         self.value = value
 
+    def __get__(self, resource, resource_class):
+        if resource is None:
+            return self
+        if '_row' in resource.__dict__:
+            resource._materialize()
+            return getattr(resource, self.name)
+        if self.name is None:
+            type(resource)._plan()
+        attribute = self.__class__(resource=resource, name=self.name)
+        resource.__dict__[self.name] = attribute
+        return attribute
+
     def ref(self):
-        return {'Fn::GetAtt': [self.resource.name, self.name]}
+        return GetAtt(self.resource.name, self.name)
 
     def to_json(self):
             return self.value
@@ -192,6 +560,40 @@ def isattribute(o):
     return isinstance(o, Attribute)
 
 
+class _ResourcePlan(object):
+    """The attributes and properties declared on a Resource class.
+
+    Computed once per class, so that creating and serializing instances does
+    not need to inspect the class again.
+    """
+    __slots__ = ('attributes', 'properties', 'attribute_names',
+                 'property_names', 'names', 'get_att_names', 'eager_attributes',
+                 'defaults')
+
+    def __init__(self, cls):
+        # walk through the class' attributes and properties the way
+        # inspect.getmembers does: sorted by name, including inherited ones
+        members = [(name, getattr(cls, name)) for name in dir(cls)]
+        self.attributes = tuple((name, value) for name, value in members
+                                if isattribute(value))
+        self.properties = tuple((name, value) for name, value in members
+                                if isproperty(value))
+        self.attribute_names = tuple(name for name, _ in self.attributes)
+        self.property_names = tuple(name for name, _ in self.properties)
+        self.names = frozenset(self.attribute_names + self.property_names)
+        # attributes which can be referred to with Fn::GetAtt, also those
+        # named like a property (see cfn.codegen)
+        self.get_att_names = frozenset(self.attribute_names).union(
+            getattr(cls, '_shadowed_attributes', ()))
+        # members not in these two are created lazily by their __get__
+        self.eager_attributes = tuple((name, value) for name, value in self.attributes
+                                      if type(value) is not Attribute)
+        self.defaults = tuple((name, value) for name, value in self.properties
+                              if value.value is not None)
+        for name, value in self.attributes + self.properties:
+            value.name = name
+
+
 class _ResourceMetaClass(type):
     @_log_call
     def __setattr__(cls, name, value):
@@ -199,50 +601,104 @@ class _ResourceMetaClass(type):
             logging.debug('Setting default property {2} of class {0} to {1}', cls,
                           name, value)
             getattr(cls, name).value = value
+            cls._invalidate_plan()
         else:
+            if name in ('__module__', '__name__') and '_resource_type' in cls.__dict__:
+                type.__delattr__(cls, '_resource_type')
+            if (isproperty(value) or isattribute(value)
+                    or isattribute(getattr(cls, name, None))):
+                cls._invalidate_plan()
             type.__setattr__(cls, name, value)
 
+    def _plan(cls):
+        plan = cls.__dict__.get('_resource_plan')
+        if plan is None:
+            plan = _ResourcePlan(cls)
+            type.__setattr__(cls, '_resource_plan', plan)
+        return plan
+
+    def _type(cls):
+        # computed once per class and interned, every resource of a class
+        # shares the string
+        name = cls.__dict__.get('_resource_type')
+        if name is None:
+            parts = cls.__module__.split('.') if cls.__module__ else []
+            parts.append(cls.__name__)
+            name = '::'.join(parts)
+            if isinstance(name, str):
+                name = intern(name)
+            type.__setattr__(cls, '_resource_type', name)
+        return name
+
+    def _invalidate_plan(cls):
+        if '_resource_plan' in cls.__dict__:
+            type.__delattr__(cls, '_resource_plan')
+        for subclass in type.__subclasses__(cls):
+            subclass._invalidate_plan()
+
+
+# counts renames of resources, which make all cached dependencies stale
+_renames = [0]
+
+
+def _renamed():
+    _renames[0] += 1
+
+
+def _collect_references(o, names):
+    """Add the names referenced by Ref and Fn::GetAtt in a resolved template"""
+    if isinstance(o, dict):
+        ref = o.get('Ref')
+        if isinstance(ref, basestring):
+            names.add(ref)
+        get_att = o.get('Fn::GetAtt')
+        if isinstance(get_att, list) and get_att and isinstance(get_att[0], basestring):
+            names.add(get_att[0])
+        for value in o.values():
+            _collect_references(value, names)
+    elif isinstance(o, list):
+        for value in o:
+            _collect_references(value, names)
+
 
 class Resource(object):
     __metaclass__ = _ResourceMetaClass
     _initialized = False
 
     def __init__(self, name=None, **properties_and_attributes):
-        self.name = name
-        self._attribute_names = []
-        self._property_names = []
-
-        # walk through our class' attributes
-        for name, value in getmembers(self, isattribute):
-            # add the attribute name to the list
-            self._attribute_names.append(name)
-            # copy the attribute from class to instance, setting the resource
-            # to self. Copy is done by instantiating the attributes __class__
-            setattr(self, name, value.__class__(resource=self, name=name))
-
-        # walk through our class' properties
-        for name, value in getmembers(self, isproperty):
-            # add the attribute name to the list
-            self._property_names.append(name)
-            # copy the property from class to instance, setting the resource
-            # to self. Copy is done by instantiating the propertys __class__
-            setattr(self, name, value.__class__(resource=self,
-                                                value=value.value))
+        plan = type(self)._plan()
+        # nothing is initialized yet, so bypass __setattr__
+        instance_dict = self.__dict__
+        instance_dict['name'] = name
+        instance_dict['_attribute_names'] = plan.attribute_names
+        instance_dict['_property_names'] = plan.property_names
+
+        # copy custom attributes from class to instance, setting the resource
+        # to self. Copy is done by instantiating the attributes __class__.
+        # Plain attributes are copied on first access.
+        for name, value in plan.eager_attributes:
+            instance_dict[name] = value.__class__(resource=self, name=name)
+
+        # copy properties with default values from class to instance. The
+        # others are copied on first access.
+        for name, value in plan.defaults:
+            prop = instance_dict[name] = value.__class__(resource=self,
+                                                         value=value.value)
+            prop.name = name
 
         # put values from arguments into properties and attributes
         for k, v in properties_and_attributes.items():
-            if k in self._attribute_names or k in self._property_names:
+            if k in plan.names:
                 getattr(self, k).value = v
             else:
                 raise AttributeError(k)
-        self._initialized = True
+        instance_dict['_initialized'] = True
 
     def type(self):
-        parts = []
-        if self.__module__:
-            parts.extend(self.__module__.split('.'))
-        parts.append(self.__class__.__name__)
-        return '::'.join(parts)
+        name = self.__class__.__dict__.get('_resource_type')
+        if name is None:
+            name = self.__class__._type()
+        return name
 
     @_log_call
     def to_json(self):
@@ -250,25 +706,68 @@ class Resource(object):
 
     @_log_call
     def to_json(self):
-        properties = dict((k, getattr(self, k)) for k in self._property_names)
-        properties = dict((k, v) for (k, v) in properties.items() if v.value)
+        return resolve_references(self._template())
+
+    def _template(self):
+        instance_dict = self.__dict__
+        result = {'Type': self.type()}
+        for k in self._attribute_names:
+            attribute = instance_dict.get(k)
+            # remove empty attributes
+            if attribute is None:
+                continue
+            value = attribute.to_json()
+            if value is not None:
+                result[k] = value
 
-        attributes = dict((k, getattr(self, k)) for k in self._attribute_names)
-        attributes = dict((k, v.to_json()) for (k, v) in attributes.items())
-        # remove empty attributes
-        attributes = dict((k, v) for (k, v) in attributes.items() if v is not None)
+        properties = {}
+        for k in self._property_names:
+            prop = instance_dict.get(k)
+            if prop is not None and prop.value:
+                properties[k] = prop
 
-        result = dict(Type=self.type(), **attributes)
         if properties:
             result.update(Properties=properties)
-        return resolve_references(result)
+        return result
 
     @_log_call
     def __setattr__(self, name, value):
         if not self._initialized or name == 'name':
+            if name == 'name' and self._initialized:
+                _renamed()
             return object.__setattr__(self, name, value)
         else:
             getattr(self, name).value = value
+            self.invalidate()
+
+    def invalidate(self):
+        """Drop the cached JSON, dependencies and structural hash of this
+        resource, see ResourceCollection and dependencies()"""
+        self.__dict__.pop('_cached_json', None)
+        self.__dict__.pop('_dependencies', None)
+        self.__dict__.pop('_structural_hash', None)
+
+    def dependencies(self):
+        """Names of the resources and parameters this resource refers to
+
+        Includes references in properties, attributes, strings and DependsOn.
+        The result is cached until the resource is modified through
+        __setattr__ or any resource is renamed.
+        """
+        cached = self.__dict__.get('_dependencies')
+        if cached is not None and cached[0] == _renames[0]:
+            return cached[1]
+        names = set()
+        template = self.to_json()
+        _collect_references(template, names)
+        depends_on = template.get('DependsOn')
+        if isinstance(depends_on, basestring):
+            names.add(depends_on)
+        elif isinstance(depends_on, list):
+            names.update(n for n in depends_on if isinstance(n, basestring))
+        dependencies = tuple(sorted(names))
+        self.__dict__['_dependencies'] = (_renames[0], dependencies)
+        return dependencies
 
     def __format__(self, format_string):
         if not self.name:
@@ -277,7 +776,18 @@ class Resource(object):
         return '{{Resource|{0}}}'.format(self.name)
 
     def ref(self):
+        # kept on the resource, which is cheaper than looking it up again
+        ref = self.__dict__.get('_ref')
+        if ref is not None and ref['Ref'] == self.name:
+            return ref
         if not self.name:
             raise AttributeError(
                 'Referenced resource of type {0} does not have a name'.format(self.type()))
-        return {'Ref': self.name}
+        ref = self.__dict__['_ref'] = Ref(self.name)
+        return ref
+
+
+for _cls in (ResourceCollection, Stack, Property, Resource, Facts):
+    _register_template(_cls)
+
+tracing.enable_from_environment()
@@ -0,0 +1,158 @@
+# -*- encoding: utf-8 -*-
+"""Compare templates per resource and per property
+
+    changes = diff('previous.json', stack)
+    print(changes.format())
+
+Both sides can be a stack, a template dict or the path of a JSON template.
+Resources are compared by name. Between two stacks, resources with equal
+structural hashes (see cfn.fragments) are skipped without rendering them;
+otherwise resources are rendered and compared as a whole first, and only
+the ones which differ are walked to find the changed properties.
+
+    python -m cfn.diff previous.json stacks/web.py:stack
+"""
+import argparse
+import json
+import sys
+from collections import namedtuple
+
+from cfn.core import Resource, _unresolved_json, resolve_references
+from cfn.fragments import structural_hash
+from cfn.validation import _format_path
+
+ADDED = 'added'
+REMOVED = 'removed'
+MODIFIED = 'modified'
+
+# old is None for added, new is None for removed paths
+Change = namedtuple('Change', 'kind path old new')
+
+_symbols = {ADDED: '+', REMOVED: '-', MODIFIED: '~'}
+
+
+class TemplateDiff(object):
+    """Added and removed resource names, the changes of modified resources
+    by name, and the changes of all other sections"""
+
+    def __init__(self, added, removed, modified, changes):
+        self.added = added
+        self.removed = removed
+        self.modified = modified
+        self.changes = changes
+
+    def __nonzero__(self):
+        return bool(self.added or self.removed or self.modified or self.changes)
+
+    def format(self):
+        lines = []
+        for kind, names in ((REMOVED, self.removed), (ADDED, self.added)):
+            lines.extend('{0} Resources.{1}'.format(_symbols[kind], name) for name in names)
+        for name in sorted(self.modified):
+            lines.extend(_format_change(change) for change in self.modified[name])
+        lines.extend(_format_change(change) for change in self.changes)
+        return '\n'.join(lines)
+
+
+def diff(old, new):
+    """Return the TemplateDiff from old to new"""
+    old, new = _Template(old), _Template(new)
+    added = sorted(set(new.resources) - set(old.resources))
+    removed = sorted(set(old.resources) - set(new.resources))
+    modified = {}
+    for name in sorted(set(old.resources) & set(new.resources)):
+        old_resource, new_resource = old.resources[name], new.resources[name]
+        if (isinstance(old_resource, Resource) and isinstance(new_resource, Resource)
+                and structural_hash(old_resource) == structural_hash(new_resource)):
+            continue
+        old_template, new_template = old.resource(name), new.resource(name)
+        if old_template != new_template:
+            changes = []
+            _compare(old_template, new_template, ['Resources', name], changes)
+            modified[name] = changes
+
+    changes = []
+    _compare(old.sections, new.sections, [], changes)
+    return TemplateDiff(added, removed, modified, changes)
+
+
+class _Template(object):
+    """The resources of one side, rendered on demand, and its other
+    sections"""
+
+    def __init__(self, source):
+        if isinstance(source, basestring):
+            with open(source) as template:
+                source = json.load(template)
+        if hasattr(source, 'resources'):
+            self.resources = source.resources
+            sections = _unresolved_json(source)
+            sections.pop('Resources', None)
+            self.sections = resolve_references(sections)
+        else:
+            self.resources = source.get('Resources', {})
+            self.sections = dict((k, v) for k, v in source.items() if k != 'Resources')
+
+    def resource(self, name):
+        resource = self.resources[name]
+        if isinstance(resource, Resource):
+            return resource.to_json()
+        return resource
+
+
+def _compare(old, new, path, changes):
+    if old == new:
+        return
+    if isinstance(old, dict) and isinstance(new, dict):
+        for key in sorted(set(old) | set(new)):
+            path.append(key)
+            if key not in old:
+                changes.append(Change(ADDED, _format_path(path), None, new[key]))
+            elif key not in new:
+                changes.append(Change(REMOVED, _format_path(path), old[key], None))
+            else:
+                _compare(old[key], new[key], path, changes)
+            path.pop()
+    elif isinstance(old, list) and isinstance(new, list) and len(old) == len(new):
+        for i, (old_value, new_value) in enumerate(zip(old, new)):
+            path.append(i)
+            _compare(old_value, new_value, path, changes)
+            path.pop()
+    else:
+        changes.append(Change(MODIFIED, _format_path(path), old, new))
+
+
+def _format_change(change):
+    values = []
+    if change.kind != ADDED:
+        values.append(_format_value(change.old))
+    if change.kind != REMOVED:
+        values.append(_format_value(change.new))
+    return '{0} {1}: {2}'.format(_symbols[change.kind], change.path, ' -> '.join(values))
+
+
+def _format_value(value):
+    return json.dumps(value, sort_keys=True, separators=(',', ':'))
+
+
+def _load(argument):
+    if argument.endswith('.json'):
+        return argument
+    from cfn.render import load_stack
+    return load_stack(argument)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Show the differences between two templates')
+    parser.add_argument('old', help='template.json or a stack factory, see cfn.render')
+    parser.add_argument('new', help='template.json or a stack factory, see cfn.render')
+    args = parser.parse_args(argv)
+    changes = diff(_load(args.old), _load(args.new))
+    if changes:
+        sys.stdout.write(changes.format() + '\n')
+    return 1 if changes else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
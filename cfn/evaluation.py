@@ -0,0 +1,173 @@
+# -*- encoding: utf-8 -*-
+"""Evaluate the intrinsic functions of a template offline
+
+    template = evaluate(stack, {'Environment': 'prod'},
+                        attributes={'Node': {'PrivateIp': '10.0.0.1'}})
+    print template['Resources']['Node']['Properties']['UserData']
+
+Ref, Fn::GetAtt, Fn::Join, Fn::Base64 and the pseudo parameters are
+replaced by the values they would have in a stack created with the given
+parameter values. Parameter values are checked and completed with their
+defaults like by Stack.bind(). Refs to resources give their physical ids, by
+default their logical names, and attributes have to be given. Other
+functions raise EvaluationError.
+"""
+import base64
+
+from cfn.parameters import ParameterChecker
+from cfn.validation import _format_path
+
+PSEUDO_PARAMETERS = {
+    'AWS::AccountId': '123456789012',
+    'AWS::NotificationARNs': [],
+    'AWS::Partition': 'aws',
+    'AWS::Region': 'us-east-1',
+    'AWS::StackId': 'arn:aws:cloudformation:us-east-1:123456789012:stack/stack/'
+                    '00000000-0000-0000-0000-000000000000',
+    'AWS::StackName': 'stack',
+    'AWS::URLSuffix': 'amazonaws.com',
+}
+NO_VALUE = 'AWS::NoValue'
+LIST_PARAMETER_TYPES = ('CommaDelimitedList', 'List<')
+
+
+class EvaluationError(ValueError):
+    def __init__(self, path, message):
+        ValueError.__init__(self, '{0}: {1}'.format(path, message))
+        self.path = path
+
+
+def evaluate(stack, parameter_values=None, attributes=None, physical_ids=None,
+             pseudo_parameters=None):
+    """Return the template of stack, a Stack or a template dict, with the
+    intrinsic functions in its resources and outputs evaluated.
+
+    attributes maps resource names to their attribute values by name,
+    physical_ids maps resource names to the values of Refs to them, and
+    pseudo_parameters overrides PSEUDO_PARAMETERS.
+    """
+    evaluator = Evaluator(stack, parameter_values, attributes, physical_ids,
+                          pseudo_parameters)
+    result = dict(evaluator.template)
+    for section in ('Resources', 'Outputs'):
+        if section in result:
+            result[section] = evaluator.value(result[section], [section])
+    return result
+
+
+class Evaluator(object):
+    """Evaluates expressions of one template"""
+
+    def __init__(self, stack, parameter_values=None, attributes=None, physical_ids=None,
+                 pseudo_parameters=None):
+        template = stack.to_json() if hasattr(stack, 'to_json') else stack
+        self.template = template
+        parameters = template.get('Parameters', {})
+        values = ParameterChecker(parameters).bind(parameter_values or {})
+        for name, value in values.items():
+            type_name = parameters[name].get('Type', 'String')
+            if type_name.startswith(LIST_PARAMETER_TYPES) and isinstance(value, basestring):
+                values[name] = [item.strip() for item in value.split(',')]
+        self.parameters = values
+        self.resources = template.get('Resources', {})
+        self.attributes = {} if attributes is None else attributes
+        self.physical_ids = {} if physical_ids is None else physical_ids
+        self.pseudo_parameters = dict(PSEUDO_PARAMETERS, **(pseudo_parameters or {}))
+
+    def value(self, o, path=None):
+        """The value of an expression; path is where it is in the template,
+        for error messages. Removes AWS::NoValue from dicts and lists."""
+        return self._value(o, list(path or []))
+
+    def _value(self, o, path):
+        if isinstance(o, dict):
+            if len(o) == 1:
+                key = next(iter(o))
+                if isinstance(key, basestring) and (key == 'Ref' or key.startswith('Fn::')):
+                    return self._function(key, o[key], path)
+            result = {}
+            for key, value in o.items():
+                path.append(key)
+                value = self._value(value, path)
+                path.pop()
+                if value is not _no_value:
+                    result[key] = value
+            return result
+        if isinstance(o, (list, tuple)):
+            result = []
+            for i, value in enumerate(o):
+                path.append(i)
+                value = self._value(value, path)
+                path.pop()
+                if value is not _no_value:
+                    result.append(value)
+            return result
+        return o
+
+    def _function(self, name, argument, path):
+        path.append(name)
+        try:
+            function = self._functions.get(name)
+            if function is None:
+                raise EvaluationError(_format_path(path), 'Can not evaluate ' + name)
+            return function(self, argument, path)
+        finally:
+            path.pop()
+
+    def _ref(self, name, path):
+        if name == NO_VALUE:
+            return _no_value
+        if name in self.parameters:
+            return self.parameters[name]
+        if name in self.pseudo_parameters:
+            return self.pseudo_parameters[name]
+        if name in self.resources:
+            return self.physical_ids.get(name, name)
+        raise EvaluationError(_format_path(path),
+                              'Unknown resource or parameter {0!r}'.format(name))
+
+    def _get_att(self, argument, path):
+        argument = self._value(argument, path)
+        if not isinstance(argument, list) or len(argument) != 2:
+            raise EvaluationError(_format_path(path), 'Invalid arguments {0!r}'.format(argument))
+        name, attribute = argument
+        try:
+            return self.attributes[name][attribute]
+        except (KeyError, TypeError):
+            raise EvaluationError(_format_path(path), 'No value for attribute {0} of {1}'.format(
+                attribute, name))
+
+    def _join(self, argument, path):
+        argument = self._value(argument, path)
+        if (not isinstance(argument, list) or len(argument) != 2
+                or not isinstance(argument[1], list)):
+            raise EvaluationError(_format_path(path), 'Invalid arguments {0!r}'.format(argument))
+        glue, values = argument
+        for value in values:
+            if not isinstance(value, basestring):
+                raise EvaluationError(_format_path(path), 'Can not join {0!r}'.format(value))
+        return glue.join(values)
+
+    def _base64(self, argument, path):
+        value = self._value(argument, path)
+        if not isinstance(value, basestring):
+            raise EvaluationError(_format_path(path), 'Can not encode {0!r}'.format(value))
+        if isinstance(value, unicode):
+            value = value.encode('utf-8')
+        return base64.b64encode(value)
+
+    _functions = {
+        'Ref': _ref,
+        'Fn::GetAtt': _get_att,
+        'Fn::Join': _join,
+        'Fn::Base64': _base64,
+    }
+
+
+class _NoValue(object):
+    def __repr__(self):
+        return NO_VALUE
+
+
+# a value which is left out of its dict or list
+_no_value = _NoValue()
@@ -0,0 +1,177 @@
+# -*- encoding: utf-8 -*-
+"""Create many resources of one class at once
+
+    volumes = Fleet(AWS.EC2.Volume, ['Volume{0}'.format(i) for i in range(n)],
+                    columns={'Size': sizes}, AvailabilityZone='eu-west-1a')
+    stack = Stack(*volumes)
+
+``columns`` holds one value per resource, the keyword arguments are shared
+by all of them. The values stay in these columns: a member of a fleet only
+holds its name and row until one of its properties or attributes is
+accessed, and then becomes a resource like any other. Members render to
+the same JSON as resources created one by one. Use Fleet.attribute() to
+refer to the attributes of all members without materializing them:
+
+    Fleet(AWS.EC2.VolumeAttachment, len(volumes), columns={
+        'VolumeId': volumes.resources, 'InstanceId': instances.resources})
+"""
+import gc
+
+from cfn.core import (Resource, Property, Attribute, resolve_references,
+                      _register_template)
+
+
+class Fleet(object):
+    """The members of a fleet, in the order of their rows"""
+
+    def __init__(self, cls, names, columns=None, **values):
+        """names is a list of names, or the number of unnamed resources"""
+        if isinstance(names, (int, long)):
+            names = [None] * names
+        plan = cls._plan()
+        columns = dict(columns or {})
+        for name, column in columns.items():
+            if len(column) != len(names):
+                raise ValueError('Column {0} has {1} values for {2} resources'.format(
+                    name, len(column), len(names)))
+        for name in set(columns) | set(values):
+            if name not in plan.names:
+                raise AttributeError(name)
+        if set(columns) & set(values):
+            raise ValueError('Values given twice: {0}'.format(
+                ', '.join(sorted(set(columns) & set(values)))))
+        for name, default in plan.defaults:
+            if name not in columns:
+                values.setdefault(name, default.value)
+
+        self.cls = cls
+        self.columns = columns
+        self.values = values
+        # (name, values by row or None, value for all rows, member class)
+        self._fields = [(name, columns.get(name), values.get(name), type(member))
+                        for name, member in plan.attributes + plan.properties
+                        if name in columns or name in values]
+        self._eager_attributes = [(name, attribute) for name, attribute in plan.eager_attributes
+                                  if name not in columns and name not in values]
+        self._attribute_names = set(plan.attribute_names)
+        if _renders_like_resource(cls):
+            self.resources = self._create(names)
+        else:
+            self.resources = [cls(name, **self._row_values(row))
+                              for row, name in enumerate(names)]
+
+    def __len__(self):
+        return len(self.resources)
+
+    def __iter__(self):
+        return iter(self.resources)
+
+    def __getitem__(self, index):
+        return self.resources[index]
+
+    def attribute(self, name):
+        """The attribute name of every member, without materializing them"""
+        attribute_class = type(dict(self.cls._plan().attributes)[name])
+        return [attribute_class(resource=resource, name=name) for resource in self.resources]
+
+    def _create(self, names):
+        cls = self.cls
+        plan = cls._plan()
+        member_class = type(cls)(cls.__name__, (_Member, cls), {
+            '__module__': cls.__module__,
+            '_fleet': self,
+            # what Resource.__init__ would put into every instance
+            '_initialized': True,
+            '_attribute_names': plan.attribute_names,
+            '_property_names': plan.property_names,
+        })
+        new = object.__new__
+        resources = []
+        append = resources.append
+        # the members can not form reference cycles, and collections
+        # triggered by allocating them would take longer than creating them
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            for row, name in enumerate(names):
+                resource = new(member_class)
+                instance_dict = resource.__dict__
+                instance_dict['name'] = name
+                instance_dict['_row'] = row
+                append(resource)
+        finally:
+            if gc_enabled:
+                gc.enable()
+        return resources
+
+    def _template(self, resource, row):
+        # Resource._template, reading the columns
+        result = {'Type': resource.type()}
+        properties = {}
+        for name, column, value, member_class in self._fields:
+            if column is not None:
+                value = column[row]
+            if name in self._attribute_names:
+                if member_class is not Attribute:
+                    attribute = member_class(resource=resource, name=name)
+                    attribute.value = value
+                    value = attribute.to_json()
+                if value is not None:
+                    result[name] = value
+            elif value:
+                if member_class is not Property:
+                    value = member_class(resource=resource, value=value)
+                    value.name = name
+                properties[name] = value
+        for name, attribute in self._eager_attributes:
+            value = attribute.__class__(resource=resource, name=name).to_json()
+            if value is not None:
+                result[name] = value
+        if properties:
+            result['Properties'] = properties
+        return result
+
+    def _row_values(self, row):
+        values = dict(self.values)
+        values.update((name, column[row]) for name, column in self.columns.items())
+        return values
+
+    def _materialize(self, resource, row):
+        # Resource.__init__, reading the columns
+        instance_dict = resource.__dict__
+        for name, attribute in self._eager_attributes:
+            instance_dict[name] = attribute.__class__(resource=resource, name=name)
+        for name, column, value, member_class in self._fields:
+            if column is not None:
+                value = column[row]
+            if name in self._attribute_names:
+                attribute = instance_dict[name] = member_class(resource=resource, name=name)
+                attribute.value = value
+            else:
+                prop = instance_dict[name] = member_class(resource=resource, value=value)
+                prop.name = name
+
+
+def _renders_like_resource(cls):
+    # members render through _Member, which only knows Resource._template
+    return (getattr(cls.to_json, '__func__', None) is Resource.to_json.__func__
+            and getattr(cls._template, '__func__', None) is Resource._template.__func__)
+
+
+class _Member(object):
+    """Mixed into the class of the members of a fleet"""
+
+    def to_json(self):
+        return resolve_references(self._template())
+
+    def _template(self):
+        row = self.__dict__.get('_row')
+        if row is None:
+            return Resource._template(self)
+        return self._fleet._template(self, row)
+
+    def _materialize(self):
+        self._fleet._materialize(self, self.__dict__.pop('_row'))
+
+
+_register_template(_Member)
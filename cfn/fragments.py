@@ -0,0 +1,191 @@
+# -*- encoding: utf-8 -*-
+"""Structural hashes and an on-disk cache of rendered resources
+
+structural_hash() hashes what a value renders to without rendering it:
+resources, properties, parameters, Facts and plain values. Referenced
+resources, attributes and parameters only contribute their reference, so
+equal resources hash equal whatever their names and in whichever stack
+they are.
+
+A FragmentCache keeps rendered resources in a directory, keyed by their
+hash, so that they are shared between stacks and between runs:
+
+    stack.fragment_cache = FragmentCache('.cfn-cache', max_bytes=64 << 20)
+    to_json(stack)
+
+The least recently used fragments are removed when the cache grows over
+max_bytes. Several processes may share a directory.
+
+Like the output kept with ResourceCollection.cache_resources_json, the hash
+of a resource is kept until the resource is changed through __setattr__.
+Values which are modified in place (e.g. a list property which is appended
+to) are not noticed, call invalidate() on their resource after doing so, or
+the fragment of the unmodified resource is found.
+"""
+import hashlib
+import json
+import os
+import tempfile
+from collections import OrderedDict
+
+from cfn.core import Resource, _encode_key, _encode_string, _renames, _unresolved_json
+from cfn.util import Parameter
+
+DEFAULT_MAX_BYTES = 64 << 20
+
+# part of every key, change it when the rendering of a structure changes
+FORMAT_VERSION = '1'
+
+
+def structural_hash(o):
+    """Return a hex digest which is equal for values rendering to the same
+    JSON. Hashes of resources are cached like Resource.dependencies()."""
+    if isinstance(o, Resource):
+        cached = o.__dict__.get('_structural_hash')
+        if cached is not None and cached[0] == _renames[0]:
+            return cached[1]
+        digest = _hash(_unresolved_json(o))
+        o.__dict__['_structural_hash'] = (_renames[0], digest)
+        return digest
+    if isinstance(o, Parameter):
+        # a parameter in the Parameters section, not a reference to it
+        return _hash(dict(o))
+    return _hash(o)
+
+
+def _hash(o):
+    parts = []
+    _feed(o, parts)
+    return hashlib.sha1(''.join(parts)).hexdigest()
+
+
+def _feed(o, parts):
+    # the same walk as cfn.core._iter_json, without resolving strings
+    if hasattr(o, 'ref'):
+        o = o.ref()
+    elif hasattr(o, 'to_json'):
+        # e.g. a property whose value is an attribute
+        _feed(_unresolved_json(o), parts)
+        return
+    if isinstance(o, basestring):
+        parts.append(_encode_string(o))
+    elif isinstance(o, (list, tuple)):
+        parts.append('[')
+        for value in o:
+            _feed(value, parts)
+            parts.append(',')
+        parts.append(']')
+    elif isinstance(o, dict):
+        parts.append('{')
+        for key, value in sorted(o.items()):
+            parts.append(_encode_key(key))
+            parts.append(':')
+            _feed(value, parts)
+            parts.append(',')
+        parts.append('}')
+    else:
+        parts.append(json.dumps(o))
+
+
+class FragmentCache(object):
+    """Rendered JSON fragments in a directory, one file per fragment"""
+
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        # key -> size, least recently used first; read from disk on first use
+        self._index = None
+        self._bytes = 0
+
+    def key(self, o, level):
+        """The key of o rendered at an indentation level, None for compact"""
+        layout = 'compact' if level is None else str(level)
+        return hashlib.sha1(':'.join((FORMAT_VERSION, layout, structural_hash(o)))).hexdigest()
+
+    def get(self, key):
+        index = self._load_index()
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as fragment:
+                text = fragment.read()
+            os.utime(path, None)
+        except (IOError, OSError):
+            # never written, or removed by another process
+            self.misses += 1
+            self._bytes -= index.pop(key, 0)
+            return None
+        self.hits += 1
+        if key in index:
+            index[key] = index.pop(key)
+        else:
+            # written by another process
+            index[key] = len(text)
+            self._bytes += len(text)
+        return text
+
+    def put(self, key, text):
+        index = self._load_index()
+        path = self._path(key)
+        directory = os.path.dirname(path)
+        if not os.path.isdir(directory):
+            try:
+                os.makedirs(directory)
+            except OSError:
+                if not os.path.isdir(directory):
+                    raise
+        # readers never see a partially written fragment
+        fd, temporary = tempfile.mkstemp(dir=directory)
+        with os.fdopen(fd, 'wb') as fragment:
+            fragment.write(text)
+        os.rename(temporary, path)
+        self._bytes += len(text) - index.pop(key, 0)
+        index[key] = len(text)
+        self._evict()
+
+    @property
+    def bytes(self):
+        self._load_index()
+        return self._bytes
+
+    def clear(self):
+        for key in list(self._load_index()):
+            self._remove(key)
+
+    def _evict(self):
+        while self._bytes > self.max_bytes and self._index:
+            self._remove(next(iter(self._index)))
+
+    def _remove(self, key):
+        self._bytes -= self._index.pop(key)
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            # removed by another process
+            pass
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key[2:])
+
+    def _load_index(self):
+        if self._index is None:
+            entries = []
+            if os.path.isdir(self.directory):
+                for prefix in os.listdir(self.directory):
+                    subdirectory = os.path.join(self.directory, prefix)
+                    if len(prefix) != 2 or not os.path.isdir(subdirectory):
+                        continue
+                    for name in os.listdir(subdirectory):
+                        try:
+                            stat = os.stat(os.path.join(subdirectory, name))
+                        except OSError:
+                            continue
+                        # temporary files of unfinished writes start with tmp
+                        if not name.startswith('tmp'):
+                            entries.append((stat.st_mtime, prefix + name, stat.st_size))
+            entries.sort()
+            self._index = OrderedDict((key, size) for _, key, size in entries)
+            self._bytes = sum(size for _, _, size in entries)
+            self._evict()
+        return self._index
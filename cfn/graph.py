@@ -0,0 +1,158 @@
+# -*- encoding: utf-8 -*-
+"""Dependencies between the resources of a stack
+
+    graph = stack.dependency_graph()
+    graph.topological_order()   # dependencies before their dependents
+    graph.dependents('Volume')  # who refers to Volume
+    graph.cycles()
+    graph.dangling_references()
+"""
+import heapq
+
+# references to these are always valid
+PSEUDO_PARAMETER_PREFIX = 'AWS::'
+
+
+class CycleError(ValueError):
+    def __init__(self, cycles):
+        message = 'Resources depend on each other: {0}'.format(
+            '; '.join(', '.join(cycle) for cycle in cycles[:5]))
+        if len(cycles) > 5:
+            message += ' and {0} more'.format(len(cycles) - 5)
+        ValueError.__init__(self, message)
+        self.cycles = cycles
+
+
+class DependencyGraph(object):
+    """Resource to resource edges of a ResourceCollection
+
+    Edges come from Resource.dependencies(). update() only rebuilds the
+    index when a resource was added, removed or changed its dependencies.
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+        self._snapshot = {}
+        self._parameters = set()
+        self._edges = {}
+        self._reverse_edges = {}
+        self._dangling = []
+
+    def update(self):
+        resources = self.collection.resources
+        parameters = getattr(self.collection, 'Parameters', {})
+        snapshot = dict((name, (resource, resource.dependencies()))
+                        for name, resource in resources.items())
+        missing = (None, None)
+        if (len(snapshot) == len(self._snapshot)
+                and all(self._snapshot.get(name, missing)[0] is resource
+                        and self._snapshot[name][1] is dependencies
+                        for name, (resource, dependencies) in snapshot.items())
+                and set(parameters) == self._parameters):
+            return
+        self._snapshot = snapshot
+        self._parameters = set(parameters)
+
+        edges = {}
+        reverse_edges = dict((name, []) for name in resources)
+        dangling = []
+        for name, (_, dependencies) in snapshot.items():
+            edges[name] = []
+            for dependency in dependencies:
+                if dependency in resources:
+                    edges[name].append(dependency)
+                    reverse_edges[dependency].append(name)
+                elif (dependency not in parameters
+                      and not dependency.startswith(PSEUDO_PARAMETER_PREFIX)):
+                    dangling.append((name, dependency))
+        for dependents in reverse_edges.values():
+            dependents.sort()
+        self._edges = edges
+        self._reverse_edges = reverse_edges
+        self._dangling = sorted(dangling)
+
+    def dependencies(self, name):
+        """Names of the resources the resource name refers to"""
+        return list(self._edges[name])
+
+    def dependents(self, name):
+        """Names of the resources which refer to the resource name"""
+        return list(self._reverse_edges[name])
+
+    def dangling_references(self):
+        """(resource name, referenced name) pairs of references to names
+        which are neither resources nor parameters of the stack"""
+        return list(self._dangling)
+
+    def topological_order(self):
+        """Resource names, every resource after the resources it refers to.
+
+        Ties are broken by name, so the order is stable. Raises CycleError if
+        there is no such order.
+        """
+        remaining = dict((name, len(dependencies))
+                         for name, dependencies in self._edges.items())
+        ready = [name for name, count in remaining.items() if count == 0]
+        heapq.heapify(ready)
+        order = []
+        while ready:
+            name = heapq.heappop(ready)
+            order.append(name)
+            for dependent in self._reverse_edges[name]:
+                remaining[dependent] -= 1
+                if remaining[dependent] == 0:
+                    heapq.heappush(ready, dependent)
+        if len(order) != len(self._edges):
+            raise CycleError(self.cycles())
+        return order
+
+    def cycles(self):
+        """Groups of resources which depend on each other, each sorted by name
+
+        These are the strongly connected components with more than one
+        resource, and resources which refer to themselves.
+        """
+        # Tarjan's algorithm without recursion, so that long dependency
+        # chains do not hit the recursion limit
+        index = {}
+        lowlink = {}
+        on_stack = set()
+        stack = []
+        cycles = []
+        counter = 0
+        for root in sorted(self._edges):
+            if root in index:
+                continue
+            work = [(root, iter(self._edges[root]))]
+            index[root] = lowlink[root] = counter
+            counter += 1
+            stack.append(root)
+            on_stack.add(root)
+            while work:
+                name, dependencies = work[-1]
+                for dependency in dependencies:
+                    if dependency not in index:
+                        index[dependency] = lowlink[dependency] = counter
+                        counter += 1
+                        stack.append(dependency)
+                        on_stack.add(dependency)
+                        work.append((dependency, iter(self._edges[dependency])))
+                        break
+                    elif dependency in on_stack:
+                        lowlink[name] = min(lowlink[name], index[dependency])
+                else:
+                    work.pop()
+                    if work:
+                        parent = work[-1][0]
+                        lowlink[parent] = min(lowlink[parent], lowlink[name])
+                    if lowlink[name] == index[name]:
+                        component = []
+                        while True:
+                            member = stack.pop()
+                            on_stack.discard(member)
+                            component.append(member)
+                            if member == name:
+                                break
+                        if len(component) > 1 or name in self._edges[name]:
+                            cycles.append(sorted(component))
+        return sorted(cycles)
@@ -0,0 +1,175 @@
+# -*- encoding: utf-8 -*-
+"""Read JSON templates into stacks
+
+    stack = load_file('legacy.json')
+    stack.resources['Node'].InstanceType = 'm3.large'
+
+Resources become instances of their AWS.* class, extended by properties and
+attributes the class does not know, or of a generic class named after their
+type. Values are taken over from the parsed template as they are, without
+copying them: references stay Ref and Fn::GetAtt dicts, and strings which
+the DSL would read as references (``{Resource|...}``, ``{Attribute|...}``,
+``{Parameter|...}``) are wrapped in Literal. Parameter definitions are taken
+as they are, so their constraints stay strings for Stack.bind().
+"""
+import json
+
+import AWS
+from cfn.codegen import _is_member_name
+from cfn.core import Stack, Resource, Property, Attribute, _split_references
+from cfn.util import Parameter
+
+SECTIONS = ('AWSTemplateFormatVersion', 'Description', 'Parameters', 'Mappings',
+            'Conditions', 'Resources', 'Outputs', 'Metadata')
+
+
+class Literal(object):
+    """A value which is rendered as it is.
+
+    Like a resource it renders to its ref(), so references in its strings
+    are not resolved. Also keeps false property values, which would be left
+    out otherwise.
+    """
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def ref(self):
+        return self.value
+
+    def __eq__(self, other):
+        return isinstance(other, Literal) and self.value == other.value
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return 'Literal({0!r})'.format(self.value)
+
+
+def load_file(path):
+    with open(path) as template:
+        return load(template)
+
+
+def load(fp):
+    return from_template(json.load(fp))
+
+
+def loads(text):
+    return from_template(json.loads(text))
+
+
+def from_template(template):
+    """Build a Stack from a parsed template. The stack takes over the values
+    of template, which should not be used afterwards."""
+    unknown = set(template) - set(SECTIONS)
+    if unknown:
+        raise ValueError('Unsupported template sections: {0}'.format(
+            ', '.join(sorted(unknown))))
+    stack = Stack()
+    if 'AWSTemplateFormatVersion' in template:
+        stack.AWSTemplateFormatVersion = template['AWSTemplateFormatVersion']
+    if 'Description' in template:
+        stack.Description = _protect(template['Description'])
+    for name, definition in template.get('Parameters', {}).items():
+        stack.Parameters[name] = Parameter(
+            str(name), **dict((str(k), v) for k, v in definition.items()))
+    for section in ('Mappings', 'Conditions', 'Outputs', 'Metadata'):
+        setattr(stack, section, _protect(template.get(section, {})))
+
+    resources = template.get('Resources', {})
+    by_type = {}
+    for name, definition in resources.items():
+        if not isinstance(definition, dict) or not isinstance(definition.get('Type'), basestring):
+            raise ValueError('Resource {0} has no Type'.format(name))
+        by_type.setdefault(definition['Type'], []).append(name)
+    for type_name, names in sorted(by_type.items()):
+        cls = _resource_class(type_name, [resources[name] for name in names])
+        for name in names:
+            # let go of the parsed resource while building the next ones
+            stack.add(_resource(cls, name, resources.pop(name)))
+    return stack
+
+
+def _resource_class(type_name, definitions):
+    """The class of AWS.* for type_name, or a subclass of it or of Resource
+    having all properties and attributes used in definitions"""
+    base = AWS.resource_class(type_name) or Resource
+    plan = base._plan()
+    properties = set()
+    attributes = set()
+    for definition in definitions:
+        properties.update(definition.get('Properties') or ())
+        attributes.update(k for k in definition if k not in ('Type', 'Properties'))
+
+    members = {}
+    for name in properties:
+        member = dict(plan.properties).get(name)
+        if member is None:
+            members[name] = Property()
+        elif type(member) is not Property and not _convertible(member, name, definitions):
+            # keep the value as it is, e.g. UserData which is not Base64
+            members[name] = Property()
+    members.update((name, Attribute()) for name in attributes
+                   if name not in plan.attribute_names)
+    for name, member in members.items():
+        taken = plan.attribute_names if isinstance(member, Property) else plan.property_names
+        if not _is_member_name(name) or name in taken:
+            raise ValueError('Can not load {0} of {1} resources'.format(name, type_name))
+    if base is not Resource and not members:
+        return base
+    module, _, class_name = type_name.rpartition('::')
+    members['__module__'] = str(module.replace('::', '.'))
+    return type(base)(str(class_name), (base,), members)
+
+
+def _convertible(member, name, definitions):
+    from_json = getattr(member, 'from_json', None)
+    if from_json is None:
+        return False
+    for definition in definitions:
+        properties = definition.get('Properties') or {}
+        if name in properties:
+            try:
+                from_json(properties[name])
+            except ValueError:
+                return False
+    return True
+
+
+def _resource(cls, name, definition):
+    resource = cls(str(name))
+    for key, value in (definition.get('Properties') or {}).items():
+        prop = getattr(resource, key)
+        value = _protect(value)
+        from_json = getattr(prop, 'from_json', None)
+        if from_json is not None:
+            value = from_json(value)
+        if not value:
+            value = Literal(value)
+        prop.value = value
+    for key, value in definition.items():
+        if key not in ('Type', 'Properties'):
+            getattr(resource, key).value = _protect(value)
+    return resource
+
+
+def _protect(o):
+    """Wrap the strings in o which contain references in Literal, in place"""
+    if isinstance(o, basestring):
+        return Literal(o) if '{' in o and _has_references(o) else o
+    if isinstance(o, dict):
+        for key, value in o.items():
+            if isinstance(value, (basestring, dict, list)):
+                o[key] = _protect(value)
+    elif isinstance(o, list):
+        for i, value in enumerate(o):
+            if isinstance(value, (basestring, dict, list)):
+                o[i] = _protect(value)
+    return o
+
+
+def _has_references(a_string):
+    return any(not isinstance(token, basestring) for token in _split_references(a_string))
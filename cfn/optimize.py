@@ -0,0 +1,88 @@
+# -*- encoding: utf-8 -*-
+"""Simplify the Fn::Join expressions of rendered templates
+
+    template, saved = optimize_joins(stack.to_json())
+
+Strings with references and cfn_join() leave joins which are longer than
+they need to be, e.g. ``{"Fn::Join": ["", ["a", {"Fn::Join": ["", ["b",
+{"Ref": "x"}]]}]]}``. optimize_joins() merges adjacent literals, flattens
+joins into joins with the same glue, and replaces joins of literals by
+their string and joins of one value by that value:
+
+    {"Fn::Join": ["", ["ab", {"Ref": "x"}]]}
+
+Every value is looked at once. Parts of the template which do not change
+are shared with the result, not copied.
+"""
+from cfn.core import to_json
+
+
+def optimize_joins(template):
+    """Return the optimized template and the number of bytes it saves in
+    compact JSON"""
+    optimized = _optimize(template)
+    if optimized is template:
+        return template, 0
+    return optimized, len(to_json(template, True)) - len(to_json(optimized, True))
+
+
+def _optimize(o):
+    if isinstance(o, dict):
+        if len(o) == 1 and 'Fn::Join' in o:
+            return _optimize_join(o)
+        result = {}
+        changed = False
+        for key, value in o.items():
+            optimized = result[key] = _optimize(value)
+            changed = changed or optimized is not value
+        return result if changed else o
+    if isinstance(o, (list, tuple)):
+        result = [_optimize(value) for value in o]
+        for value, optimized in zip(o, result):
+            if optimized is not value:
+                return result
+        return o
+    return o
+
+
+def _optimize_join(o):
+    arguments = o['Fn::Join']
+    if not _is_join_arguments(arguments):
+        # e.g. a join of a list parameter, which can only be optimized inside
+        optimized = _optimize(arguments)
+        return o if optimized is arguments else {'Fn::Join': optimized}
+    glue, values = arguments
+    items = []
+    literals = []
+    for value in values:
+        value = _optimize(value)
+        if (isinstance(value, dict) and len(value) == 1 and 'Fn::Join' in value
+                and _is_join_arguments(value['Fn::Join']) and value['Fn::Join'][0] == glue):
+            # optimized already, so it has at least two parts
+            parts = value['Fn::Join'][1]
+        else:
+            parts = (value,)
+        for part in parts:
+            if isinstance(part, basestring):
+                literals.append(part)
+            else:
+                if literals:
+                    items.append(glue.join(literals))
+                    literals = []
+                items.append(part)
+    if literals:
+        items.append(glue.join(literals))
+
+    if not items:
+        return ''
+    if len(items) == 1:
+        # a value in a join is a string, so it is the same as the join
+        return items[0]
+    if len(items) == len(values) and all(a is b for a, b in zip(items, values)):
+        return o
+    return {'Fn::Join': [glue, items]}
+
+
+def _is_join_arguments(arguments):
+    return (isinstance(arguments, (list, tuple)) and len(arguments) == 2
+            and isinstance(arguments[0], basestring) and isinstance(arguments[1], (list, tuple)))
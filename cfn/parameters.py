@@ -0,0 +1,209 @@
+# -*- encoding: utf-8 -*-
+"""Check parameter values against the constraints of a stack's parameters
+
+    values = stack.bind({'Environment': 'prod', 'InstanceCount': '3'})
+    stack.bind_all({'prod': prod_values, 'staging': staging_values})
+
+Type, AllowedValues, AllowedPattern, MinLength, MaxLength, MinValue and
+MaxValue are checked the way CloudFormation checks them; the values of
+AWS-specific types are only checked as strings. The constraints of every
+parameter are compiled once per ParameterChecker, and once per Parameter
+until it is changed (see Parameter.validator()), so checking many sets of
+values costs little more than looking at them. Values are given as a dict
+or in the format of parameter files for the AWS CLI:
+
+    [{"ParameterKey": "Environment", "ParameterValue": "prod"}, ...]
+"""
+import json
+import re
+
+from cfn.validation import ValidationError, _format_path
+
+# checked like String, except for lists of them
+AWS_TYPE_PREFIX = 'AWS::'
+
+
+def compile_parameter(parameter):
+    """Return a function returning the problems of a value for parameter, as
+    a list of messages. Raises ValueError for invalid constraints."""
+    type_name = parameter.get('Type', 'String')
+    if type_name.startswith('List<') and type_name.endswith('>'):
+        item_type = type_name[len('List<'):-1]
+        is_list = True
+    elif type_name == 'CommaDelimitedList':
+        item_type = 'String'
+        is_list = True
+    else:
+        item_type = type_name
+        is_list = False
+    if item_type not in ('String', 'Number') and not item_type.startswith(AWS_TYPE_PREFIX):
+        raise ValueError('Unsupported parameter type {0!r}'.format(type_name))
+    is_number = item_type == 'Number'
+    show = (lambda value: '****') if _true(parameter.get('NoEcho')) else repr
+    description = parameter.get('ConstraintDescription')
+
+    # functions returning a message for an item which violates a constraint
+    checks = []
+    if 'AllowedValues' in parameter:
+        if is_number:
+            allowed = frozenset(_number(v) for v in parameter['AllowedValues'])
+        else:
+            allowed = frozenset(_text(v) for v in parameter['AllowedValues'])
+        if None in allowed:
+            raise ValueError('Invalid AllowedValues {0!r}'.format(parameter['AllowedValues']))
+        key = _number if is_number else _text
+        checks.append(lambda item: None if key(item) in allowed else
+                      '{0} is not one of the allowed values'.format(show(item)))
+    if 'AllowedPattern' in parameter:
+        pattern = parameter['AllowedPattern']
+        # the whole value has to match
+        match = re.compile('(?:{0})\\Z'.format(pattern)).match
+        checks.append(lambda item: None if match(item) else
+                      '{0} does not match {1!r}'.format(show(item), pattern))
+    if 'MinLength' in parameter and not is_number:
+        min_length = int(parameter['MinLength'])
+        checks.append(lambda item: None if len(item) >= min_length else
+                      '{0} is shorter than {1} characters'.format(show(item), min_length))
+    if 'MaxLength' in parameter and not is_number:
+        max_length = int(parameter['MaxLength'])
+        checks.append(lambda item: None if len(item) <= max_length else
+                      '{0} is longer than {1} characters'.format(show(item), max_length))
+    if 'MinValue' in parameter and is_number:
+        min_value = _bound(parameter, 'MinValue')
+        checks.append(lambda item: None if _number(item) >= min_value else
+                      '{0} is less than {1}'.format(show(item), parameter['MinValue']))
+    if 'MaxValue' in parameter and is_number:
+        max_value = _bound(parameter, 'MaxValue')
+        checks.append(lambda item: None if _number(item) <= max_value else
+                      '{0} is greater than {1}'.format(show(item), parameter['MaxValue']))
+
+    def check(value):
+        text = _text(value)
+        if text is None:
+            return ['{0} is not a string'.format(show(value))]
+        items = [item.strip() for item in text.split(',')] if is_list else [text]
+        problems = []
+        for item in items:
+            if is_number and _number(item) is None:
+                problems.append('{0} is not a number'.format(show(item)))
+                continue
+            for constraint in checks:
+                message = constraint(item)
+                if message is not None:
+                    if description:
+                        message += ': ' + description
+                    problems.append(message)
+        return problems
+    return check
+
+
+class ParameterChecker(object):
+    """The compiled constraints of a dict of parameters by name"""
+
+    def __init__(self, parameters):
+        self._checks = {}
+        self._defaults = {}
+        # problems of defaults, by name; they are only reported when used
+        self._default_problems = {}
+        for name, parameter in parameters.items():
+            # Parameters keep their compiled constraints
+            validator = getattr(parameter, 'validator', None)
+            check = self._checks[name] = (validator() if validator is not None
+                                          else compile_parameter(parameter))
+            if 'Default' in parameter:
+                self._defaults[name] = parameter['Default']
+                self._default_problems[name] = check(parameter['Default'])
+
+    def problems(self, parameter_values, path=()):
+        """Return (path, message) pairs for all problems of a set of values"""
+        values = parameter_values_dict(parameter_values)
+        problems = []
+        for name in sorted(set(self._checks) | set(values)):
+            if name not in self._checks:
+                messages = ['Unknown parameter']
+            elif name in values:
+                messages = self._checks[name](values[name])
+            elif name in self._defaults:
+                messages = ['Default ' + m for m in self._default_problems[name]]
+            else:
+                messages = ['No value and no default']
+            if messages:
+                location = _format_path(list(path) + ['Parameters', name])
+                problems.extend((location, message) for message in messages)
+        return problems
+
+    def bind(self, parameter_values):
+        """Return the values of all parameters, using their defaults for
+        missing values. Raises cfn.validation.ValidationError."""
+        problems = self.problems(parameter_values)
+        if problems:
+            raise ValidationError(problems, 'Invalid parameter values')
+        return self._with_defaults(parameter_values)
+
+    def bind_all(self, parameter_value_sets):
+        """bind() every set of values in a list or a dict, keeping its shape.
+
+        Raises one ValidationError for the problems of all sets, their paths
+        start with the index or key of the set.
+        """
+        if isinstance(parameter_value_sets, dict):
+            keys = sorted(parameter_value_sets)
+        else:
+            parameter_value_sets = list(parameter_value_sets)
+            keys = range(len(parameter_value_sets))
+        problems = []
+        for key in keys:
+            problems.extend(self.problems(parameter_value_sets[key], [key]))
+        if problems:
+            raise ValidationError(problems, 'Invalid parameter values')
+        bound = [(key, self._with_defaults(parameter_value_sets[key])) for key in keys]
+        if isinstance(parameter_value_sets, dict):
+            return dict(bound)
+        return [values for _, values in bound]
+
+    def _with_defaults(self, parameter_values):
+        values = dict(self._defaults)
+        values.update(parameter_values_dict(parameter_values))
+        return values
+
+
+def parameter_values_dict(parameter_values):
+    """Values by name, from a dict or a list in the format of the AWS CLI"""
+    if isinstance(parameter_values, dict):
+        return parameter_values
+    return dict((p['ParameterKey'], p['ParameterValue']) for p in parameter_values)
+
+
+def load_parameter_file(path):
+    with open(path) as parameter_file:
+        return parameter_values_dict(json.load(parameter_file))
+
+
+def _text(value):
+    # parameter values are strings, numbers in parameter files are taken
+    # as they are written
+    if isinstance(value, basestring):
+        return value
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, (int, long, float)):
+        return json.dumps(value)
+    return None
+
+
+def _number(value):
+    try:
+        return float(_text(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def _bound(parameter, key):
+    value = _number(parameter[key])
+    if value is None:
+        raise ValueError('Invalid {0} {1!r}'.format(key, parameter[key]))
+    return value
+
+
+def _true(value):
+    return value is True or _text(value) == 'true'
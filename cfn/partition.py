@@ -0,0 +1,460 @@
+# -*- encoding: utf-8 -*-
+"""Split a stack which is too large for CloudFormation into nested stacks
+
+    nested = partition(stack, 'https://s3.amazonaws.com/bucket/{name}.json')
+    nested.write('out/')  # parent.json and one file per child stack
+
+Resources are assigned to child stacks so that few references cross from
+one child to another:
+
+ * resources which are not connected to each other by references are
+   packed into children whole (first fit decreasing)
+ * larger groups of connected resources are cut into children along a
+   depth first dependency order, which keeps resources close to what they
+   refer to. The cut is then improved by moving resources to the child
+   most of their neighbours are in.
+
+Children only ever refer to children created before them, so the nested
+stacks never depend on each other in a cycle. A reference to a resource in
+another child becomes a parameter of the referring child, which the parent
+fills from an output of the child holding the resource. Children get the
+Conditions and Mappings their resources use, with the parameters those
+refer to; the parent gets all of them. A child needing more parameters or
+outputs than CloudFormation allows raises PartitionError.
+
+Everything is linear in the number of resources and references, apart from
+sorting. Rendering the resources takes most of the time. For the 50k
+resources stack of benchmarks/generation.py (Python 2.7, one CPU) building
+the dependency graph takes about 6s, and partition() about 12s: the graph
+again, 3.5s for rendering the resources of the children and 1s for
+assigning them.
+"""
+import os
+import re
+from collections import defaultdict
+
+from cfn.core import resolve_references, to_json, _collect_references
+
+# resources, parameters and outputs per template
+RESOURCE_LIMIT = 500
+PARAMETER_LIMIT = 200
+OUTPUT_LIMIT = 200
+
+REFINEMENT_PASSES = 4
+
+
+class PartitionError(ValueError):
+    """A child stack would have more parameters or outputs than allowed"""
+
+
+class NestedStacks(object):
+    """The result of partition(): JSON templates of a parent stack and its
+    children, and which child each resource went to"""
+
+    def __init__(self, parent, children, assignment, crossing_references):
+        self.parent = parent
+        self.children = children
+        self.assignment = assignment
+        self.crossing_references = crossing_references
+
+    def write(self, output_dir, parent_name='parent'):
+        for name, template in [(parent_name, self.parent)] + sorted(self.children.items()):
+            with open(os.path.join(output_dir, name + '.json'), 'w') as output:
+                output.write(to_json(template))
+
+
+def partition(stack, template_url, max_resources=RESOURCE_LIMIT,
+              child_prefix='NestedStack', max_parameters=PARAMETER_LIMIT,
+              max_outputs=OUTPUT_LIMIT):
+    """Split stack into child stacks of at most max_resources resources.
+
+    template_url is a format string with a ``{name}`` field, or a callable
+    taking the child name, giving the URL the child template will be
+    uploaded to. Raises PartitionError if a child would have more than
+    max_parameters parameters or max_outputs outputs, e.g. for a resource
+    referring to more resources than fit into one child.
+    """
+    if not callable(template_url):
+        template_url = template_url.format
+    graph = stack.dependency_graph()
+    # raises CycleError, there is no valid split of a cyclic stack
+    graph.topological_order()
+
+    partitions = _assign(graph, sorted(stack.resources), max_resources)
+    names = ['{0}{1}'.format(child_prefix, i + 1) for i in range(len(partitions))]
+    assignment = {}
+    for name, members in zip(names, partitions):
+        for resource_name in members:
+            assignment[resource_name] = name
+    crossing = sum(1 for resource_name in stack.resources
+                   for dependency in graph.dependencies(resource_name)
+                   if assignment[dependency] != assignment[resource_name])
+
+    builder = _Builder(stack, assignment)
+    for name, members in zip(names, partitions):
+        builder.add_child(name, members)
+    parent = builder.parent(names, template_url)
+    _check_limits(builder, graph, names, assignment, max_parameters, max_outputs)
+    return NestedStacks(parent, builder.children, assignment, crossing)
+
+
+def _check_limits(builder, graph, names, assignment, max_parameters, max_outputs):
+    problems = []
+    for name in names:
+        child = builder.children[name]
+        for section, limit, crossing in (('Parameters', max_parameters, graph.dependencies),
+                                         ('Outputs', max_outputs, graph.dependents)):
+            count = len(child.get(section, ()))
+            if count <= limit:
+                continue
+            # the resources with the most references crossing to other children
+            counts = sorted((-sum(1 for other in crossing(resource_name)
+                                  if assignment.get(other, name) != name), resource_name)
+                            for resource_name in child['Resources'])
+            problems.append('{0} would have {1} {2}, at most {3} are allowed ({4})'.format(
+                name, count, section, limit, ', '.join(
+                    '{0}: {1}'.format(resource_name, -n)
+                    for n, resource_name in counts[:3] if n)))
+    if problems:
+        raise PartitionError('Can not split the stack, too many references cross '
+                             'between nested stacks:\n  ' + '\n  '.join(problems))
+
+
+def _assign(graph, names, max_resources):
+    """Return lists of resource names, each of at most max_resources, such
+    that every resource is in the same or a later list than the resources it
+    depends on"""
+    neighbours = dict((name, set(graph.dependencies(name)) | set(graph.dependents(name)))
+                      for name in names)
+    small = []
+    partitions = []
+    seen = set()
+    for name in names:
+        if name in seen:
+            continue
+        component = _component(name, neighbours, seen)
+        if len(component) <= max_resources:
+            small.append(component)
+        else:
+            partitions.extend(_split(component, graph, max_resources))
+
+    # first fit decreasing; unconnected components can go anywhere
+    small.sort(key=lambda component: (-len(component), component[0]))
+    for component in small:
+        for members in partitions:
+            if len(members) + len(component) <= max_resources:
+                members.extend(component)
+                break
+        else:
+            partitions.append(list(component))
+    return partitions
+
+
+def _component(start, neighbours, seen):
+    seen.add(start)
+    component = [start]
+    i = 0
+    while i < len(component):
+        for neighbour in sorted(neighbours[component[i]]):
+            if neighbour not in seen:
+                seen.add(neighbour)
+                component.append(neighbour)
+        i += 1
+    return sorted(component)
+
+
+def _split(component, graph, max_resources):
+    order = _depth_first_order(component, graph)
+    count = -(-len(order) // max_resources)
+    # equal sized chunks leave room for the refinement
+    chunk_size = -(-len(order) // count)
+    chunk = {}
+    loads = [0] * count
+    for position, name in enumerate(order):
+        chunk[name] = position // chunk_size
+        loads[chunk[name]] += 1
+
+    for _ in range(REFINEMENT_PASSES):
+        if not _refine(order, graph, chunk, loads, max_resources):
+            break
+
+    chunks = [[] for _ in range(count)]
+    for name in order:
+        chunks[chunk[name]].append(name)
+    return [members for members in chunks if members]
+
+
+def _depth_first_order(component, graph):
+    """Dependencies before dependents, placing every resource close to
+    what it refers to and what refers to it"""
+    order = []
+    placed = set()
+    expanded = set()
+    explore = [component[0]]
+    while explore:
+        start = explore.pop()
+        if start in expanded:
+            continue
+        expanded.add(start)
+        new = _place(start, graph, placed, order)
+        # the dependents of the resources placed last are looked at first
+        for name in new:
+            explore.extend(d for d in reversed(graph.dependents(name)) if d not in expanded)
+    return order
+
+
+def _place(start, graph, placed, order):
+    """Append start and the resources it depends on which are not placed
+    yet to order, dependencies first"""
+    if start in placed:
+        return []
+    first = len(order)
+    placed.add(start)
+    work = [(start, iter(graph.dependencies(start)))]
+    while work:
+        name, dependencies = work[-1]
+        for dependency in dependencies:
+            if dependency not in placed:
+                placed.add(dependency)
+                work.append((dependency, iter(graph.dependencies(dependency))))
+                break
+        else:
+            work.pop()
+            order.append(name)
+    return order[first:]
+
+
+def _refine(order, graph, chunk, loads, max_resources):
+    """Move resources to the chunk most of their neighbours are in, keeping
+    dependencies in the same or earlier chunks. Returns whether anything
+    moved."""
+    moved = False
+    for name in order:
+        dependencies = graph.dependencies(name)
+        dependents = graph.dependents(name)
+        lowest = max([chunk[d] for d in dependencies] or [0])
+        highest = min([chunk[d] for d in dependents] or [len(loads) - 1])
+        counts = defaultdict(int)
+        for neighbour in dependencies + dependents:
+            counts[chunk[neighbour]] += 1
+        current = chunk[name]
+        best, best_count = current, counts[current]
+        for candidate, count in counts.items():
+            if (count > best_count and lowest <= candidate <= highest
+                    and loads[candidate] < max_resources):
+                best, best_count = candidate, count
+        if best != current:
+            loads[current] -= 1
+            loads[best] += 1
+            chunk[name] = best
+            moved = True
+    return moved
+
+
+_non_alphanumeric = re.compile('[^A-Za-z0-9]')
+
+
+class _Builder(object):
+    """Builds the child and parent templates, rewriting references which
+    cross between children"""
+
+    def __init__(self, stack, assignment):
+        self.stack = stack
+        self.assignment = assignment
+        self.parameters = getattr(stack, 'Parameters', {})
+        self.children = {}
+        # child name -> {parameter name: value in the parent}
+        self.child_parameters = defaultdict(dict)
+        # child name -> names of the children it has to wait for
+        self.child_depends_on = defaultdict(set)
+        # (resource, attribute or None) -> output name
+        self.exports = {}
+        self.taken_names = set(stack.resources) | set(self.parameters)
+        self.mappings = resolve_references(getattr(stack, 'Mappings', None) or {})
+        self.conditions = resolve_references(getattr(stack, 'Conditions', None) or {})
+
+    def add_child(self, name, members):
+        resources = {}
+        for resource_name in members:
+            resource = self.stack.resources[resource_name]
+            template = resource.to_json()
+            dependencies = resource.dependencies()
+            if any(self._outside(d, name) for d in dependencies):
+                template = self._rewrite(template, name)
+                self._rewrite_depends_on(template, name)
+            else:
+                # nothing to rewrite, only parameters to pass on
+                for parameter in dependencies:
+                    if parameter in self.parameters:
+                        self.child_parameters[name][parameter] = {'Ref': parameter}
+            resources[resource_name] = template
+        child = self.children[name] = {
+            'AWSTemplateFormatVersion': '2010-09-09',
+            'Resources': resources,
+        }
+        if self.conditions or self.mappings:
+            self._add_conditions_and_mappings(name, child)
+
+    def _add_conditions_and_mappings(self, name, child):
+        """Copy the Conditions and Mappings the resources of child use, and
+        pass on the parameters the Conditions refer to"""
+        conditions = set()
+        mappings = set()
+        _collect_conditions_and_mappings(child['Resources'], conditions, mappings)
+        pending = [c for c in conditions if c in self.conditions]
+        used = set(pending)
+        while pending:
+            definition = self.conditions[pending.pop()]
+            nested = set()
+            _collect_conditions_and_mappings(definition, nested, mappings)
+            for condition in nested:
+                if condition in self.conditions and condition not in used:
+                    used.add(condition)
+                    pending.append(condition)
+            references = set()
+            _collect_references(definition, references)
+            for parameter in references:
+                if parameter in self.parameters:
+                    self.child_parameters[name][parameter] = {'Ref': parameter}
+        if used:
+            child['Conditions'] = dict((c, self.conditions[c]) for c in used)
+        if None in mappings:
+            # a map name which is only known when the stack is created
+            mappings = set(self.mappings)
+        mappings &= set(self.mappings)
+        if mappings:
+            child['Mappings'] = dict((m, self.mappings[m]) for m in mappings)
+
+    def parent(self, names, template_url):
+        # the outputs of a child are only known after all children are built
+        for name in names:
+            child = self.children[name]
+            parameters = self.child_parameters[name]
+            if parameters:
+                child['Parameters'] = dict(
+                    (p, dict(self.parameters[p]) if p in self.parameters else {'Type': 'String'})
+                    for p in parameters)
+        resources = {}
+        for name in names:
+            properties = {'TemplateURL': template_url(name=name)}
+            if self.child_parameters[name]:
+                properties['Parameters'] = self.child_parameters[name]
+            resources[name] = {'Type': 'AWS::CloudFormation::Stack',
+                               'Properties': properties}
+            if self.child_depends_on[name]:
+                resources[name]['DependsOn'] = sorted(self.child_depends_on[name])
+
+        template = {'AWSTemplateFormatVersion': '2010-09-09',
+                    'Resources': resources}
+        description = getattr(self.stack, 'Description', None)
+        if description:
+            template['Description'] = description
+        # the Outputs of the parent may use any of them
+        if self.conditions:
+            template['Conditions'] = self.conditions
+        if self.mappings:
+            template['Mappings'] = self.mappings
+        if self.parameters:
+            template['Parameters'] = dict((k, dict(v)) for k, v in self.parameters.items())
+        outputs = getattr(self.stack, 'Outputs', None)
+        if outputs:
+            template['Outputs'] = self._rewrite(resolve_references(outputs), None)
+        return template
+
+    def _rewrite(self, o, child):
+        """Replace references to resources outside child; child None means
+        the parent, where all resources are outside"""
+        if isinstance(o, dict):
+            if len(o) == 1 and isinstance(o.get('Ref'), basestring):
+                target = o['Ref']
+                if target in self.parameters and child is not None:
+                    self.child_parameters[child][target] = {'Ref': target}
+                elif self._outside(target, child):
+                    return self._import(target, None, child)
+                return dict(o)
+            get_att = o.get('Fn::GetAtt')
+            if (len(o) == 1 and isinstance(get_att, list) and len(get_att) == 2
+                    and self._outside(get_att[0], child)):
+                return self._import(get_att[0], get_att[1], child)
+            return dict((k, self._rewrite(v, child)) for k, v in o.items())
+        if isinstance(o, list):
+            return [self._rewrite(v, child) for v in o]
+        return o
+
+    def _outside(self, resource_name, child):
+        return (resource_name in self.assignment
+                and self.assignment[resource_name] != child)
+
+    def _import(self, resource_name, attribute, child):
+        source = self.assignment[resource_name]
+        output = self._export(resource_name, attribute)
+        value = {'Fn::GetAtt': [source, 'Outputs.' + output]}
+        if child is None:
+            return value
+        self.child_parameters[child][output] = value
+        return {'Ref': output}
+
+    def _export(self, resource_name, attribute):
+        key = (resource_name, attribute)
+        if key not in self.exports:
+            if attribute is None:
+                # a parameter named like the resource, so Refs stay the same
+                output = resource_name
+                value = {'Ref': resource_name}
+            else:
+                output = self._unique_name(
+                    _non_alphanumeric.sub('', resource_name + attribute))
+                value = {'Fn::GetAtt': [resource_name, attribute]}
+            self.exports[key] = output
+            child = self.children[self.assignment[resource_name]]
+            child.setdefault('Outputs', {})[output] = {'Value': value}
+        return self.exports[key]
+
+    def _unique_name(self, name):
+        unique, i = name, 1
+        while unique in self.taken_names:
+            unique = '{0}{1}'.format(name, i)
+            i += 1
+        self.taken_names.add(unique)
+        return unique
+
+    def _rewrite_depends_on(self, template, child):
+        depends_on = template.get('DependsOn')
+        if depends_on is None:
+            return
+        names = depends_on if isinstance(depends_on, list) else [depends_on]
+        inside = []
+        for name in names:
+            if self._outside(name, child):
+                self.child_depends_on[child].add(self.assignment[name])
+            else:
+                inside.append(name)
+        if not inside:
+            del template['DependsOn']
+        elif isinstance(depends_on, list):
+            template['DependsOn'] = inside
+
+
+def _collect_conditions_and_mappings(o, conditions, mappings):
+    """Add the names of the conditions and mappings used in a resolved
+    template; None stands for a mapping name which is no string"""
+    if isinstance(o, dict):
+        condition = o.get('Condition')
+        if isinstance(condition, basestring):
+            # the Condition of a resource or output, or a condition in a condition
+            conditions.add(condition)
+        if_arguments = o.get('Fn::If')
+        if isinstance(if_arguments, list) and if_arguments:
+            if isinstance(if_arguments[0], basestring):
+                conditions.add(if_arguments[0])
+        find_in_map = o.get('Fn::FindInMap')
+        if isinstance(find_in_map, list) and find_in_map:
+            mappings.add(find_in_map[0] if isinstance(find_in_map[0], basestring) else None)
+        for value in o.values():
+            if isinstance(value, (dict, list)):
+                _collect_conditions_and_mappings(value, conditions, mappings)
+    elif isinstance(o, list):
+        for value in o:
+            if isinstance(value, (dict, list)):
+                _collect_conditions_and_mappings(value, conditions, mappings)
+
@@ -0,0 +1,254 @@
+# -*- encoding: utf-8 -*-
+"""Render stacks and validate the templates concurrently
+
+    for result in validate_stacks(['stacks/web.py', 'stacks/db.py'],
+                                  HTTPBackend('http://localhost:8080/validate')):
+        print result.name, result.problems or result.error or 'ok'
+
+One thread renders the stacks one after the other while ``concurrency``
+workers send the rendered templates to a backend, so rendering and waiting
+for the backend overlap. Results are yielded as soon as they are known, in
+no particular order. Backends have a ``validate(template)`` method which
+returns a list of problems and raises TransientError for failures worth
+retrying; the workers retry those with exponential backoff.
+
+LocalBackend checks the references of templates with cfn.validation.
+HTTPBackend posts templates to an endpoint speaking a small JSON protocol,
+and make_server() serves any backend with that protocol, e.g. as a local
+stand-in for tests:
+
+    POST <path>, the template as body
+    200 {"problems": ["Resources.Node.Properties.SubnetId: Ref of unknown ...", ...]}
+    429 or 5xx: try again
+
+    python -m cfn.pipeline --endpoint http://localhost:8080/ stacks/*.py
+    python -m cfn.pipeline --serve 8080
+"""
+import argparse
+import httplib
+import json
+import sys
+import threading
+import time
+import traceback
+import urlparse
+from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from collections import namedtuple
+from Queue import Queue
+from SocketServer import ThreadingMixIn
+
+from cfn.core import to_json
+from cfn.render import factory_name, load_stack
+
+# error is the traceback of rendering or the last error of the backend,
+# attempts is the number of times the template was sent to the backend
+ValidationResult = namedtuple('ValidationResult', 'name problems error attempts seconds')
+
+
+class TransientError(Exception):
+    """A failure of a backend which may go away when trying again"""
+
+
+def validate_stacks(stacks, backend=None, concurrency=4, retries=2, backoff=0.5,
+                    compact=True):
+    """Render stacks and validate them with backend, yielding ValidationResults.
+
+    stacks are stack factories, see cfn.render, or (name, stack) pairs. The
+    backend defaults to LocalBackend. A template is sent again at most
+    ``retries`` times, after waiting ``backoff`` seconds, then twice as long
+    and so on. At most ``concurrency`` rendered templates wait for a worker.
+    """
+    if backend is None:
+        backend = LocalBackend()
+    jobs = Queue(concurrency)
+    results = Queue()
+
+    def render():
+        try:
+            for item in stacks:
+                start = time.time()
+                name = repr(item)
+                try:
+                    if isinstance(item, tuple):
+                        name, stack = item
+                    else:
+                        name = factory_name(item)
+                        stack = load_stack(item)
+                    template = to_json(stack, compact)
+                except Exception:
+                    # also for items which are no stack factories; name
+                    # stays their repr if it can not be found out
+                    results.put(ValidationResult(name, None, traceback.format_exc(), 0,
+                                                 time.time() - start))
+                else:
+                    jobs.put((name, template, start))
+        finally:
+            for _ in workers:
+                jobs.put(None)
+
+    def work():
+        while True:
+            job = jobs.get()
+            if job is None:
+                results.put(None)
+                return
+            results.put(_validate(backend, job, retries, backoff))
+
+    workers = [threading.Thread(target=work) for _ in range(concurrency)]
+    threads = workers + [threading.Thread(target=render)]
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+    running = len(workers)
+    while running:
+        result = results.get()
+        if result is None:
+            running -= 1
+        else:
+            yield result
+    for thread in threads:
+        thread.join()
+
+
+def _validate(backend, job, retries, backoff):
+    name, template, start = job
+    attempts = 0
+    while True:
+        attempts += 1
+        try:
+            problems = backend.validate(template)
+        except TransientError:
+            if attempts > retries:
+                return ValidationResult(name, None, traceback.format_exc(), attempts,
+                                        time.time() - start)
+            time.sleep(backoff * 2 ** (attempts - 1))
+        except Exception:
+            return ValidationResult(name, None, traceback.format_exc(), attempts,
+                                    time.time() - start)
+        else:
+            return ValidationResult(name, problems, None, attempts, time.time() - start)
+
+
+class LocalBackend(object):
+    """Checks the references of templates, see cfn.validation"""
+
+    def validate(self, template):
+        from cfn.loader import loads
+        from cfn.validation import find_problems
+        return ['{0}: {1}'.format(path, message)
+                for path, message in find_problems(loads(template))]
+
+
+class HTTPBackend(object):
+    """Posts templates to an endpoint, see the module documentation.
+
+    Every thread keeps its own connection open between templates.
+    """
+
+    def __init__(self, url, timeout=30):
+        parts = urlparse.urlsplit(url)
+        if parts.scheme not in ('http', 'https'):
+            raise ValueError('Unsupported URL {0}'.format(url))
+        self.url = url
+        self.timeout = timeout
+        self._connection_class = (httplib.HTTPSConnection if parts.scheme == 'https'
+                                  else httplib.HTTPConnection)
+        self._host = parts.netloc
+        self._path = parts.path or '/'
+        if parts.query:
+            self._path += '?' + parts.query
+        self._local = threading.local()
+
+    def validate(self, template):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = self._local.connection = self._connection_class(
+                self._host, timeout=self.timeout)
+        try:
+            connection.request('POST', self._path, template,
+                               {'Content-Type': 'application/json'})
+            response = connection.getresponse()
+            body = response.read()
+        except (httplib.HTTPException, IOError) as error:
+            # the server may have closed a kept connection
+            connection.close()
+            self._local.connection = None
+            raise TransientError(str(error))
+        if response.status == 429 or response.status >= 500:
+            raise TransientError('{0} {1}'.format(response.status, response.reason))
+        if response.status != 200:
+            raise ValueError('{0} {1}: {2}'.format(response.status, response.reason, body))
+        return json.loads(body)['problems']
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        template = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        try:
+            problems = self.server.backend.validate(template)
+        except TransientError as error:
+            self._respond(503, {'error': str(error)})
+        except ValueError as error:
+            # also raised for templates which are no JSON
+            self._respond(400, {'error': str(error)})
+        else:
+            self._respond(200, {'problems': problems})
+
+    def _respond(self, status, document):
+        body = json.dumps(document)
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+def make_server(address=('127.0.0.1', 0), backend=None):
+    """An HTTP server validating templates with backend, by default a
+    LocalBackend. Port 0 picks a free port, see server_address."""
+    server = _Server(address, _Handler)
+    server.backend = backend if backend is not None else LocalBackend()
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Render stacks and validate their templates')
+    parser.add_argument('factories', nargs='*', metavar='FACTORY',
+                        help='path/to/module.py[:variable] or package.module:variable')
+    parser.add_argument('--endpoint', default=None,
+                        help='URL to post the templates to (default: validate locally)')
+    parser.add_argument('-j', '--concurrency', type=int, default=4,
+                        help='number of templates validated at once')
+    parser.add_argument('--retries', type=int, default=2)
+    parser.add_argument('--serve', type=int, metavar='PORT', default=None,
+                        help='validate templates posted to this port instead')
+    args = parser.parse_args(argv)
+
+    if args.serve is not None:
+        make_server(('', args.serve)).serve_forever()
+        return 0
+    backend = HTTPBackend(args.endpoint) if args.endpoint else None
+    failed = 0
+    for result in validate_stacks(args.factories, backend, args.concurrency, args.retries):
+        if result.error or result.problems:
+            failed += 1
+            sys.stderr.write('FAILED {0} ({1:.3f}s)\n{2}\n'.format(
+                result.name, result.seconds,
+                result.error or '\n'.join(result.problems)))
+        else:
+            sys.stdout.write('{0:.3f}s {1} ok\n'.format(result.seconds, result.name))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
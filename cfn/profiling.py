@@ -0,0 +1,244 @@
+# -*- encoding: utf-8 -*-
+"""Opt-in profiling of template rendering
+
+    with Profiler() as profiler:
+        to_json(stack)
+    print profiler.format_report()
+    with open('render.folded', 'w') as output:
+        profiler.write_collapsed(output)  # input for flamegraph.pl
+
+While a Profiler is running, the serializer and the to_json methods of all
+resources and properties are replaced by wrappers, like cfn.tracing does,
+so rendering costs nothing extra otherwise. Every resource, property, other
+object with a to_json method (e.g. Facts) and string whose references are
+resolved is a frame, and each frame records its time, objects and output
+bytes. Resources are two frames, their type and their name, so flame graphs
+group them by type.
+
+Python 2 can not trace allocations, so ``objects`` counts the objects
+tracked by the garbage collector which were created during a frame and
+still exist at its end. The collector is off while profiling. Output bytes
+are only known for templates rendered by to_json, iter_json and dump_json
+of cfn.core, not for the results of the to_json methods.
+"""
+import gc
+import json
+import sys
+import time
+from functools import wraps
+
+import cfn.core
+from cfn.core import Resource, ResourceCollection, Property, _ResourceTemplate
+
+ROOT = 'render'
+STRING_FRAME = 'resolve_references_in_string'
+MEASURES = ('seconds', 'objects', 'bytes')
+
+
+class Profiler(object):
+    """Costs of rendering, per frame, resource and resource type
+
+    ``frames`` maps paths of frame names to the calls and the time, objects
+    and bytes of the frame without its children. ``resources`` and ``types``
+    include the children.
+    """
+
+    _active = None
+
+    def __init__(self):
+        self.frames = {}
+        self.resources = {}
+        self.types = {}
+        self.seconds = 0.0
+        self._stack = []
+        self._patches = []
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def start(self):
+        if Profiler._active is not None:
+            raise RuntimeError('Another Profiler is running')
+        Profiler._active = self
+        self._gc_enabled = gc.isenabled()
+        gc.disable()
+        self._patch()
+        self._enter((ROOT,))
+
+    def stop(self):
+        if Profiler._active is not self:
+            return
+        # the output outside of all frames is not known
+        self._exit(self._stack[-1][5])
+        self._unpatch()
+        if self._gc_enabled:
+            gc.enable()
+        Profiler._active = None
+
+    def _enter(self, names, resource=None):
+        path = self._stack[-1][0] + names if self._stack else names
+        # path, start, child seconds, start objects, child objects, child bytes, resource
+        self._stack.append([path, time.time(), 0.0, gc.get_count()[0], 0, 0, resource])
+
+    def _exit(self, size):
+        path, start, child_seconds, start_objects, child_objects, child_bytes, resource = \
+            self._stack.pop()
+        seconds = time.time() - start
+        objects = gc.get_count()[0] - start_objects
+        if self._stack:
+            parent = self._stack[-1]
+            parent[2] += seconds
+            parent[4] += objects
+            parent[5] += size
+        else:
+            self.seconds += seconds
+        stats = self.frames.setdefault(path, [0, 0.0, 0, 0])
+        stats[0] += 1
+        stats[1] += seconds - child_seconds
+        stats[2] += objects - child_objects
+        stats[3] += size - child_bytes
+        if resource is not None:
+            for totals, key in ((self.resources, resource.name), (self.types, resource.type())):
+                stats = totals.setdefault(key, [0, 0.0, 0, 0])
+                stats[0] += 1
+                stats[1] += seconds
+                stats[2] += objects
+                stats[3] += size
+
+    def report(self, by='types'):
+        """Return ``{name: (calls, seconds, objects, bytes)}`` of the
+        resource types, or the resources with by='resources'"""
+        return dict((k, tuple(v)) for k, v in getattr(self, by).items())
+
+    def format_report(self, by='types', count=20):
+        lines = ['{0:>8} {1:>10} {2:>10} {3:>10}  {4}'.format(
+            'calls', 'seconds', 'objects', 'bytes', by[:-1])]
+        rows = sorted(self.report(by).items(), key=lambda item: -item[1][1])[:count]
+        lines.extend('{1:>8} {2:>10.4f} {3:>10} {4:>10}  {0}'.format(name, *stats)
+                     for name, stats in rows)
+        return '\n'.join(lines)
+
+    def collapsed(self, measure='seconds'):
+        """Lines of ``frame;frame;frame value`` for flame graph tools,
+        seconds are given in microseconds"""
+        index = MEASURES.index(measure) + 1
+        lines = []
+        for path, stats in sorted(self.frames.items()):
+            value = stats[index]
+            if measure == 'seconds':
+                value = int(round(value * 1000000))
+            if value > 0:
+                lines.append('{0} {1}'.format(';'.join(path), value))
+        return lines
+
+    def write_collapsed(self, fp, measure='seconds'):
+        for line in self.collapsed(measure):
+            fp.write(line + '\n')
+
+    def summary(self):
+        def stats(values):
+            return dict(zip(('calls',) + MEASURES, values))
+        return {
+            'seconds': self.seconds,
+            'types': dict((k, stats(v)) for k, v in self.types.items()),
+            'resources': dict((k, stats(v)) for k, v in self.resources.items()),
+            'frames': [dict(stats(v), stack=list(path))
+                       for path, v in sorted(self.frames.items())],
+        }
+
+    def write_summary(self, fp):
+        json.dump(self.summary(), fp, indent=2, sort_keys=True)
+
+    def _patch(self):
+        iter_json = cfn.core._iter_json
+        resolve_string = cfn.core.resolve_references_in_string
+        self._patch_modules(iter_json, _profiled_iter_json(self, iter_json))
+        self._patch_modules(resolve_string, _profiled_resolve_string(self, resolve_string))
+        for cls in _subclasses(Resource) + _subclasses(Property):
+            if 'to_json' in cls.__dict__:
+                original = cls.__dict__['to_json']
+                self._patches.append((cls, 'to_json', original))
+                type.__setattr__(cls, 'to_json', _profiled_to_json(self, original))
+
+    def _patch_modules(self, original, wrapper):
+        # modules which imported the function by name, like cfn.size
+        for module in list(sys.modules.values()):
+            if module is None or not module.__name__.startswith('cfn'):
+                continue
+            for name, value in vars(module).items():
+                if value is original:
+                    self._patches.append((module, name, original))
+                    setattr(module, name, wrapper)
+
+    def _unpatch(self):
+        for owner, name, original in reversed(self._patches):
+            if isinstance(owner, type):
+                type.__setattr__(owner, name, original)
+            else:
+                setattr(owner, name, original)
+        self._patches = []
+
+
+def _subclasses(cls):
+    result = [cls]
+    for subclass in type.__subclasses__(cls):
+        result.extend(c for c in _subclasses(subclass) if c not in result)
+    return result
+
+
+def _frame(o):
+    """The frame names and resource of an object the serializer reaches"""
+    if type(o) is _ResourceTemplate:
+        return (o.resource.type(), o.resource.name), o.resource
+    if isinstance(o, Resource):
+        return (o.type(), o.name), o
+    if isinstance(o, Property):
+        return (o.name or type(o).__name__,), None
+    return (type(o).__name__,), None
+
+
+def _profiled_iter_json(profiler, iter_json):
+    def profiled(o, level, resolve, refs=None):
+        if (not resolve or hasattr(o, 'ref') or not hasattr(o, 'to_json')
+                or isinstance(o, ResourceCollection)):
+            for chunk in iter_json(o, level, resolve, refs):
+                yield chunk
+            return
+        names, resource = _frame(o)
+        profiler._enter(names, resource)
+        text = ''
+        try:
+            text = ''.join(iter_json(o, level, resolve, refs))
+        finally:
+            profiler._exit(len(text))
+        yield text
+    return profiled
+
+
+def _profiled_resolve_string(profiler, resolve_string):
+    @wraps(resolve_string)
+    def profiled(a_string):
+        profiler._enter((STRING_FRAME,))
+        try:
+            return resolve_string(a_string)
+        finally:
+            profiler._exit(0)
+    return profiled
+
+
+def _profiled_to_json(profiler, to_json):
+    @wraps(to_json)
+    def profiled(self):
+        names, resource = _frame(self)
+        profiler._enter(names, resource)
+        try:
+            return to_json(self)
+        finally:
+            profiler._exit(0)
+    # keeps the serializer's shortcut for templates, see cfn.core._unresolved_json
+    profiled.__wrapped__ = getattr(to_json, '__wrapped__', to_json)
+    return profiled
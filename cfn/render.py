@@ -0,0 +1,216 @@
+# -*- encoding: utf-8 -*-
+"""Render many stacks at once, spread over a pool of processes
+
+A stack factory is either a callable returning a stack, or a string naming
+where to find one:
+
+    path/to/template.py         the module level variable ``stack``
+    path/to/template.py:name    the module level variable or callable ``name``
+    package.module:name         the same, for an importable module
+
+Every stack is written to ``<output directory>/<factory name>.json``; the
+file only appears once the stack is rendered completely. Factories with the
+same name are rejected. Failing factories are reported and do not stop the
+rest of the batch.
+
+    python -m cfn.render -o out/ -j 4 stacks/*.py
+"""
+import argparse
+import cPickle
+import imp
+import importlib
+import os
+import sys
+import time
+import traceback
+from collections import namedtuple
+from multiprocessing import Pool
+
+from cfn import fragments, profiling, size
+from cfn.core import dump_json
+
+DEFAULT_VARIABLE = 'stack'
+
+RenderResult = namedtuple('RenderResult', 'factory path seconds error')
+
+
+def render_stacks(factories, output_dir, processes=None, compact=False,
+                  budget=None, fragment_cache=None, profile=False):
+    """Render all factories into output_dir, yielding RenderResults.
+
+    Results are yielded as soon as each stack is written, in no particular
+    order. With ``processes=1`` everything runs in the current process,
+    otherwise a pool of ``processes`` workers is used (by default one per
+    CPU). Stacks larger than ``budget`` bytes fail, see cfn.size. Rendered
+    resources are shared through the ``fragment_cache`` directory, see
+    cfn.fragments. With ``profile`` the costs of rendering each stack are
+    written next to it, to ``<name>.folded`` for flame graphs and to
+    ``<name>.profile.json``, see cfn.profiling.
+    """
+    factories = list(factories)
+    _check_names(factories)
+    jobs = [(factory, os.path.join(output_dir, factory_name(factory) + '.json'),
+             compact, budget, fragment_cache, profile)
+            for factory in factories]
+    if processes == 1:
+        for job in jobs:
+            yield _render(job)
+        return
+    # factories which can not be sent to a worker, e.g. lambdas, fail alone
+    # instead of breaking the pool
+    picklable = []
+    for job in jobs:
+        try:
+            cPickle.dumps(job, cPickle.HIGHEST_PROTOCOL)
+        except Exception:
+            yield RenderResult(factory_name(job[0]), None, 0, traceback.format_exc())
+        else:
+            picklable.append(job)
+    pool = Pool(processes)
+    try:
+        for result in pool.imap_unordered(_render, picklable):
+            yield result
+    finally:
+        pool.close()
+        pool.join()
+
+
+def _check_names(factories):
+    """Raise ValueError for factories which would write the same file"""
+    by_name = {}
+    for factory in factories:
+        by_name.setdefault(factory_name(factory), []).append(factory)
+    duplicates = sorted((name, same) for name, same in by_name.items() if len(same) > 1)
+    if duplicates:
+        raise ValueError('Factories with the same name: ' + '; '.join(
+            '{0} ({1})'.format(name, ', '.join(_describe(f) for f in same))
+            for name, same in duplicates))
+
+
+def _describe(factory):
+    if callable(factory):
+        return '{0}.{1}'.format(getattr(factory, '__module__', '?'), factory_name(factory))
+    return factory
+
+
+def factory_name(factory):
+    if callable(factory):
+        return factory.__name__
+    location, _, variable = factory.partition(':')
+    if location.endswith('.py'):
+        name = os.path.splitext(os.path.basename(location))[0]
+    else:
+        name = location
+    if variable:
+        name += '-' + variable
+    return name
+
+
+def load_stack(factory):
+    if callable(factory):
+        return factory()
+    location, _, variable = factory.partition(':')
+    if location.endswith('.py'):
+        # load as a real module, runpy would clear its globals afterwards
+        module_name = '_cfn_render_' + factory_name(location)
+        namespace = vars(imp.load_source(module_name, location))
+    else:
+        namespace = vars(importlib.import_module(location))
+    stack = namespace[variable or DEFAULT_VARIABLE]
+    if callable(stack):
+        stack = stack()
+    return stack
+
+
+def _render(job):
+    factory, path, compact, budget, fragment_cache, profile = job
+    start = time.time()
+    try:
+        stack = load_stack(factory)
+        if fragment_cache is not None:
+            stack.fragment_cache = _fragment_cache(fragment_cache)
+        if profile:
+            with profiling.Profiler() as profiler:
+                _write(stack, path, compact, budget)
+            base = os.path.splitext(path)[0]
+            with open(base + '.folded', 'w') as output:
+                profiler.write_collapsed(output)
+            with open(base + '.profile.json', 'w') as output:
+                profiler.write_summary(output)
+        else:
+            _write(stack, path, compact, budget)
+    except Exception:
+        return RenderResult(factory_name(factory), None,
+                            time.time() - start, traceback.format_exc())
+    return RenderResult(factory_name(factory), path, time.time() - start, None)
+
+
+def _write(stack, path, compact, budget):
+    # write next to path and rename, so a stack failing halfway leaves no
+    # truncated template behind
+    directory, name = os.path.split(path)
+    temporary = os.path.join(directory, '.{0}.{1}.tmp'.format(name, os.getpid()))
+    try:
+        with open(temporary, 'w') as output:
+            if budget is None:
+                dump_json(stack, output, compact)
+            else:
+                # check the size before writing anything
+                output.write(size.render(stack, budget, compact))
+        os.rename(temporary, path)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+
+
+_fragment_caches = {}
+
+
+def _fragment_cache(directory):
+    # one per directory and process, so the index is only read once
+    if directory not in _fragment_caches:
+        _fragment_caches[directory] = fragments.FragmentCache(directory)
+    return _fragment_caches[directory]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Render CloudFormation templates from stack factories')
+    parser.add_argument('factories', nargs='+', metavar='FACTORY',
+                        help='path/to/module.py[:variable] or '
+                             'package.module:variable')
+    parser.add_argument('-o', '--output-dir', default='.',
+                        help='directory to write the templates to')
+    parser.add_argument('-j', '--processes', type=int, default=None,
+                        help='number of worker processes (default: one per CPU)')
+    parser.add_argument('-c', '--compact', action='store_true',
+                        help='write templates without whitespace')
+    parser.add_argument('-b', '--budget', type=int, default=None,
+                        help='fail for templates larger than this many bytes')
+    parser.add_argument('--fragment-cache', metavar='DIRECTORY', default=None,
+                        help='reuse rendered resources from this directory')
+    parser.add_argument('--profile', action='store_true',
+                        help='write the costs of rendering next to each template')
+    args = parser.parse_args(argv)
+
+    try:
+        _check_names(args.factories)
+    except ValueError as error:
+        parser.error(str(error))
+    failed = 0
+    for result in render_stacks(args.factories, args.output_dir,
+                                args.processes, args.compact, args.budget,
+                                args.fragment_cache, args.profile):
+        if result.error:
+            failed += 1
+            sys.stderr.write('FAILED {0} ({1:.3f}s)\n{2}'.format(
+                result.factory, result.seconds, result.error))
+        else:
+            sys.stdout.write('{0:.3f}s {1} -> {2}\n'.format(
+                result.seconds, result.factory, result.path))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
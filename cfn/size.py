@@ -0,0 +1,98 @@
+# -*- encoding: utf-8 -*-
+"""Template size accounting
+
+CloudFormation limits the size of a template body, and pretty printed
+templates spend a lot of it on whitespace. render() produces compact output
+by default, and refuses templates which are still over budget, naming the
+sections and resources which take up the most space:
+
+    template = render(stack, budget=TEMPLATE_BODY_LIMIT)
+"""
+from operator import itemgetter
+
+from cfn.core import _iter_json, _layout, _encode_key, _unresolved_json
+
+# bytes, for templates passed in the request body
+TEMPLATE_BODY_LIMIT = 51200
+# bytes, for templates uploaded to S3
+TEMPLATE_URL_LIMIT = 460800
+
+
+class TemplateSize(object):
+    """A rendered template and the bytes taken up by its parts
+
+    ``sections`` maps top level keys and ``resources`` maps resource names to
+    the bytes of their ``"key": value`` entries.
+    """
+
+    def __init__(self, text, sections, resources):
+        self.text = text
+        self.sections = sections
+        self.resources = resources
+
+    @property
+    def total(self):
+        return len(self.text)
+
+    def largest_resources(self, count=10):
+        return sorted(self.resources.items(), key=itemgetter(1), reverse=True)[:count]
+
+    def largest_sections(self, count=10):
+        return sorted(self.sections.items(), key=itemgetter(1), reverse=True)[:count]
+
+
+class TemplateTooLargeError(ValueError):
+    def __init__(self, size, budget):
+        lines = ['Template is {0} bytes, {1} more than the budget of {2} bytes'.format(
+            size.total, size.total - budget, budget)]
+        lines.append('Largest sections:')
+        lines.extend('  {0}: {1} bytes'.format(*s) for s in size.largest_sections(5))
+        if size.resources:
+            lines.append('Largest resources:')
+            lines.extend('  {0}: {1} bytes'.format(*r) for r in size.largest_resources())
+        ValueError.__init__(self, '\n'.join(lines))
+        self.size = size
+        self.budget = budget
+
+
+def measure(stack, compact=True):
+    """Render a stack once, recording the size of every section and
+    resource. The text is the same as ``to_json(stack, compact)``."""
+    template = _unresolved_json(stack)
+    opening, separator, closing, key_separator, level = _layout(None if compact else 0)
+    sections = {}
+    resources = {}
+    parts = []
+    for key, value in sorted(template.items(), key=itemgetter(0)):
+        if key == 'Resources' and isinstance(value, dict) and value:
+            value_text = _render_resources(value, level, resources)
+        else:
+            value_text = ''.join(_iter_json(value, level, True))
+        part = _encode_key(key) + key_separator + value_text
+        sections[key] = len(part)
+        parts.append(part)
+    if parts:
+        text = '{' + opening + separator.join(parts) + closing + '}'
+    else:
+        text = '{}'
+    return TemplateSize(text, sections, resources)
+
+
+def _render_resources(resources, level, sizes):
+    opening, separator, closing, key_separator, item_level = _layout(level)
+    parts = []
+    for name, resource in sorted(resources.items(), key=itemgetter(0)):
+        part = (_encode_key(name) + key_separator
+                + ''.join(_iter_json(resource, item_level, True)))
+        sizes[name] = len(part)
+        parts.append(part)
+    return '{' + opening + separator.join(parts) + closing + '}'
+
+
+def render(stack, budget=TEMPLATE_BODY_LIMIT, compact=True):
+    """Return the template text, raising TemplateTooLargeError if it is
+    larger than budget bytes"""
+    size = measure(stack, compact)
+    if budget is not None and size.total > budget:
+        raise TemplateTooLargeError(size, budget)
+    return size.text
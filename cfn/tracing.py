@@ -0,0 +1,142 @@
+# -*- encoding: utf-8 -*-
+"""Opt-in call tracing for the hot paths of cfn.core
+
+Functions decorated with ``traced`` are left untouched until tracing is
+switched on, so they cost nothing while it is off. ``enable()`` (or setting
+the ``CFN_TRACE`` environment variable before importing cfn.core) replaces
+them with wrappers which log every call and count calls and time per
+function. ``disable()`` puts the original functions back.
+
+    from cfn import tracing
+    tracing.enable()
+    to_json(stack)
+    print tracing.format_report()
+"""
+import logging
+import os
+import sys
+import time
+from functools import wraps
+
+ENVIRONMENT_VARIABLE = 'CFN_TRACE'
+
+# original functions, in order of decoration
+_functions = []
+# original function -> [calls, seconds]
+_stats = {}
+# original function -> [(namespace owner, attribute name)]
+_owners = {}
+_enabled = False
+
+
+def traced(func):
+    """Mark a module level function or a method as traced"""
+    _functions.append(func)
+    _stats[func] = [0, 0.0]
+    return func
+
+
+def is_enabled():
+    return _enabled
+
+
+def enable():
+    """Replace all traced functions with logging and timing wrappers"""
+    global _enabled
+    if _enabled:
+        return
+    for func in _functions:
+        wrapper = _wrap(func)
+        for owner, name in _find_owners(func):
+            _set(owner, name, wrapper)
+    _enabled = True
+
+
+def disable():
+    """Put the original traced functions back"""
+    global _enabled
+    if not _enabled:
+        return
+    for func in _functions:
+        for owner, name in _find_owners(func):
+            _set(owner, name, func)
+    _enabled = False
+
+
+def enable_from_environment():
+    if os.environ.get(ENVIRONMENT_VARIABLE):
+        enable()
+
+
+def reset():
+    for stats in _stats.values():
+        stats[:] = [0, 0.0]
+
+
+def report():
+    """Return ``{function name: (calls, seconds)}`` for all called functions.
+
+    Times are inclusive, so recursive functions like resolve_references count
+    the time of nested calls more than once.
+    """
+    result = {}
+    for func in _functions:
+        calls, seconds = _stats[func]
+        if calls:
+            result[_qualified_name(func)] = (calls, seconds)
+    return result
+
+
+def format_report():
+    lines = ['{0:>10} {1:>10}  {2}'.format('calls', 'seconds', 'function')]
+    for name, (calls, seconds) in sorted(report().items(),
+                                         key=lambda item: -item[1][1]):
+        lines.append('{0:>10} {1:>10.4f}  {2}'.format(calls, seconds, name))
+    return '\n'.join(lines)
+
+
+def _wrap(func):
+    stats = _stats[func]
+
+    @wraps(func)
+    def log(*args, **kwargs):
+        logging.debug('calling %s with %s', func.__name__, (args, kwargs))
+        start = time.time()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            stats[0] += 1
+            stats[1] += time.time() - start
+
+    log.__wrapped__ = func
+    return log
+
+
+def _find_owners(func):
+    """Find the module and classes which hold func under some name"""
+    if func not in _owners:
+        module = sys.modules[func.__module__]
+        namespaces = [module]
+        namespaces.extend(value for value in vars(module).values()
+                          if isinstance(value, type)
+                          and value.__module__ == module.__name__)
+        _owners[func] = [(owner, name)
+                         for owner in namespaces
+                         for name, value in vars(owner).items()
+                         if getattr(value, '__wrapped__', value) is func]
+    return _owners[func]
+
+
+def _set(owner, name, value):
+    if isinstance(owner, type):
+        # bypass metaclasses which intercept attribute assignment
+        type.__setattr__(owner, name, value)
+    else:
+        setattr(owner, name, value)
+
+
+def _qualified_name(func):
+    for owner, name in _find_owners(func):
+        if isinstance(owner, type):
+            return '{0}.{1}.{2}'.format(owner.__module__, owner.__name__, name)
+    return '{0}.{1}'.format(func.__module__, func.__name__)
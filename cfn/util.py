@@ -1,7 +1,137 @@
+import json
+import weakref
+
+
+# values whose lines are kept, the others may change in place
+_CACHEABLE = (basestring, int, long, float, type(None))
+
+
 class Facts(dict):
+    """A YAML mapping, rendered as ``---\\nkey: value\\n...``
+
+    The line of every key is kept until the key is changed, and so is the
+    whole rendering, together with its literals and references, so it is
+    neither formatted nor searched for references again. Values which are
+    Facts become nested mappings and are kept the same way. Lines of values
+    other than strings, numbers and Facts are formatted on every rendering.
+    """
+    # key -> (line, rendering of a nested Facts)
+    _lines = None
+    # (text, ((nested Facts, its rendering), ...)) of all lines
+    _rendered = None
+    # (rendering, literals and references of to_json())
+    _segments = None
+
+    def __init__(self, *args, **kwargs):
+        dict.__init__(self)
+        self.update(*args, **kwargs)
 
     def to_json(self):
-        return '\n'.join(['---'] + list('{0}: {1}'.format(k, v) for k, v in sorted(self.items()))) + '\n'
+        return '---\n' + self._render()[0]
+
+    def _template(self):
+        # to_json with its references resolved, see cfn.core._unresolved_json
+        rendered = self._render()
+        cached = self._segments
+        if cached is not None and cached[0] is rendered:
+            segments = cached[1]
+        else:
+            from cfn.core import _split_references
+            segments = tuple(_split_references('---\n' + rendered[0]))
+            self._segments = (rendered, segments)
+        if len(segments) == 1:
+            return segments[0]
+        return {'Fn::Join': ['', list(segments)]}
+
+    def _render(self):
+        rendered = self._rendered
+        if rendered is not None:
+            for nested, nested_rendered in rendered[1]:
+                if nested._render() is not nested_rendered:
+                    break
+            else:
+                return rendered
+        lines = self._lines
+        if lines is None:
+            lines = self._lines = {}
+        texts = []
+        nested = []
+        volatile = False
+        for key in sorted(self):
+            value = dict.__getitem__(self, key)
+            line = lines.get(key)
+            if isinstance(value, Facts):
+                nested_rendered = value._render()
+                nested.append((value, nested_rendered))
+                if line is None or line[1] is not nested_rendered:
+                    line = lines[key] = (_nested_line(key, nested_rendered[0]),
+                                         nested_rendered)
+            elif line is None:
+                line = ('{0}: {1}\n'.format(key, value), None)
+                if isinstance(value, _CACHEABLE):
+                    lines[key] = line
+                else:
+                    volatile = True
+            texts.append(line[0])
+        rendered = (''.join(texts), tuple(nested))
+        if not volatile:
+            self._rendered = rendered
+        return rendered
+
+    def _changed(self, key):
+        self._rendered = None
+        if self._lines is not None:
+            self._lines.pop(key, None)
+
+    def __setitem__(self, key, value):
+        dict.__setitem__(self, key, value)
+        self._changed(key)
+
+    def __delitem__(self, key):
+        dict.__delitem__(self, key)
+        self._changed(key)
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return dict.__getitem__(self, key)
+
+    def pop(self, key, *default):
+        value = dict.pop(self, key, *default)
+        self._changed(key)
+        return value
+
+    def popitem(self):
+        key, value = dict.popitem(self)
+        self._changed(key)
+        return key, value
+
+    def clear(self):
+        dict.clear(self)
+        self._lines = self._rendered = None
+
+    def __getstate__(self):
+        # copies and pickles render again, without the caches of the original
+        state = dict(self.__dict__)
+        for name in _FACTS_CACHES:
+            state.pop(name, None)
+        return state
+
+
+# attributes of Facts which hold renderings; _cached_json is kept by
+# cfn.core._facts_json
+_FACTS_CACHES = ('_lines', '_rendered', '_segments', '_cached_json')
+
+
+def _nested_line(key, text):
+    if not text:
+        return '{0}: {{}}\n'.format(key)
+    # the nested lines, indented; text ends with a newline
+    return '{0}:\n  {1}\n'.format(key, text[:-1].replace('\n', '\n  '))
 
 
 class Parameter(dict):
@@ -44,9 +174,153 @@ class Parameter(dict):
         dict.__init__(self, **kwargs)
 
     def ref(self):
-        return {'Ref':self.name}
+        return Ref(self.name)
+
+    def validator(self):
+        """A function returning the problems of a value for this parameter,
+        see cfn.parameters. It is compiled once and kept until the parameter
+        is changed through its dict methods; values modified in place, e.g.
+        an AllowedValues list which is appended to, are not noticed."""
+        validator = self.__dict__.get('_validator')
+        if validator is None:
+            from cfn.parameters import compile_parameter
+            validator = self._validator = compile_parameter(self)
+        return validator
+
+    def _changed(self):
+        self.__dict__.pop('_validator', None)
+
+    def __setitem__(self, key, value):
+        dict.__setitem__(self, key, value)
+        self._changed()
+
+    def __delitem__(self, key):
+        dict.__delitem__(self, key)
+        self._changed()
+
+    def update(self, *args, **kwargs):
+        dict.update(self, *args, **kwargs)
+        self._changed()
+
+    def setdefault(self, key, default=None):
+        self._changed()
+        return dict.setdefault(self, key, default)
+
+    def pop(self, key, *default):
+        self._changed()
+        return dict.pop(self, key, *default)
+
+    def popitem(self):
+        self._changed()
+        return dict.popitem(self)
+
+    def clear(self):
+        dict.clear(self)
+        self._changed()
+
+    def __getstate__(self):
+        # the compiled validator can not be pickled, copies compile their own
+        state = dict(self.__dict__)
+        state.pop('_validator', None)
+        return state
 
     def __format__(self, format_string):
         if not self.name:
             raise AttributeError('Referenced parameter does not (yet?) have a name')
         return '{{Parameter|{0}}}'.format(self.name)
+
+
+class _Reference(dict):
+    """A canonical, immutable reference dict.
+
+    Equal references are the same object as long as one of them is alive,
+    so a template refers to a resource thousands of times with one dict.
+    The serializer writes them directly, see cfn.core._iter_json.
+    """
+    __slots__ = ('_encoded', '__weakref__')
+
+    def __init__(self, *key):
+        pass
+
+    @classmethod
+    def _create(cls, key, items, names):
+        reference = dict.__new__(cls)
+        dict.__init__(reference, items)
+        reference._encoded = tuple(_encode_value(name) for name in names)
+        cls._canonical[key] = weakref.KeyedRef(reference, cls._forget, key)
+        return reference
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError('{0} is immutable'.format(type(self).__name__))
+
+    __setitem__ = __delitem__ = clear = pop = popitem = setdefault = update = _readonly
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+
+def _forgetter(canonical):
+    # like weakref.WeakValueDictionary, whose lookups are slower
+    def forget(reference):
+        if canonical.get(reference.key) is reference:
+            del canonical[reference.key]
+    return forget
+
+
+class Ref(_Reference):
+    """``{'Ref': name}``"""
+    __slots__ = ()
+    _canonical = {}
+    _forget = staticmethod(_forgetter(_canonical))
+
+    def __new__(cls, name):
+        reference = cls._canonical.get(name)
+        if reference is not None:
+            reference = reference()
+            if reference is not None:
+                return reference
+        return cls._create(name, (('Ref', name),), (name,))
+
+    def __reduce__(self):
+        return Ref, (self['Ref'],)
+
+
+class GetAtt(_Reference):
+    """``{'Fn::GetAtt': [resource, attribute]}``"""
+    __slots__ = ()
+    _canonical = {}
+    _forget = staticmethod(_forgetter(_canonical))
+
+    def __new__(cls, resource, attribute):
+        key = resource, attribute
+        reference = cls._canonical.get(key)
+        if reference is not None:
+            reference = reference()
+            if reference is not None:
+                return reference
+        return cls._create(key, (('Fn::GetAtt', _FrozenList(key)),), key)
+
+    def __reduce__(self):
+        return GetAtt, tuple(self['Fn::GetAtt'])
+
+
+class _FrozenList(list):
+    __slots__ = ()
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError('GetAtt is immutable')
+
+    __setitem__ = __delitem__ = __setslice__ = __delslice__ = __iadd__ = __imul__ = \
+        append = extend = insert = pop = remove = reverse = sort = _readonly
+
+    def __reduce__(self):
+        return _FrozenList, (tuple(self),)
+
+
+def _encode_value(value):
+    if isinstance(value, basestring):
+        return json.encoder.encode_basestring_ascii(value)
+    return json.dumps(value)
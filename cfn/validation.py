@@ -0,0 +1,144 @@
+# -*- encoding: utf-8 -*-
+"""Check the references of a stack before it is sent to CloudFormation
+
+    stack.validate()  # raises ValidationError listing all problems
+"""
+from cfn.graph import PSEUDO_PARAMETER_PREFIX
+
+# nested stacks have an attribute Outputs.<name> for every output of their
+# template
+NESTED_STACK_TYPE = 'AWS::CloudFormation::Stack'
+
+
+class ValidationError(ValueError):
+    def __init__(self, problems, heading='Invalid template'):
+        ValueError.__init__(self, heading + ':\n' + '\n'.join(
+            '  {0}: {1}'.format(path, message) for path, message in problems))
+        self.problems = problems
+
+
+def find_problems(stack):
+    """Return (path, message) pairs for all invalid references in a stack.
+
+    Every resource and output is walked once. References are looked up in
+    a name index of the stack's resources and parameters, so this is linear
+    in the size of the template.
+    """
+    resources = stack.resources
+    parameters = getattr(stack, 'Parameters', {})
+    problems = []
+    checker = _Checker(resources, parameters, problems)
+
+    for name in sorted(resources):
+        path = ['Resources', name]
+        try:
+            template = resources[name].to_json()
+        except AttributeError as error:
+            # raised by ref() of unnamed resources and attributes
+            problems.append((_format_path(path), str(error)))
+            continue
+        checker.walk(template, path)
+        depends_on = template.get('DependsOn')
+        if depends_on is not None:
+            checker.check_depends_on(depends_on, path + ['DependsOn'])
+
+    outputs = getattr(stack, 'Outputs', None)
+    if outputs:
+        from cfn.core import resolve_references
+        for name in sorted(outputs):
+            path = ['Outputs', name]
+            try:
+                value = resolve_references(outputs[name])
+            except AttributeError as error:
+                problems.append((_format_path(path), str(error)))
+                continue
+            checker.walk(value, path)
+    return problems
+
+
+def validate(stack):
+    problems = find_problems(stack)
+    if problems:
+        raise ValidationError(problems)
+
+
+class _Checker(object):
+    def __init__(self, resources, parameters, problems):
+        self.resources = resources
+        self.parameters = parameters
+        self.problems = problems
+        # resource class -> names for Fn::GetAtt, or None if they are unknown
+        self.get_att_names = {}
+
+    def walk(self, o, path):
+        if isinstance(o, dict):
+            if len(o) == 1:
+                if 'Ref' in o:
+                    self.check_ref(o['Ref'], path)
+                elif 'Fn::GetAtt' in o:
+                    self.check_get_att(o['Fn::GetAtt'], path)
+            for key, value in o.items():
+                path.append(key)
+                self.walk(value, path)
+                path.pop()
+        elif isinstance(o, list):
+            for i, value in enumerate(o):
+                path.append(i)
+                self.walk(value, path)
+                path.pop()
+
+    def check_ref(self, name, path):
+        if not isinstance(name, basestring):
+            self.problem(path, 'Ref to {0!r}, which is not a name'.format(name))
+        elif (name not in self.resources and name not in self.parameters
+              and not name.startswith(PSEUDO_PARAMETER_PREFIX)):
+            self.problem(path, 'Ref to unknown resource or parameter {0!r}'.format(name))
+
+    def check_get_att(self, arguments, path):
+        if (not isinstance(arguments, list) or len(arguments) != 2
+                or not all(isinstance(a, basestring) for a in arguments)):
+            self.problem(path, 'Fn::GetAtt needs a resource and an attribute '
+                               'name, not {0!r}'.format(arguments))
+            return
+        name, attribute = arguments
+        resource = self.resources.get(name)
+        if resource is None:
+            self.problem(path, 'Fn::GetAtt of unknown resource {0!r}'.format(name))
+        elif not self.has_attribute(resource, attribute):
+            self.problem(path, 'Fn::GetAtt of unknown attribute {0!r} of resource '
+                               '{1!r} ({2})'.format(attribute, name, resource.type()))
+
+    def has_attribute(self, resource, attribute):
+        """False only for attributes which a resource of the AWS.* catalog
+        does not have; the attributes of other types, e.g. Custom::*
+        resources or types missing from the catalog, are not known"""
+        if attribute.startswith('Outputs.') and resource.type() == NESTED_STACK_TYPE:
+            return True
+        cls = type(resource)
+        if cls not in self.get_att_names:
+            import AWS
+            catalog = AWS.resource_class(resource.type())
+            self.get_att_names[cls] = (cls._plan().get_att_names
+                                       if catalog is not None and issubclass(cls, catalog)
+                                       else None)
+        names = self.get_att_names[cls]
+        return names is None or attribute in names
+
+    def check_depends_on(self, depends_on, path):
+        names = depends_on if isinstance(depends_on, list) else [depends_on]
+        for name in names:
+            if not isinstance(name, basestring) or name not in self.resources:
+                self.problem(path, 'DependsOn unknown resource {0!r}'.format(name))
+
+    def problem(self, path, message):
+        self.problems.append((_format_path(path), message))
+
+
+def _format_path(path):
+    result = []
+    for part in path:
+        if isinstance(part, int):
+            result.append('[{0}]'.format(part))
+        else:
+            result.append('.' + part if result else part)
+    return ''.join(result)
@@ -0,0 +1,45 @@
+# -*- encoding: utf-8 -*-
+import subprocess
+import sys
+
+import pytest
+
+import AWS
+
+
+def test_submodules_are_imported_on_access():
+    output = subprocess.check_output([sys.executable, '-c', '''
+import sys
+import AWS
+print('AWS.EC2' in sys.modules)
+AWS.EC2.Instance
+print('AWS.EC2' in sys.modules)
+print('AWS.IAM' in sys.modules)
+'''])
+    assert ['False', 'True', 'False'] == output.split()
+
+
+def test_unknown_submodule():
+    assert not hasattr(AWS, 'NoSuchService')
+
+
+def test_pseudo_parameters():
+    assert {'Ref': 'AWS::Region'} == AWS.Region.ref()
+
+
+def test_resource_class():
+    import AWS.EC2
+    assert AWS.EC2.Instance is AWS.resource_class('AWS::EC2::Instance')
+    assert AWS.resource_class('AWS::EC2::UserData') is None
+    assert AWS.resource_class('AWS::NoSuchService::Thing') is None
+    assert AWS.resource_class('Custom::Thing') is None
+
+
+def test_broken_submodules_raise(tmpdir, monkeypatch):
+    tmpdir.join('Broken.py').write('import no_such_dependency\n')
+    monkeypatch.setattr(AWS, '__path__', AWS.__path__ + [str(tmpdir)])
+    for access in (lambda: AWS.Broken, lambda: AWS.resource_class('AWS::Broken::Thing')):
+        with pytest.raises(ImportError) as error:
+            access()
+        assert 'no_such_dependency' in str(error.value)
+    assert AWS.resource_class('AWS::::Thing') is None
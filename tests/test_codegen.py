@@ -0,0 +1,44 @@
+# -*- encoding: utf-8 -*-
+import json
+import os
+
+from cfn.codegen import generate, main, DEFAULT_SPECIFICATION, DEFAULT_OUTPUT_DIR
+
+
+def test_generated_modules_are_up_to_date(tmpdir):
+    main(['--output-dir', str(tmpdir)])
+    with open(DEFAULT_SPECIFICATION) as specification:
+        services = set(name.split('::')[1]
+                       for name in json.load(specification)['ResourceTypes'])
+    assert services
+    for service in services:
+        with open(os.path.join(DEFAULT_OUTPUT_DIR, service + '.py')) as module:
+            assert module.read() == tmpdir.join(service + '.py').read()
+
+
+def test_generate():
+    modules = generate({'ResourceTypes': {
+        'AWS::Service::Thing': {
+            'Attributes': {'Arn': {}, 'Endpoint.Address': {}, 'Size': {}},
+            'Properties': {'Size': {}, 'Script': {}, 'name': {}},
+        },
+        'AWS::Service::Empty': {},
+        'Custom::Thing': {'Properties': {'Size': {}}},
+    }}, custom_properties={'AWS::Service::Thing': {'Script': 'UserData'}})
+
+    assert ['Service'] == list(modules)
+    namespace = {'__name__': 'AWS.Service'}
+    exec modules['Service'] in namespace
+    thing = namespace['Thing']
+    assert ('Arn', 'Condition', 'CreationPolicy', 'DeletionPolicy', 'DependsOn',
+            'Metadata', 'UpdatePolicy', 'UpdateReplacePolicy') == thing._plan().attribute_names
+    assert ('Script', 'Size') == thing._plan().property_names
+    # Size is a property, but Fn::GetAtt can still ask for the attribute
+    assert 'Size' in thing._plan().get_att_names
+    assert 'Arn' in thing._plan().get_att_names
+    assert 'UserData' == type(thing.Script).__name__
+    assert () == namespace['Empty']._plan().property_names
+
+    r = thing('r', Size=1, Script='echo', DependsOn='other')
+    assert {'Type': 'AWS::Service::Thing', 'DependsOn': 'other',
+            'Properties': {'Size': 1, 'Script': {'Fn::Base64': 'echo'}}} == r.to_json()
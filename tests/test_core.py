@@ -34,6 +34,15 @@ class ResourceWithMetadata(Resource):
     __module__=''
 
 
+class Node(Resource):
+    __module__ = ''
+    Condition = Attribute()
+    DependsOn = Attribute()
+    attr1 = Attribute()
+    prop1 = Property()
+    prop2 = Property()
+
+
 def test_resource_creation():
     r = Resource1()
 
@@ -377,3 +386,171 @@ def test_defaults_assigning():
     r = ResourceWithDefaults()
     assert_json(r.to_json(), {'Type':'ResourceWithDefaults',
         'Properties':{'prop1': 'default'}})
+
+def test_iter_json_matches_resolved_dump():
+    from cfn.util import Facts, Parameter
+
+    class CustomProperty(Property):
+        def to_json(self):
+            return {'Custom': self.value}
+
+    class ResourceWithEverything(Resource):
+        __module__ = 'Test.Module'
+        attr1 = Attribute()
+        prop1 = Property()
+        prop2 = Property()
+        custom = CustomProperty()
+
+    p = Parameter('p', AllowedPattern='[a-z]{3}')
+    r1 = ResourceWithEverything('r1', attr1={'key': 'value'})
+    r2 = ResourceWithEverything('r2', prop1=[r1, r1.attr1, 1.5, None, True],
+                                custom='{0}'.format(r1))
+    facts = Facts(a='{0}'.format(p), b='value')
+    r2.prop2 = {'facts': facts, 'text': 'x{0}y{1}z'.format(r1, r1.attr1),
+                u'\xfcnicode': u'\xfc', 1: 'non-string key'}
+    stack = Stack(r1, r2, p, Description='everything')
+    stack.Outputs['out'] = r2.attr1
+
+    expected = json.dumps(resolve_references(stack), indent=2, sort_keys=True)
+    assert expected == ''.join(iter_json(stack))
+    assert expected == to_json(stack)
+
+    for o in (r1, r2.prop2, [], {}, 'plain', '{0}'.format(r1.attr1)):
+        assert json.dumps(resolve_references(o), indent=2, sort_keys=True) == to_json(o)
+
+def test_dump_json():
+    from StringIO import StringIO
+    r1 = ResourceWithProperties('r1', prop1=1)
+    out = StringIO()
+    dump_json(ResourceCollection(r1), out)
+    assert to_json(ResourceCollection(r1)) == out.getvalue()
+
+def test_resource_plan_is_computed_once_per_class():
+    class Base(Resource):
+        __module__ = ''
+        attr1 = Attribute()
+        prop1 = Property()
+
+    class Derived(Base):
+        __module__ = ''
+        prop2 = Property()
+
+    Base()
+    Derived()
+    assert ('attr1',) == Base._plan().attribute_names
+    assert ('prop1',) == Base._plan().property_names
+    assert ('prop1', 'prop2') == Derived._plan().property_names
+    assert Base._plan() is Base._plan()
+
+def test_resource_plan_follows_class_changes():
+    class Base(Resource):
+        __module__ = ''
+        prop1 = Property()
+
+    class Derived(Base):
+        __module__ = ''
+
+    Derived()
+    Base.prop0 = Property()
+    Base.attr1 = Attribute()
+    r = Derived(prop0=0, prop1=1, attr1='value')
+    assert_json(r.to_json(), {'Type': 'Derived', 'attr1': 'value',
+                              'Properties': {'prop1': 1}})
+    with pytest.raises(AttributeError):
+        Base(prop2=2)
+
+def test_string_without_references_resolves_to_itself():
+    text = '#!/bin/bash\necho no references here\n'
+    assert text is resolve_references_in_string(text)
+    assert '' == resolve_references_in_string('')
+    assert '{' == resolve_references_in_string('{')
+
+def test_resolved_strings_are_not_shared():
+    text = 'prefix{Attribute|r1|attr1}'
+    first = resolve_references_in_string(text)
+    first['Fn::Join'][1].append('mutated')
+    # the references are shared and can not be changed
+    with pytest.raises(TypeError):
+        first['Fn::Join'][1][1]['Fn::GetAtt'][0] = 'mutated'
+    assert {'Fn::Join': ['', ['prefix', {'Fn::GetAtt': ['r1', 'attr1']}]]} == \
+        resolve_references_in_string(text)
+
+def test_reference_cache_is_bounded(monkeypatch):
+    from collections import OrderedDict
+    import cfn.core
+    monkeypatch.setattr(cfn.core, '_TOKEN_CACHE_SIZE', 2)
+    monkeypatch.setattr(cfn.core, '_token_cache', OrderedDict())
+    for name in ('a', 'b', 'a', 'c'):
+        assert {'Ref': name} == resolve_references_in_string('{Resource|%s}' % name)
+    assert ['{Resource|a}', '{Resource|c}'] == list(cfn.core._token_cache)
+
+def test_autonaming_skips_taken_names():
+    stack = ResourceCollection(Resource1('Resource1'), Resource1(), Resource1('Resource12'), Resource1())
+    assert ['Resource1', 'Resource11', 'Resource12', 'Resource13'] == sorted(stack.resources)
+
+def test_autonaming_past_a_thousand_resources():
+    stack = ResourceCollection(*[Resource1() for _ in range(1500)])
+    assert 1500 == len(stack.resources)
+    assert 'Resource11499' in stack.resources
+
+def test_adding_resources_after_construction():
+    stack = ResourceCollection(Resource1(), Resource1())
+    r = stack.add(Resource1())
+    assert 'Resource12' == r.name
+    stack.add(Resource1('named'))
+    assert ['Resource1', 'Resource11', 'Resource12', 'named'] == sorted(stack.resources)
+
+def test_members_are_created_on_first_access():
+    r = ResourceWithProperties()
+    assert 'prop1' not in vars(r)
+    assert_json(r.to_json(), {'Type': 'ResourceWithProperties'})
+    prop = r.prop1
+    assert prop is r.prop1
+    assert prop is not ResourceWithProperties.prop1
+    assert prop.resource is r and prop.value is None
+
+    r2 = ResourceWithAttributes('r2')
+    assert '{Attribute|r2|attr1}' == '{0}'.format(r2.attr1)
+    assert ResourceWithAttributes.attr1.resource is None
+
+def test_member_added_after_instantiation():
+    class R(Resource):
+        __module__ = ''
+
+    r = R('r')
+    R.attr1 = Attribute()
+    assert {'Fn::GetAtt': ['r', 'attr1']} == r.attr1.ref()
+
+def test_type_is_computed_once_per_class():
+    class Renamed(Resource):
+        pass
+    Renamed.__module__ = 'Custom'
+    first = Renamed().type()
+    assert 'Custom::Renamed' == first
+    assert first is Renamed().type()
+    Renamed.__name__ = 'Other'
+    assert 'Custom::Other' == Renamed().type()
+
+def test_braces_which_are_no_references_are_kept():
+    assert 'a{b}' == resolve_references_in_string('a{b}')
+    assert '{}' == resolve_references_in_string('{}')
+    assert {'Fn::Join': ['', ["x: {'a': ", {'Ref': 'r'}, '}']]} == \
+        resolve_references_in_string("x: {'a': {Resource|r}}")
+
+def test_braces_in_user_data_and_policies():
+    import AWS
+    volume = AWS.EC2.Volume('Volume')
+    node = AWS.EC2.Instance(
+        'Node', UserData='#!/bin/sh\nmount ${DEVICE:-/dev/xvdf} ' + '{0}\n'.format(volume))
+    policy = AWS.IAM.Policy('Policy', PolicyName='p', PolicyDocument={
+        'Statement': [{'Effect': 'Allow', 'Action': 's3:GetObject',
+                       'Resource': 'arn:aws:s3:::bucket/${aws:username}/*'}],
+        'Condition': '{"StringEquals": {"aws:SourceVpc": "{Parameter|Vpc}"}}'})
+    template = json.loads(to_json(Stack(volume, node, policy)))
+    assert {'Fn::Base64': {'Fn::Join': ['', ['#!/bin/sh\nmount ${DEVICE:-/dev/xvdf} ',
+                                             {'Ref': 'Volume'}, '\n']]}} == \
+        template['Resources']['Node']['Properties']['UserData']
+    document = template['Resources']['Policy']['Properties']['PolicyDocument']
+    assert 'arn:aws:s3:::bucket/${aws:username}/*' == document['Statement'][0]['Resource']
+    assert {'Fn::Join': ['', ['{"StringEquals": {"aws:SourceVpc": "', {'Ref': 'Vpc'},
+                              '"}}']]} == document['Condition']
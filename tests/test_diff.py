@@ -0,0 +1,78 @@
+# -*- encoding: utf-8 -*-
+from cfn.core import Stack, to_json
+from cfn.diff import diff, main, Change, ADDED, REMOVED, MODIFIED, _Template
+from cfn.util import Parameter
+from tests.test_core import Node
+
+
+def old_stack():
+    a = Node('a', prop1='x', prop2=[1, 2, {'k': 'v'}])
+    s = Stack(a, Node('b', prop1=a.attr1), Node('gone'), Parameter('p'))
+    s.Outputs['out'] = a
+    return s
+
+
+def new_stack():
+    a = Node('a', prop1='x', prop2=[1, 3, {'k': 'w', 'l': 1}])
+    s = Stack(a, Node('b', prop1=a.attr1, DependsOn='a'), Node('new'),
+              Parameter('p', Default='d'), Description='new')
+    s.Outputs['out'] = a
+    return s
+
+
+EXPECTED = '''- Resources.gone
++ Resources.new
+~ Resources.a.Properties.prop2[1]: 2 -> 3
+~ Resources.a.Properties.prop2[2].k: "v" -> "w"
++ Resources.a.Properties.prop2[2].l: 1
++ Resources.b.DependsOn: "a"
++ Description: "new"
++ Parameters.p.Default: "d"'''
+
+
+def test_diff_stacks():
+    changes = diff(old_stack(), new_stack())
+    assert ['new'] == changes.added
+    assert ['gone'] == changes.removed
+    assert [Change(MODIFIED, 'Resources.a.Properties.prop2[1]', 2, 3),
+            Change(MODIFIED, 'Resources.a.Properties.prop2[2].k', 'v', 'w'),
+            Change(ADDED, 'Resources.a.Properties.prop2[2].l', None, 1)] == changes.modified['a']
+    assert [Change(ADDED, 'Resources.b.DependsOn', None, 'a')] == changes.modified['b']
+    assert EXPECTED == changes.format()
+    assert not diff(old_stack(), old_stack())
+
+
+def test_diff_with_files(tmpdir):
+    old = tmpdir.join('old.json')
+    old.write(to_json(old_stack()))
+    assert EXPECTED == diff(str(old), new_stack()).format()
+    assert not diff(str(old), old_stack())
+    reverse = diff(new_stack(), str(old))
+    assert [Change(REMOVED, 'Description', 'new', None)] == reverse.changes[:1]
+
+
+def test_main(tmpdir, capsys):
+    old = tmpdir.join('old.json')
+    old.write(to_json(old_stack()))
+    assert 0 == main([str(old), 'tests.test_diff:old_stack'])
+    assert 1 == main([str(old), 'tests.test_diff:new_stack'])
+    out, _ = capsys.readouterr()
+    assert EXPECTED + '\n' == out
+
+
+def test_only_changed_resources_are_rendered(monkeypatch):
+    def stack(changed):
+        nodes = [Node('n%d' % i, prop1={'index': i, 'tags': ['a', 'b']}) for i in range(5000)]
+        for i, node in enumerate(nodes[1:]):
+            node.prop2 = nodes[i].attr1
+        nodes[changed].prop1 = 'changed'
+        return Stack(*nodes)
+    old, new = stack(10), stack(20)
+    rendered = []
+    resource = _Template.resource
+    monkeypatch.setattr(_Template, 'resource',
+                        lambda self, name: rendered.append(name) or resource(self, name))
+    changes = diff(old, new)
+    assert ['n10', 'n20'] == sorted(changes.modified)
+    # equal resources are skipped by their structural hashes
+    assert ['n10', 'n10', 'n20', 'n20'] == sorted(rendered)
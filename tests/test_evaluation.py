@@ -0,0 +1,70 @@
+# -*- encoding: utf-8 -*-
+import base64
+
+import pytest
+
+import AWS
+from cfn.core import Stack, cfn_join, to_json
+from cfn.evaluation import evaluate, Evaluator, EvaluationError
+from cfn.util import Parameter
+from cfn.validation import ValidationError
+
+
+def stack():
+    environment = Parameter('Environment', Default='test')
+    zones = Parameter('Zones', Type='CommaDelimitedList')
+    node = AWS.EC2.Instance('Node', ImageId='ami-1')
+    node.UserData = '#!/bin/bash\necho {0} {1} {2}\n'.format(
+        environment, AWS.Region, node.PrivateIp)
+    volume = AWS.EC2.Volume('Volume', AvailabilityZone=cfn_join(zones, ','), Size=10)
+    s = Stack(node, volume, environment, zones)
+    s.Outputs['Name'] = {'Value': '{0}-{1}'.format(node, AWS.StackName)}
+    s.Outputs['Nothing'] = {'Value': 'x', 'Condition': {'Ref': 'AWS::NoValue'}}
+    return s
+
+
+def test_evaluate_stack():
+    template = evaluate(stack(), {'Zones': 'a, b'}, {'Node': {'PrivateIp': '10.0.0.1'}},
+                        physical_ids={'Node': 'i-123'},
+                        pseudo_parameters={'AWS::StackName': 'web'})
+    node = template['Resources']['Node']
+    assert ('#!/bin/bash\necho test us-east-1 10.0.0.1\n' ==
+            base64.b64decode(node['Properties']['UserData']))
+    assert 'a,b' == template['Resources']['Volume']['Properties']['AvailabilityZone']
+    assert {'Value': 'i-123-web'} == template['Outputs']['Name']
+    assert {'Value': 'x'} == template['Outputs']['Nothing']
+    assert 'AWS::EC2::Instance' == node['Type']
+
+
+def test_evaluate_rendered_template():
+    import json
+    template = json.loads(to_json(stack()))
+    evaluated = evaluate(template, {'Environment': 'prod', 'Zones': 'a'},
+                         {'Node': {'PrivateIp': '10.0.0.2'}})
+    assert ('#!/bin/bash\necho prod us-east-1 10.0.0.2\n' ==
+            base64.b64decode(evaluated['Resources']['Node']['Properties']['UserData']))
+    assert {'Value': 'Node-stack'} == evaluated['Outputs']['Name']
+
+
+def test_expressions_are_evaluated_where_they_are():
+    evaluator = Evaluator(stack(), {'Zones': 'a'}, {'Node': {'PrivateIp': '10.0.0.1'}})
+    ref = AWS.Region.ref()
+    assert ['us-east-1', {'a': 'us-east-1'}] == evaluator.value([ref, {'a': ref}])
+    # dicts with keys which are no strings are no functions
+    assert {1: 'us-east-1'} == evaluator.value({1: ref})
+    assert {None: 'x'} == evaluator.value({None: 'x'})
+
+
+def test_evaluation_errors():
+    with pytest.raises(ValidationError):
+        evaluate(stack())
+    with pytest.raises(EvaluationError) as error:
+        evaluate(stack(), {'Zones': 'a'})
+    assert error.value.path.startswith('Resources.Node.Properties.UserData')
+    assert 'No value for attribute PrivateIp of Node' in str(error.value)
+    evaluator = Evaluator(stack(), {'Zones': 'a'})
+    with pytest.raises(EvaluationError) as error:
+        evaluator.value({'Fn::If': ['c', 1, 2]}, ['Outputs', 'If'])
+    assert 'Outputs.If.Fn::If: Can not evaluate Fn::If' == str(error.value)
+    with pytest.raises(EvaluationError):
+        evaluator.value({'Ref': 'Missing'})
@@ -0,0 +1,93 @@
+# -*- encoding: utf-8 -*-
+import pytest
+
+import AWS
+from cfn.core import Stack, Resource, Attribute, Property, to_json
+from cfn.fleet import Fleet
+from cfn.fragments import structural_hash
+from tests.test_core import Node
+
+
+class NodeWithDefault(Node):
+    __module__ = ''
+    # its own Property, setting the default of Node's would change Node
+    prop2 = Property()
+
+
+NodeWithDefault.prop2 = 'default'
+
+
+class Upper(Attribute):
+    def to_json(self):
+        return self.value.upper() if self.value else None
+
+
+class Custom(Resource):
+    __module__ = ''
+    label = Upper()
+    prop1 = Property()
+
+    def to_json(self):
+        result = Resource.to_json(self)
+        result['Custom'] = True
+        return result
+
+
+def test_renders_like_single_resources():
+    instances = Fleet(AWS.EC2.Instance, ['Node0', 'Node1'],
+                      columns={'UserData': ['echo 0', ''], 'DependsOn': [None, 'Node0']},
+                      ImageId='ami-1')
+    volumes = Fleet(AWS.EC2.Volume, 2, columns={'Size': [10, 20]})
+    attachments = Fleet(AWS.EC2.VolumeAttachment, 2, columns={
+        'InstanceId': instances.resources, 'VolumeId': volumes.resources})
+    records = Fleet(AWS.Route53.RecordSet, 2, columns={
+        'ResourceRecords': [[ip] for ip in instances.attribute('PrivateIp')]})
+    nodes = Fleet(Node, 1)
+
+    single = [AWS.EC2.Instance('Node0', UserData='echo 0', ImageId='ami-1'),
+              AWS.EC2.Instance('Node1', UserData='', ImageId='ami-1', DependsOn='Node0')]
+    single_volumes = [AWS.EC2.Volume(Size=10), AWS.EC2.Volume(Size=20)]
+    single += single_volumes
+    single += [AWS.EC2.VolumeAttachment(InstanceId=i, VolumeId=v)
+               for i, v in zip(single[:2], single_volumes)]
+    single += [AWS.Route53.RecordSet(ResourceRecords=[i.PrivateIp]) for i in single[:2]]
+    single.append(Node())
+
+    fleet = list(instances) + list(volumes) + list(attachments) + list(records) + list(nodes)
+    assert to_json(Stack(*single)) == to_json(Stack(*fleet))
+    assert structural_hash(single[0]) == structural_hash(fleet[0])
+    assert ['Node0', 'Volume'] == list(Stack(*fleet).resources['VolumeAttachment'].dependencies())
+    assert all('_row' in r.__dict__ for r in fleet)
+
+
+def test_members_materialize_on_access():
+    nodes = Fleet(NodeWithDefault, ['a', 'b'], columns={'prop1': [1, 2]}, DependsOn='c')
+    a, b = nodes
+    assert isinstance(a, NodeWithDefault)
+    assert 'NodeWithDefault' == a.type()
+    assert 1 == a.prop1.value
+    assert 'default' == a.prop2.value
+    assert 'c' == a.DependsOn.value
+    assert a.attr1.resource is a
+    a.prop1 = 3
+    b.prop2 = None
+    assert {'Type': 'NodeWithDefault', 'DependsOn': 'c',
+            'Properties': {'prop1': 3, 'prop2': 'default'}} == a.to_json()
+    assert {'Type': 'NodeWithDefault', 'DependsOn': 'c', 'Properties': {'prop1': 2}} == \
+        b.to_json()
+    assert 2 == nodes.columns['prop1'][1]
+
+
+def test_custom_classes():
+    customs = Fleet(Custom, ['a'], columns={'label': ['x']}, prop1='p')
+    assert {'Type': 'Custom', 'label': 'X', 'Properties': {'prop1': 'p'}, 'Custom': True} == \
+        customs[0].to_json()
+
+
+def test_invalid_columns():
+    with pytest.raises(ValueError):
+        Fleet(Node, 2, columns={'prop1': [1]})
+    with pytest.raises(ValueError):
+        Fleet(Node, 1, columns={'prop1': [1]}, prop1=1)
+    with pytest.raises(AttributeError):
+        Fleet(Node, 1, unknown=1)
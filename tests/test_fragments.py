@@ -0,0 +1,117 @@
+# -*- encoding: utf-8 -*-
+import os
+
+import AWS
+from cfn.core import Stack, to_json
+from cfn.fragments import FragmentCache, structural_hash
+from cfn.util import Facts, Parameter
+from tests.test_core import Node
+
+
+def test_equal_structures_hash_equal():
+    a = Node('a', prop1={'x': [1, 'two', None]})
+    b = Node('b', prop1={'x': [1, 'two', None]})
+    assert structural_hash(a) == structural_hash(b)
+    assert structural_hash(a) != structural_hash(Node('c', prop1={'x': [1, 'two']}))
+    assert structural_hash(a) != structural_hash(Node('c', prop2={'x': [1, 'two', None]}))
+    assert structural_hash(Node(prop1=1)) != structural_hash(Node(prop1=True))
+    assert structural_hash(Node(prop1=1)) != structural_hash(Node(prop1='1'))
+
+
+def test_references_hash_by_name():
+    target = Node('target')
+    a = Node('a', prop1=[target, target.attr1])
+    b = Node('b', prop1=[{'Ref': 'target'}, {'Fn::GetAtt': ['target', 'attr1']}])
+    assert structural_hash(a) == structural_hash(b)
+    assert structural_hash(Node(prop1=target.attr1)) == \
+        structural_hash(Node(prop1={'Fn::GetAtt': ['target', 'attr1']}))
+    before = structural_hash(a)
+    target.name = 'renamed'
+    assert structural_hash(a) != before
+
+
+def test_hash_follows_assignments():
+    a = Node('a', prop1='x')
+    before = structural_hash(a)
+    a.prop1 = 'y'
+    assert structural_hash(a) != before
+    a.prop1 = 'x'
+    assert structural_hash(a) == before
+
+
+def test_hash_of_values():
+    assert structural_hash(Facts(a=1)) == structural_hash(Facts(a=1))
+    assert structural_hash(Facts(a=1)) != structural_hash({'a': 1})
+    assert structural_hash(Parameter('p', Type='Number')) == \
+        structural_hash(Parameter('q', Type='Number'))
+    assert structural_hash(Parameter('p')) != structural_hash(Parameter('p', Default='x'))
+    assert structural_hash(Node(prop1='x').prop1) == structural_hash('x')
+    assert len(structural_hash(AWS.Region)) == 40
+
+
+def test_fragments_are_shared_between_stacks(tmpdir):
+    cache = FragmentCache(str(tmpdir))
+
+    def stack(instance_name):
+        s = Stack(AWS.IAM.Policy('Policy', PolicyName='p', PolicyDocument={'Statement': []}),
+                  AWS.EC2.Instance(instance_name, ImageId='ami-1'))
+        s.fragment_cache = cache
+        return s
+
+    expected = to_json(stack('a'))
+    assert (0, 2) == (cache.hits, cache.misses)
+    assert expected == to_json(stack('a'))
+    assert (2, 2) == (cache.hits, cache.misses)
+    # the instance is equal although it has a different name
+    to_json(stack('b'))
+    assert (4, 2) == (cache.hits, cache.misses)
+    assert expected.replace('"a"', '"b"') == to_json(stack('b'))
+    assert expected.replace(' ', '').replace('\n', '') == to_json(stack('a'), compact=True)
+    # a new cache object finds the fragments of an earlier run
+    cache = FragmentCache(str(tmpdir))
+    assert expected == to_json(stack('a'))
+    assert (2, 0) == (cache.hits, cache.misses)
+
+
+def test_least_recently_used_fragments_are_evicted(tmpdir):
+    cache = FragmentCache(str(tmpdir), max_bytes=10)
+    cache.put('aa01', 'xxxx')
+    cache.put('aa02', 'xxxx')
+    assert 'xxxx' == cache.get('aa01')
+    cache.put('aa03', 'xxxx')
+    assert cache.get('aa02') is None
+    assert 'xxxx' == cache.get('aa01')
+    assert 8 == cache.bytes
+    assert ['01', '03'] == sorted(os.listdir(str(tmpdir.join('aa'))))
+
+    os.utime(str(tmpdir.join('aa', '01')), (1, 1))
+    cache = FragmentCache(str(tmpdir), max_bytes=4)
+    assert 4 == cache.bytes
+    assert ['03'] == os.listdir(str(tmpdir.join('aa')))
+    cache.clear()
+    assert 0 == cache.bytes
+    assert [] == os.listdir(str(tmpdir.join('aa')))
+
+
+
+def test_fragments_removed_by_others_leave_the_size(tmpdir):
+    cache = FragmentCache(str(tmpdir), max_bytes=10)
+    cache.put('aa01', 'xxxx')
+    cache.put('aa02', 'xxxx')
+    os.remove(str(tmpdir.join('aa', '01')))
+    assert cache.get('aa01') is None
+    assert 4 == cache.bytes
+    # room for another fragment without evicting aa02
+    cache.put('aa03', 'xxxx')
+    assert 'xxxx' == cache.get('aa02')
+
+
+def test_values_modified_in_place_need_invalidate(tmpdir):
+    node = Node('node', prop1=['a'])
+    stack = Stack(node)
+    stack.fragment_cache = FragmentCache(str(tmpdir))
+    to_json(stack)
+    node.prop1.value.append('b')
+    node.invalidate()
+    assert '"b"' in to_json(stack)
+    assert to_json(Stack(Node('node', prop1=['a', 'b']))) == to_json(stack)
@@ -0,0 +1,78 @@
+# -*- encoding: utf-8 -*-
+import pytest
+
+from cfn.core import Stack, ResourceCollection
+from cfn.graph import CycleError
+from cfn.util import Parameter
+
+import AWS
+from tests.test_core import Node
+
+
+def test_edges_from_all_kinds_of_references():
+    a = Node('a')
+    b = Node('b', prop1=a)
+    c = Node('c', prop1=[b.attr1], prop2='{0}-{1}'.format(a, AWS.Region))
+    d = Node('d', DependsOn=['c', 'b'])
+    e = Node('e', prop1={'Ref': 'p'})
+    graph = Stack(a, b, c, d, e, Parameter('p')).dependency_graph()
+
+    assert [] == graph.dependencies('a')
+    assert ['a', 'b'] == graph.dependencies('c')
+    assert ['b', 'c'] == graph.dependencies('d')
+    assert ['b', 'c'] == graph.dependents('a')
+    assert [] == graph.dependencies('e')
+    assert ['a', 'b', 'c', 'd', 'e'] == graph.topological_order()
+    assert [] == graph.cycles()
+    assert [] == graph.dangling_references()
+
+
+def test_graph_follows_assignments_and_renames():
+    a = Node('a')
+    b = Node('b')
+    stack = ResourceCollection(a, b)
+    assert [] == stack.dependency_graph().dependencies('b')
+
+    b.prop1 = a
+    assert ['a'] == stack.dependency_graph().dependencies('b')
+
+    stack.add(Node('c', prop1=b))
+    assert ['c'] == stack.dependency_graph().dependents('b')
+
+    a.name = 'renamed'
+    assert [('b', 'renamed')] == stack.dependency_graph().dangling_references()
+
+
+def test_cycles():
+    a = Node('a')
+    b = Node('b', prop1=a)
+    c = Node('c', prop1=b)
+    a.prop1 = c
+    d = Node('d', prop1='{Resource|d}')
+    e = Node('e', prop1=a)
+    graph = ResourceCollection(a, b, c, d, e).dependency_graph()
+    assert [['a', 'b', 'c'], ['d']] == graph.cycles()
+    with pytest.raises(CycleError) as error:
+        graph.topological_order()
+    assert [['a', 'b', 'c'], ['d']] == error.value.cycles
+
+
+def test_dangling_references():
+    a = Node('a', prop1='{Resource|missing}', DependsOn='gone')
+    graph = Stack(a).dependency_graph()
+    assert [('a', 'gone'), ('a', 'missing')] == graph.dangling_references()
+
+
+def test_long_chain():
+    nodes = [Node('n%05d' % 0)]
+    for i in range(1, 5000):
+        nodes.append(Node('n%05d' % i, prop1=nodes[-1]))
+    graph = ResourceCollection(*nodes).dependency_graph()
+    assert [n.name for n in nodes] == graph.topological_order()
+    assert [] == graph.cycles()
+
+
+def test_empty_stack():
+    graph = Stack().dependency_graph()
+    assert [] == graph.topological_order()
+    assert [] == graph.cycles()
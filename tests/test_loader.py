@@ -0,0 +1,129 @@
+# -*- encoding: utf-8 -*-
+import json
+
+import pytest
+
+import AWS
+from cfn.core import Stack, to_json
+from cfn.loader import Literal, from_template, load_file, loads
+
+TEMPLATE = {
+    'AWSTemplateFormatVersion': '2010-09-09',
+    'Description': 'Legacy {template}',
+    'Parameters': {
+        'Size': {'Type': 'Number', 'Default': '80', 'AllowedPattern': '[0-9]{1,3}'},
+    },
+    'Mappings': {'Regions': {'eu-west-1': {'Ami': 'ami-1'}}},
+    'Conditions': {'Big': {'Fn::Equals': [{'Ref': 'Size'}, '1000']}},
+    'Resources': {
+        'Node': {
+            'Type': 'AWS::EC2::Instance',
+            'Metadata': {'AWS::CloudFormation::Init': {'config': {
+                'files': {'/etc/app.json': {'content': '{"port": 80}'}}}}},
+            'Properties': {
+                'ImageId': {'Fn::FindInMap': ['Regions', {'Ref': 'AWS::Region'}, 'Ami']},
+                'UserData': {'Fn::Base64': {'Fn::Join': ['', ['#!/bin/sh\n', {'Ref': 'Size'}]]}},
+            },
+        },
+        'Volume': {
+            'Type': 'AWS::EC2::Volume',
+            'Condition': 'Big',
+            'Properties': {'Size': {'Ref': 'Size'}, 'Encrypted': False,
+                           'AvailabilityZone': {'Fn::GetAtt': ['Node', 'AvailabilityZone']}},
+        },
+        'Attachment': {
+            'Type': 'AWS::EC2::VolumeAttachment',
+            'DependsOn': ['Node', 'Volume'],
+            'Properties': {'Device': '/dev/xvdf', 'InstanceId': {'Ref': 'Node'},
+                           'VolumeId': {'Ref': 'Volume'}},
+        },
+        'Function': {
+            'Type': 'AWS::Lambda::Function',
+            'Properties': {'Code': {'ZipFile': {'Fn::Sub': 'exports.region = "${AWS::Region}"'}},
+                           'Timeout': 0},
+        },
+        'Thing': {'Type': 'Custom::Thing', 'Properties': {'ServiceToken': {'Ref': 'Function'}}},
+    },
+    'Outputs': {'Ip': {'Value': {'Fn::GetAtt': ['Node', 'PrivateIp']}}},
+}
+
+
+def test_round_trip():
+    text = json.dumps(TEMPLATE, indent=2, sort_keys=True)
+    stack = loads(text)
+    assert text == to_json(stack)
+    assert text == to_json(loads(to_json(stack)))
+
+
+def test_resources_are_typed():
+    stack = loads(json.dumps(TEMPLATE))
+    node = stack.resources['Node']
+    assert type(node) is AWS.EC2.Instance
+    assert {'Fn::Join': ['', ['#!/bin/sh\n', {'Ref': 'Size'}]]} == node.UserData.value
+    assert {'Fn::GetAtt': ['Node', 'PrivateIp']} == node.PrivateIp.ref()
+    # Encrypted is not in the resource specification
+    volume = stack.resources['Volume']
+    assert isinstance(volume, AWS.EC2.Volume)
+    assert Literal(False) == volume.Encrypted.value
+    assert 'AWS::EC2::Volume' == volume.type()
+    assert 'AWS::Lambda::Function' == stack.resources['Function'].type()
+    assert 'Custom::Thing' == stack.resources['Thing'].type()
+    assert ['Size'] == list(stack.Parameters)
+    assert [] == stack.dependency_graph().dangling_references()
+    assert ['Node', 'Volume'] == stack.dependency_graph().dependencies('Attachment')
+
+
+def test_loaded_stacks_can_be_changed():
+    stack = loads(json.dumps(TEMPLATE))
+    node = stack.resources['Node']
+    node.InstanceType = 'm3.large'
+    node.UserData = 'echo {0}'.format(stack.resources['Volume'])
+    template = json.loads(to_json(stack))
+    assert 'm3.large' == template['Resources']['Node']['Properties']['InstanceType']
+    assert {'Fn::Base64': {'Fn::Join': ['', ['echo ', {'Ref': 'Volume'}]]}} == \
+        template['Resources']['Node']['Properties']['UserData']
+
+
+def test_user_data_which_is_not_base64_is_kept():
+    stack = loads(json.dumps({'Resources': {'Node': {
+        'Type': 'AWS::EC2::Instance', 'Properties': {'UserData': 'plain'}}}}))
+    assert isinstance(stack.resources['Node'], AWS.EC2.Instance)
+    assert 'plain' == json.loads(to_json(stack))['Resources']['Node']['Properties']['UserData']
+
+
+def test_invalid_templates():
+    with pytest.raises(ValueError):
+        loads('{"Transform": "AWS::Serverless-2016-10-31"}')
+    with pytest.raises(ValueError):
+        loads('{"Resources": {"a": {"Properties": {}}}}')
+    with pytest.raises(ValueError):
+        loads('{"Resources": {"a": {"Type": "X::Y", "Properties": {"ref": 1}}}}')
+
+
+def test_load_file(tmpdir):
+    path = tmpdir.join('template.json')
+    path.write(json.dumps(TEMPLATE))
+    stack = load_file(str(path))
+    assert isinstance(stack, Stack)
+    assert sorted(TEMPLATE['Resources']) == sorted(stack.resources)
+
+
+def test_loaded_parameters_can_be_bound():
+    stack = loads(json.dumps(TEMPLATE))
+    assert '[0-9]{1,3}' == stack.Parameters['Size']['AllowedPattern']
+    assert {'Size': '12'} == stack.bind({'Size': '12'})
+    assert {'Size': '80'} == stack.bind({})
+    with pytest.raises(ValueError):
+        stack.bind({'Size': '1234'})
+
+
+def test_only_strings_with_references_are_literals():
+    template = json.loads(json.dumps(TEMPLATE))
+    template['Outputs']['Marker'] = {'Value': 'see {Resource|Node}'}
+    stack = from_template(template)
+    assert 'Legacy {template}' == stack.Description
+    node = stack.resources['Node']
+    assert '{"port": 80}' == \
+        node.Metadata.value['AWS::CloudFormation::Init']['config']['files']['/etc/app.json']['content']
+    assert Literal('see {Resource|Node}') == stack.Outputs['Marker']['Value']
+    assert 'see {Resource|Node}' == json.loads(to_json(stack))['Outputs']['Marker']['Value']
@@ -0,0 +1,53 @@
+# -*- encoding: utf-8 -*-
+import AWS
+from cfn.core import Stack, cfn_join, to_json
+from cfn.evaluation import evaluate
+from cfn.optimize import optimize_joins
+from cfn.util import Parameter
+
+
+def join(values, glue=''):
+    return {'Fn::Join': [glue, values]}
+
+
+def test_joins_are_simplified():
+    ref = {'Ref': 'x'}
+    assert 'ab' == optimize_joins(join(['a', 'b']))[0]
+    assert ref == optimize_joins(join([ref]))[0]
+    assert '' == optimize_joins(join([]))[0]
+    assert join(['ab', ref, 'c-d']) == optimize_joins(
+        join(['a', join(['b', ref]), 'c', join(['-']), 'd']))[0]
+    # different glue
+    assert join(['a', join([ref, 'b'], ','), 'c-d'], '-') == optimize_joins(
+        join(['a', join([ref, 'b'], ','), 'c', join(['d'], ',')], '-'))[0]
+    # empty joins are empty strings, which keep their glue
+    assert 'a--b' == optimize_joins(join(['a', join([], ','), 'b'], '-'))[0]
+    # a join of a list parameter
+    assert join(['', ref]) == optimize_joins(join(['', ref]))[0]
+
+
+def test_unchanged_templates_are_shared():
+    template = {'a': [join(['a', {'Ref': 'x'}])], 'b': 'c'}
+    optimized, saved = optimize_joins(template)
+    assert optimized is template
+    assert 0 == saved
+
+
+def test_optimize_stack():
+    zones = Parameter('Zones', Type='CommaDelimitedList')
+    node = AWS.EC2.Instance('Node', ImageId='ami-1')
+    node.UserData = cfn_join(['#!/bin/bash\n', 'echo {0} {1}\n'.format(AWS.Region, node),
+                              'echo done\n'])
+    volume = AWS.EC2.Volume('Volume', AvailabilityZone=cfn_join(zones, ','),
+                            Size=10, Tags=[{'Key': 'Name', 'Value': cfn_join([node])}])
+    s = Stack(node, volume, zones)
+    template = s.to_json()
+    optimized, saved = optimize_joins(template)
+    assert len(to_json(template, True)) - len(to_json(optimized, True)) == saved > 0
+    assert optimized['Resources']['Volume'] is not template['Resources']['Volume']
+    assert {'Ref': 'Node'} == optimized['Resources']['Volume']['Properties']['Tags'][0]['Value']
+    user_data = optimized['Resources']['Node']['Properties']['UserData']['Fn::Base64']
+    assert ['#!/bin/bash\necho ', {'Ref': 'AWS::Region'}, ' ', {'Ref': 'Node'},
+            '\necho done\n'] == user_data['Fn::Join'][1]
+    assert (evaluate(template, {'Zones': 'a,b'}) ==
+            evaluate(optimized, {'Zones': 'a,b'}))
@@ -0,0 +1,112 @@
+# -*- encoding: utf-8 -*-
+import json
+
+import pytest
+
+from cfn.core import Stack
+from cfn.parameters import ParameterChecker, compile_parameter, load_parameter_file
+from cfn.util import Parameter
+from cfn.validation import ValidationError
+
+
+def stack():
+    return Stack(
+        Parameter('Environment', AllowedValues=['prod', 'staging']),
+        Parameter('Count', Type='Number', MinValue=1, MaxValue='10', Default='2'),
+        Parameter('Name', AllowedPattern='[a-z]+', MaxLength=8,
+                  ConstraintDescription='lower case letters'),
+        Parameter('Ports', Type='List<Number>', AllowedValues=[80, 443], Default='80'),
+        Parameter('Zones', Type='CommaDelimitedList', MinLength=3, Default='abc, def'),
+        Parameter('Key', Type='AWS::EC2::KeyPair::KeyName', NoEcho=True, MinLength=4),
+        Parameter('Password', NoEcho='true', MinLength=4, Default='pw'),
+    )
+
+
+def test_constraints():
+    check = Parameter('p', AllowedPattern='[a-z]+', MinLength=2).validator()
+    assert [] == check('abc')
+    assert ["'ab1' does not match '[a-z]+'"] == check('ab1')
+    assert ["'a' is shorter than 2 characters"] == check('a')
+    assert ['None is not a string'] == check(None)
+    check = compile_parameter({'Type': 'Number', 'AllowedValues': ['1', 2.5], 'MaxValue': 2})
+    assert [] == check(1) == check('1.0')
+    assert ["'2.5' is greater than 2"] == check('2.5')
+    assert ["'x' is not a number"] == check('x')
+    with pytest.raises(ValueError):
+        compile_parameter({'Type': 'Boolean'})
+    with pytest.raises(ValueError):
+        compile_parameter({'Type': 'Number', 'MinValue': 'low'})
+
+
+def test_bind():
+    s = stack()
+    values = s.bind({'Environment': 'prod', 'Name': 'web', 'Key': 'mykey',
+                     'Password': 'secret'})
+    assert {'Environment': 'prod', 'Count': '2', 'Name': 'web', 'Ports': '80',
+            'Zones': 'abc, def', 'Key': 'mykey', 'Password': 'secret'} == values
+
+    with pytest.raises(ValidationError) as error:
+        s.bind([{'ParameterKey': 'Environment', 'ParameterValue': 'test'},
+                {'ParameterKey': 'Count', 'ParameterValue': 11},
+                {'ParameterKey': 'Name', 'ParameterValue': 'Web'},
+                {'ParameterKey': 'Ports', 'ParameterValue': '80, 8080'},
+                {'ParameterKey': 'Key', 'ParameterValue': 'key'},
+                {'ParameterKey': 'Other', 'ParameterValue': 'x'}])
+    assert [
+        ('Parameters.Count', "'11' is greater than 10"),
+        ('Parameters.Environment', "'test' is not one of the allowed values"),
+        ('Parameters.Key', '**** is shorter than 4 characters'),
+        ('Parameters.Name', "'Web' does not match '[a-z]+': lower case letters"),
+        ('Parameters.Other', 'Unknown parameter'),
+        ('Parameters.Password', 'Default **** is shorter than 4 characters'),
+        ('Parameters.Ports', "'8080' is not one of the allowed values"),
+    ] == error.value.problems
+    assert str(error.value).startswith('Invalid parameter values:')
+
+
+def test_bind_all(tmpdir):
+    s = Stack(Parameter('Environment', AllowedValues=['prod', 'staging']))
+    assert [{'Environment': 'prod'}] * 1000 == s.bind_all([{'Environment': 'prod'}] * 1000)
+
+    path = tmpdir.join('staging.json')
+    path.write(json.dumps([{'ParameterKey': 'Environment', 'ParameterValue': 'staging'}]))
+    sets = {'staging': load_parameter_file(str(path)), 'test': {'Environment': 'test'},
+            'none': {}}
+    with pytest.raises(ValidationError) as error:
+        s.bind_all(sets)
+    assert [('none.Parameters.Environment', 'No value and no default'),
+            ('test.Parameters.Environment', "'test' is not one of the allowed values"),
+            ] == error.value.problems
+    del sets['test'], sets['none']
+    assert {'staging': {'Environment': 'staging'}} == s.bind_all(sets)
+    assert ParameterChecker({}).bind({}) == {}
+
+
+def test_validators_are_compiled_once_until_changed(monkeypatch):
+    import pickle
+    import cfn.parameters
+    compiled = []
+    compile_parameter = cfn.parameters.compile_parameter
+    monkeypatch.setattr(cfn.parameters, 'compile_parameter',
+                        lambda parameter: compiled.append(parameter) or compile_parameter(parameter))
+    s = stack()
+    values = {'Environment': 'prod', 'Name': 'web', 'Key': 'mykey', 'Password': 'secret'}
+    s.bind_all([values] * 3)
+    s.bind(values)
+    assert 7 == len(compiled)
+
+    environment = s.Parameters['Environment']
+    check = environment.validator()
+    assert check is environment.validator()
+    environment['AllowedValues'] = ['test']
+    assert check is not environment.validator()
+    assert 'test' == s.bind(dict(values, Environment='test'))['Environment']
+    for change in (lambda p: p.update(MinLength=5), lambda p: p.pop('MinLength'),
+                   lambda p: p.setdefault('MaxLength', 3), lambda p: p.__delitem__('MaxLength')):
+        check = environment.validator()
+        change(environment)
+        assert check is not environment.validator()
+
+    copied = pickle.loads(pickle.dumps(environment, 2))
+    assert 'Environment' == copied.name
+    assert [] == copied.validator()('test')
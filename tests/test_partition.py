@@ -0,0 +1,168 @@
+# -*- encoding: utf-8 -*-
+import json
+
+import pytest
+
+import AWS
+from cfn.core import Stack
+from cfn.graph import CycleError
+from cfn.partition import PartitionError, partition
+from cfn.util import Parameter
+from tests.test_core import Node
+
+
+def children_order(nested):
+    """Children in an order where every child comes after the ones it refers to"""
+    done = []
+    remaining = dict(nested.parent['Resources'])
+    while remaining:
+        for name, resource in sorted(remaining.items()):
+            text = json.dumps(resource)
+            if all(other in done or other == name or '"{0}"'.format(other) not in text
+                   for other in remaining):
+                done.append(name)
+                del remaining[name]
+                break
+        else:
+            raise AssertionError('children depend on each other')
+    return done
+
+
+def test_unconnected_resources_are_packed_whole():
+    nodes = []
+    for i in range(6):
+        a = Node('a%d' % i)
+        nodes.extend([a, Node('b%d' % i, prop1=a)])
+    nested = partition(Stack(*nodes), 'https://bucket/{name}.json', max_resources=4)
+
+    assert 0 == nested.crossing_references
+    assert ['NestedStack1', 'NestedStack2', 'NestedStack3'] == sorted(nested.children)
+    for i in range(6):
+        assert nested.assignment['a%d' % i] == nested.assignment['b%d' % i]
+    child = nested.parent['Resources']['NestedStack1']
+    assert {'Type': 'AWS::CloudFormation::Stack',
+            'Properties': {'TemplateURL': 'https://bucket/NestedStack1.json'}} == child
+
+
+def test_crossing_references_become_parameters_and_outputs():
+    p = Parameter('p', Type='Number')
+    nodes = [Node('n0', prop1=p)]
+    for i in range(1, 6):
+        nodes.append(Node('n%d' % i, prop1=[nodes[-1], nodes[-1].attr1]))
+    nodes.append(Node('last', DependsOn=['n0', 'n5']))
+    stack = Stack(p, *nodes)
+    stack.Outputs['out'] = {'Value': nodes[0].attr1}
+    nested = partition(stack, lambda name: 's3://' + name, max_resources=3)
+
+    assert 7 == len(nested.assignment)
+    assert all(len(c['Resources']) <= 3 for c in nested.children.values())
+    assert 0 < nested.crossing_references < 6
+    first = nested.assignment['n0']
+    assert {'Value': {'Fn::GetAtt': [first, 'Outputs.n0attr1']}} == nested.parent['Outputs']['out']
+    assert {'Value': {'Fn::GetAtt': ['n0', 'attr1']}} == nested.children[first]['Outputs']['n0attr1']
+    assert {'Type': 'Number'} == nested.children[first]['Parameters']['p']
+    assert {'Ref': 'p'} == nested.parent['Resources'][first]['Properties']['Parameters']['p']
+    assert {'p': {'Type': 'Number'}} == nested.parent['Parameters']
+
+    for name in nested.assignment:
+        child_name = nested.assignment[name]
+        child = nested.children[child_name]
+        template = child['Resources'][name]
+        if name.startswith('n') and name != 'n0':
+            previous = 'n%d' % (int(name[1:]) - 1)
+            if nested.assignment[previous] == child_name:
+                assert [{'Ref': previous}, {'Fn::GetAtt': [previous, 'attr1']}] == \
+                    template['Properties']['prop1']
+            else:
+                parameter = previous + 'attr1'
+                assert [{'Ref': previous}, {'Ref': parameter}] == template['Properties']['prop1']
+                assert {'Type': 'String'} == child['Parameters'][previous]
+                assert {'Fn::GetAtt': [nested.assignment[previous], 'Outputs.' + parameter]} == \
+                    nested.parent['Resources'][child_name]['Properties']['Parameters'][parameter]
+        depends_on = template.get('DependsOn', [])
+        assert all(nested.assignment[d] == child_name for d in depends_on)
+    for other in set(nested.assignment[n] for n in ('n0', 'n5')) - set([nested.assignment['last']]):
+        assert other in nested.parent['Resources'][nested.assignment['last']]['DependsOn']
+    children_order(nested)
+
+
+def test_large_connected_stack():
+    resources = []
+    for i in range(2000):
+        instance = AWS.EC2.Instance('Node{0}'.format(i), ImageId='ami-12345678')
+        volume = AWS.EC2.Volume('Volume{0}'.format(i), Size=80)
+        attachment = AWS.EC2.VolumeAttachment('Attachment{0}'.format(i),
+                                              InstanceId=instance, VolumeId=volume)
+        record = AWS.Route53.RecordSet('Record{0}'.format(i), ResourceRecords=[instance.PrivateIp])
+        resources.extend((instance, volume, attachment, record))
+    # a shared resource connects everything
+    profile = AWS.IAM.InstanceProfile('Profile', Path='/')
+    for instance in resources[::4]:
+        instance.IamInstanceProfile = profile
+    nested = partition(Stack(profile, *resources), '{name}', max_resources=500)
+
+    assert 17 == len(nested.children)
+    assert all(len(c['Resources']) <= 500 for c in nested.children.values())
+    # the nodes stay in one piece, only references to the profile cross
+    assert nested.crossing_references < 2000 + 50
+    children_order(nested)
+
+
+def test_cycles_cannot_be_partitioned():
+    a = Node('a')
+    b = Node('b', prop1=a)
+    a.prop1 = b
+    with pytest.raises(CycleError):
+        partition(Stack(a, b), '{name}')
+
+
+def test_write(tmpdir):
+    nested = partition(Stack(Node('a'), Node('b')), '{name}', max_resources=1)
+    nested.write(str(tmpdir))
+    assert ['NestedStack1.json', 'NestedStack2.json', 'parent.json'] == sorted(
+        f.basename for f in tmpdir.listdir())
+    assert nested.parent == json.loads(tmpdir.join('parent.json').read())
+
+
+def test_children_get_the_conditions_and_mappings_they_use():
+    env = Parameter('Env', Type='String')
+    size = Parameter('Size', Type='Number')
+    a = Node('a', prop1={'Fn::FindInMap': ['Sizes', {'Ref': 'AWS::Region'}, 'Small']})
+    b = Node('b', Condition='IsBig', prop1=a)
+    c = Node('c', prop1={'Fn::If': ['IsProd', 'x', 'y']})
+    stack = Stack(env, size, a, b, c)
+    stack.Mappings = {'Sizes': {'us-east-1': {'Small': 1}}, 'Unused': {'k': {'v': 1}}}
+    stack.Conditions = {
+        'IsProd': {'Fn::Equals': [{'Ref': 'Env'}, 'prod']},
+        'IsBig': {'Fn::And': [{'Condition': 'IsProd'},
+                              {'Fn::Equals': [{'Ref': 'Size'}, '100']}]},
+        'Unused': {'Fn::Equals': ['a', 'b']},
+    }
+    nested = partition(stack, '{name}', max_resources=1)
+
+    children = dict((resource_name, nested.children[child])
+                    for resource_name, child in nested.assignment.items())
+    assert {'Sizes': {'us-east-1': {'Small': 1}}} == children['a']['Mappings']
+    assert 'Conditions' not in children['a']
+    assert ['IsBig', 'IsProd'] == sorted(children['b']['Conditions'])
+    assert ['Env', 'Size', 'a'] == sorted(children['b']['Parameters'])
+    assert ['IsProd'] == sorted(children['c']['Conditions'])
+    assert ['Env'] == sorted(children['c']['Parameters'])
+    assert 'Mappings' not in children['b']
+    assert stack.Conditions == nested.parent['Conditions']
+    assert stack.Mappings == nested.parent['Mappings']
+
+
+def test_too_many_crossing_references():
+    nodes = [Node('n%d' % i) for i in range(9)]
+    hub = Node('hub', prop1=[n.attr1 for n in nodes])
+    with pytest.raises(PartitionError) as error:
+        partition(Stack(hub, *nodes), '{name}', max_resources=3, max_parameters=4)
+    # two of the nine nodes are in the child of hub
+    assert 'would have 7 Parameters, at most 4 are allowed (hub: 7)' in str(error.value)
+
+    nested = partition(Stack(hub, *nodes), '{name}', max_resources=3, max_parameters=7)
+    assert 7 == len(nested.children[nested.assignment['hub']]['Parameters'])
+    with pytest.raises(PartitionError) as error:
+        partition(Stack(hub, *nodes), '{name}', max_resources=3, max_outputs=2)
+    assert 'would have 3 Outputs, at most 2 are allowed' in str(error.value)
@@ -0,0 +1,139 @@
+# -*- encoding: utf-8 -*-
+import sys
+import threading
+
+import pytest
+
+import AWS
+from cfn.core import Stack, to_json
+from cfn.pipeline import (validate_stacks, make_server, HTTPBackend, LocalBackend,
+                          TransientError)
+
+
+def valid():
+    volume = AWS.EC2.Volume('Volume', Size=10)
+    return Stack(volume, AWS.EC2.VolumeAttachment('Attachment', VolumeId=volume))
+
+
+def invalid():
+    return Stack(AWS.EC2.VolumeAttachment('Attachment', VolumeId='{Resource|Gone}'))
+
+
+def broken():
+    raise RuntimeError('no stack today')
+
+
+@pytest.yield_fixture
+def server():
+    server = make_server()
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def url(server):
+    return 'http://127.0.0.1:{0}/validate'.format(server.server_address[1])
+
+
+class Flaky(object):
+    """Fails the first time it sees a template"""
+
+    def __init__(self):
+        self.seen = set()
+        self.lock = threading.Lock()
+
+    def validate(self, template):
+        with self.lock:
+            first = template not in self.seen
+            self.seen.add(template)
+        if first:
+            raise TransientError('busy')
+        return LocalBackend().validate(template)
+
+
+def test_validate_locally():
+    results = dict((r.name, r) for r in validate_stacks(
+        [valid, invalid, broken, ('named', valid())], concurrency=2))
+    assert set(['valid', 'invalid', 'broken', 'named']) == set(results)
+    assert [] == results['valid'].problems == results['named'].problems
+    assert 1 == results['valid'].attempts
+    problem, = results['invalid'].problems
+    assert problem.startswith('Resources.Attachment.Properties.VolumeId: Ref to unknown')
+    assert 'Gone' in problem
+    assert 'no stack today' in results['broken'].error
+    assert 0 == results['broken'].attempts
+
+
+def test_bad_items_fail_alone():
+    results = dict((r.name, r) for r in validate_stacks(
+        [valid, 42, ('a', 'b', 'c'), ('named', valid())], concurrency=2))
+    assert set(['valid', '42', "('a', 'b', 'c')", 'named']) == set(results)
+    assert [] == results['valid'].problems == results['named'].problems
+    assert 'AttributeError' in results['42'].error
+    assert 'ValueError' in results["('a', 'b', 'c')"].error
+
+
+def test_http_backend_retries_and_reuses_connections(server):
+    server.backend = Flaky()
+    connections = []
+    get_request = server.get_request
+    server.get_request = lambda: connections.append(1) or get_request()
+
+    stacks = [('stack{0}'.format(i), Stack(AWS.EC2.Volume('Volume{0}'.format(i))))
+              for i in range(6)]
+    results = list(validate_stacks(stacks, HTTPBackend(url(server)), concurrency=2,
+                                   backoff=0))
+    assert 6 == len(results)
+    assert all(r.problems == [] and r.attempts == 2 for r in results)
+    assert len(connections) <= 2
+
+    server.backend = Flaky()
+    result, = validate_stacks(stacks[:1], HTTPBackend(url(server)), retries=0)
+    assert 1 == result.attempts
+    assert 'TransientError: 503' in result.error
+
+
+def test_http_backend_does_not_retry_bad_requests(server):
+    backend = HTTPBackend(url(server))
+    with pytest.raises(ValueError):
+        backend.validate('not json')
+    assert [] == backend.validate(to_json(valid()))
+    with pytest.raises(ValueError):
+        HTTPBackend('ftp://example.com/')
+
+
+
+def test_local_backend_knows_attributes_named_like_properties():
+    template = to_json(Stack(
+        AWS.EC2.Instance('Node'),
+        AWS.EC2.Volume('Volume', AvailabilityZone='{Attribute|Node|AvailabilityZone}')))
+    assert [] == LocalBackend().validate(template)
+
+
+def test_local_backend_in_many_threads(monkeypatch):
+    import cfn.core
+    # a small cache, so the threads evict each other's strings all the time
+    monkeypatch.setattr(cfn.core, '_TOKEN_CACHE_SIZE', 16)
+
+    def stack(i):
+        volume = AWS.EC2.Volume('Volume', Size=10)
+        # braces which are no references stay in the template, so the
+        # workers tokenize them again while checking
+        return Stack(volume, *[AWS.EC2.VolumeAttachment(
+            'Attachment{0}'.format(j), VolumeId=volume,
+            Device='/dev/{0}/${{DEVICE{1}_{2}}}'.format(volume, i, j)) for j in range(10)])
+
+    stacks = [('stack{0}'.format(i), stack(i)) for i in range(300)]
+    # switch threads as often as possible
+    interval = sys.getcheckinterval()
+    sys.setcheckinterval(1)
+    try:
+        results = list(validate_stacks(stacks, concurrency=8))
+    finally:
+        sys.setcheckinterval(interval)
+    assert 300 == len(results)
+    assert all(r.error is None and r.problems == [] for r in results)
+    assert len(cfn.core._token_cache) <= 16
@@ -0,0 +1,79 @@
+# -*- encoding: utf-8 -*-
+import json
+from StringIO import StringIO
+
+import pytest
+
+import AWS
+import cfn.core
+import cfn.size
+from cfn.core import Stack, Resource, to_json
+from cfn.profiling import Profiler
+from cfn.util import Facts
+
+
+def stack():
+    instance = AWS.EC2.Instance('Node', ImageId='ami-1',
+                                UserData='echo {0}'.format(AWS.Region))
+    instance.Metadata = {'facts': Facts(a=1)}
+    volume = AWS.EC2.Volume('Volume', Size=80)
+    return Stack(instance, volume, AWS.EC2.Volume('Other', Size=20))
+
+
+def test_profile_rendering():
+    s = stack()
+    expected = to_json(s)
+    with Profiler() as profiler:
+        assert expected == to_json(s)
+
+    assert set(['AWS::EC2::Instance', 'AWS::EC2::Volume']) == set(profiler.types)
+    assert set(['Node', 'Volume', 'Other']) == set(profiler.resources)
+    calls, seconds, objects, size = profiler.types['AWS::EC2::Volume']
+    assert 2 == calls
+    assert 0 <= seconds <= profiler.seconds
+    assert len(to_json(s.resources['Volume'].to_json())) < size < len(expected)
+
+    frames = profiler.frames
+    assert ('render', 'AWS::EC2::Instance', 'Node', 'UserData') in frames
+    assert ('render', 'AWS::EC2::Instance', 'Node', 'UserData',
+            'resolve_references_in_string') in frames
+    assert ('render', 'AWS::EC2::Instance', 'Node', 'Facts') in frames
+    assert len('80') == frames[('render', 'AWS::EC2::Volume', 'Volume', 'Size')][3]
+    # the frames add up to the totals of the resources
+    node_bytes = sum(stats[3] for path, stats in frames.items() if path[2:3] == ('Node',))
+    assert profiler.resources['Node'][3] == node_bytes
+
+    lines = profiler.collapsed('bytes')
+    assert 'render;AWS::EC2::Volume;Volume;Size 2' in lines
+    assert all(line.startswith('render') for line in profiler.collapsed())
+
+    summary = json.loads(json.dumps(profiler.summary()))
+    assert 2 == summary['types']['AWS::EC2::Volume']['calls']
+    assert summary['frames'][0]['stack'][0] == 'render'
+    output = StringIO()
+    profiler.write_summary(output)
+    assert summary == json.loads(output.getvalue())
+    assert 'AWS::EC2::Volume' in profiler.format_report()
+    assert 'Node' in profiler.format_report(by='resources')
+
+
+def test_to_json_methods_are_profiled():
+    s = stack()
+    with Profiler() as profiler:
+        s.resources['Volume'].to_json()
+        cfn.size.measure(s)
+    assert 2 == profiler.resources['Volume'][0]
+    assert ('render', 'AWS::EC2::Volume', 'Volume', 'Size') in profiler.frames
+
+
+def test_profiler_restores_everything():
+    iter_json = cfn.core._iter_json
+    to_json_method = Resource.__dict__['to_json']
+    with Profiler():
+        assert iter_json is not cfn.core._iter_json
+        assert cfn.size._iter_json is cfn.core._iter_json
+        with pytest.raises(RuntimeError):
+            Profiler().start()
+    assert iter_json is cfn.core._iter_json is cfn.size._iter_json
+    assert to_json_method is Resource.__dict__['to_json']
+    assert to_json(stack()) == to_json(stack())
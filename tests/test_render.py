@@ -0,0 +1,129 @@
+# -*- encoding: utf-8 -*-
+import json
+
+import pytest
+
+from cfn.core import Stack, to_json
+from cfn.render import render_stacks, factory_name, main
+
+from tests.test_core import ResourceWithProperties
+
+
+def small_stack():
+    return Stack(ResourceWithProperties('r', prop1='value'))
+
+
+def broken_stack():
+    raise ValueError('broken')
+
+
+TEMPLATE_MODULE = '''
+from cfn.core import Stack
+from tests.test_core import ResourceWithProperties
+stack = Stack(ResourceWithProperties('r', prop1='value'))
+other = lambda: Stack(Description='other')
+'''
+
+
+def test_factory_names():
+    assert 'small_stack' == factory_name(small_stack)
+    assert 'template' == factory_name('stacks/template.py')
+    assert 'template-other' == factory_name('stacks/template.py:other')
+    assert 'tests.test_render-small_stack' == factory_name('tests.test_render:small_stack')
+
+
+def test_render_stacks(tmpdir):
+    module = tmpdir.join('template.py')
+    module.write(TEMPLATE_MODULE)
+    factories = [small_stack, broken_stack, str(module), str(module) + ':other',
+                 'tests.test_render:small_stack']
+    results = dict((r.factory, r) for r in render_stacks(factories, str(tmpdir), processes=2))
+
+    assert 5 == len(results)
+    assert 'ValueError: broken' in results['broken_stack'].error
+    assert results['broken_stack'].path is None
+    expected = to_json(small_stack())
+    for name in ('small_stack', 'template', 'tests.test_render-small_stack'):
+        assert results[name].error is None
+        assert results[name].seconds >= 0
+        assert expected == tmpdir.join(name + '.json').read()
+    assert to_json(Stack(Description='other')) == tmpdir.join('template-other.json').read()
+
+
+def test_render_in_process(tmpdir):
+    results = list(render_stacks([small_stack], str(tmpdir), processes=1))
+    assert [str(tmpdir.join('small_stack.json'))] == [r.path for r in results]
+
+
+def test_main(tmpdir, capsys):
+    assert 1 == main(['-o', str(tmpdir), '-j', '1',
+                      'tests.test_render:small_stack', 'tests.test_render:broken_stack'])
+    out, err = capsys.readouterr()
+    assert 'tests.test_render-small_stack ->' in out
+    assert 'FAILED tests.test_render-broken_stack' in err
+
+
+def test_compact_and_budget(tmpdir):
+    results = list(render_stacks([small_stack], str(tmpdir), processes=1, compact=True))
+    assert to_json(small_stack(), compact=True) == tmpdir.join('small_stack.json').read()
+
+    results = list(render_stacks([small_stack], str(tmpdir.mkdir('budget')),
+                                 processes=1, budget=10))
+    assert 'TemplateTooLargeError' in results[0].error
+    assert not tmpdir.join('budget', 'small_stack.json').check()
+
+
+def test_fragment_cache(tmpdir):
+    cache = tmpdir.join('cache')
+    for _ in range(2):
+        results = list(render_stacks([small_stack], str(tmpdir), processes=1,
+                                     fragment_cache=str(cache)))
+        assert [None] == [r.error for r in results]
+        assert to_json(small_stack()) == tmpdir.join('small_stack.json').read()
+    assert 1 == len(cache.listdir())
+
+
+def test_profile(tmpdir):
+    results = list(render_stacks([small_stack], str(tmpdir), processes=1, profile=True))
+    assert [None] == [r.error for r in results]
+    assert to_json(small_stack()) == tmpdir.join('small_stack.json').read()
+    assert tmpdir.join('small_stack.folded').read().startswith('render')
+    assert 'types' in json.loads(tmpdir.join('small_stack.profile.json').read())
+
+
+class HalfRendered(object):
+    def to_json(self):
+        raise ValueError('halfway')
+
+
+def half_rendered_stack():
+    return Stack(ResourceWithProperties('r', prop1=HalfRendered()))
+
+
+def test_failing_stacks_leave_no_file(tmpdir):
+    results = list(render_stacks([half_rendered_stack], str(tmpdir), processes=1))
+    assert 'ValueError: halfway' in results[0].error
+    assert [] == tmpdir.listdir()
+
+
+def test_unpicklable_factories_fail_alone(tmpdir):
+    results = dict((r.factory, r) for r in render_stacks(
+        [lambda: small_stack(), small_stack], str(tmpdir), processes=2))
+    assert 'PicklingError' in results['<lambda>'].error
+    assert results['small_stack'].error is None
+    assert ['small_stack.json'] == [f.basename for f in tmpdir.listdir()]
+
+
+def test_factories_with_the_same_name_are_rejected(tmpdir, capsys):
+    first = tmpdir.mkdir('a').join('template.py')
+    second = tmpdir.mkdir('b').join('template.py')
+    for module in (first, second):
+        module.write(TEMPLATE_MODULE)
+    with pytest.raises(ValueError) as error:
+        list(render_stacks([str(first), small_stack, str(second)], str(tmpdir), processes=1))
+    assert 'template ({0}, {1})'.format(first, second) in str(error.value)
+    assert not tmpdir.join('small_stack.json').check()
+
+    with pytest.raises(SystemExit):
+        main(['-o', str(tmpdir), str(first), str(second)])
+    assert 'Factories with the same name' in capsys.readouterr()[1]
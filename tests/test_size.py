@@ -0,0 +1,58 @@
+# -*- encoding: utf-8 -*-
+import json
+
+import pytest
+
+from cfn.core import Stack, ResourceCollection, to_json, resolve_references
+from cfn.size import measure, render, TemplateTooLargeError
+from cfn.util import Parameter
+
+from tests.test_core import ResourceWithProperties, ResourceWithAttributes
+
+
+def _stack():
+    small = ResourceWithAttributes('small')
+    big = ResourceWithProperties('big', prop1=['x' * 100, small.attr1])
+    s = Stack(small, big, Parameter('p'), Description='sizes')
+    s.Outputs['out'] = '{0}-{1}'.format(small.attr1, big)
+    return s
+
+
+def test_compact_output():
+    s = _stack()
+    expected = json.dumps(resolve_references(s), separators=(',', ':'), sort_keys=True)
+    assert expected == to_json(s, compact=True)
+    assert len(to_json(s, compact=True)) < len(to_json(s))
+
+
+def test_measure():
+    s = _stack()
+    for compact in (True, False):
+        size = measure(s, compact)
+        assert to_json(s, compact) == size.text
+        assert ['AWSTemplateFormatVersion', 'Description', 'Outputs', 'Parameters', 'Resources'] == \
+            sorted(size.sections)
+        assert ['big', 'small'] == [name for name, _ in size.largest_resources()]
+    size = measure(s)
+    assert len('"small":{"Type":"ResourceWithAttributes"}') == size.resources['small']
+    assert 'Resources' == size.largest_sections(1)[0][0]
+
+
+def test_measure_empty_collection():
+    assert '{}' == measure(ResourceCollection()).text
+
+
+def test_render_within_budget():
+    s = _stack()
+    assert to_json(s, compact=True) == render(s)
+    assert to_json(s) == render(s, budget=None, compact=False)
+
+
+def test_render_over_budget():
+    s = _stack()
+    with pytest.raises(TemplateTooLargeError) as error:
+        render(s, budget=100)
+    message = str(error.value)
+    assert 'more than the budget of 100 bytes' in message
+    assert message.index('big:') < message.index('small:')
+    assert error.value.size.total > 100
@@ -63,3 +63,80 @@ def test_outputs():
     })
 
 
+
+def test_mappings_conditions_and_metadata():
+    r = ResourceWithAttributes()
+    s = Stack(r)
+    s.Mappings['Regions'] = {'eu-west-1': {'Ami': 'ami-1'}}
+    s.Conditions['Production'] = {'Fn::Equals': ['{0}'.format(r), 'production']}
+    s.Metadata['Note'] = 'generated'
+    assert_json(s, {
+        'AWSTemplateFormatVersion': '2010-09-09',
+        'Resources': {
+            'ResourceWithAttributes': {
+                'Type': 'ResourceWithAttributes'
+                }
+        },
+        'Mappings': {'Regions': {'eu-west-1': {'Ami': 'ami-1'}}},
+        'Conditions': {'Production': {'Fn::Equals': [{'Ref': 'ResourceWithAttributes'}, 'production']}},
+        'Metadata': {'Note': 'generated'},
+    })
+
+
+def _count_serialized_resources(monkeypatch):
+    import cfn.core
+    serialized = []
+    unresolved_json = cfn.core._unresolved_json
+
+    def counting_unresolved_json(o):
+        if isinstance(o, Resource):
+            serialized.append(o.name)
+        return unresolved_json(o)
+    monkeypatch.setattr(cfn.core, '_unresolved_json', counting_unresolved_json)
+    return serialized
+
+
+def test_cached_resources_json(monkeypatch):
+    from cfn.core import to_json
+    serialized = _count_serialized_resources(monkeypatch)
+    r1 = ResourceWithAttributes('r1')
+    r2 = ResourceWithProperties('r2', prop1=r1.attr1)
+    r3 = ResourceWithProperties('r3', prop1='{0}'.format(r1))
+    s = Stack(r1, r2, r3)
+    s.cache_resources_json = True
+
+    first = to_json(s)
+    assert ['r1', 'r2', 'r3'] == sorted(serialized)
+    del serialized[:]
+
+    assert first == to_json(s)
+    assert [] == serialized
+
+    r3.prop1 = 'changed'
+    changed = to_json(s)
+    assert ['r3'] == serialized
+    s.cache_resources_json = False
+    assert to_json(s) == changed
+
+
+def test_cached_resources_json_notices_renamed_references(monkeypatch):
+    from cfn.core import to_json
+    serialized = _count_serialized_resources(monkeypatch)
+    r1 = ResourceWithProperties('r1')
+    r2 = ResourceWithProperties('r2', prop1=[r1])
+    s = Stack(r1, r2)
+    s.cache_resources_json = True
+    to_json(s)
+    del serialized[:]
+
+    r1.name = 'renamed'
+    assert '"Ref": "renamed"' in to_json(s)
+    assert ['r2'] == serialized
+
+    del serialized[:]
+    r2.prop1.value.append(r1)
+    to_json(s)
+    assert [] == serialized
+    r2.invalidate()
+    to_json(s)
+    assert ['r2'] == serialized
@@ -0,0 +1,43 @@
+# -*- encoding: utf-8 -*-
+import cfn.core
+from cfn import tracing
+from cfn.core import ResourceCollection, Resource, to_json
+
+from tests.test_core import ResourceWithProperties
+
+
+def test_tracing_is_off_by_default():
+    assert not tracing.is_enabled()
+    assert not hasattr(cfn.core.resolve_references, '__wrapped__')
+    assert not hasattr(Resource.__dict__['to_json'], '__wrapped__')
+
+
+def test_tracing_counts_calls():
+    r = ResourceWithProperties('r', prop1='value')
+    expected = to_json(ResourceCollection(r))
+    tracing.reset()
+    tracing.enable()
+    try:
+        assert tracing.is_enabled()
+        assert expected == to_json(ResourceCollection(r))
+        r.prop1 = 'other value'
+        r.to_json()
+        report = tracing.report()
+    finally:
+        tracing.disable()
+
+    calls, seconds = report['cfn.core.Resource.__setattr__']
+    assert 1 == calls
+    assert seconds >= 0
+    assert 'cfn.core.Resource.to_json' in report
+    assert 'cfn.core.resolve_references' in report
+    assert 'cfn.core.Resource.to_json' in tracing.format_report()
+
+    assert not hasattr(cfn.core.resolve_references, '__wrapped__')
+    assert not hasattr(Resource.__dict__['__setattr__'], '__wrapped__')
+
+
+def test_counts_stop_when_disabled():
+    tracing.reset()
+    ResourceWithProperties('r').prop1 = 1
+    assert {} == tracing.report()
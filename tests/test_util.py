@@ -1,6 +1,6 @@
 import pytest
 
-from cfn.core import Resource, Property, to_json, ResourceCollection
+from cfn.core import Resource, Property, to_json, ResourceCollection, resolve_references_in_string
 from cfn.util import Facts
 from cfn.core import Stack
 from cfn.util import Parameter
@@ -123,3 +123,98 @@ def test_parameters_referencing_in_strings():
             }
         },
     })
+
+
+def test_references_are_canonical_and_immutable():
+    import copy
+    import json
+    import pickle
+    from cfn.util import Ref, GetAtt
+    r = ResourceWithAttributes('r')
+    assert r.ref() is Ref('r') is resolve_references_in_string('{Resource|r}')
+    assert r.attr1.ref() is GetAtt('r', 'attr1')
+    assert {'Fn::GetAtt': ['r', 'attr1']} == r.attr1.ref()
+    for reference in (Ref('r'), GetAtt('r', 'attr1')):
+        assert reference is copy.deepcopy(reference) is pickle.loads(pickle.dumps(reference, 2))
+        with pytest.raises(TypeError):
+            reference['Ref'] = 'other'
+        for compact, kwargs in ((False, {'indent': 2}), (True, {'separators': (',', ':')})):
+            template = {'a': [reference, {'b': reference}]}
+            assert json.dumps(template, sort_keys=True, **kwargs) == to_json(template, compact)
+    with pytest.raises(TypeError):
+        GetAtt('r', 'attr1')['Fn::GetAtt'].append('x')
+
+
+def test_facts_are_rendered_once_until_changed():
+    r = ResourceWithAttributes('r')
+    facts = Facts(b='value', a='{0}-x'.format(r.attr1))
+    text = facts.to_json()
+    assert '---\na: {Attribute|r|attr1}-x\nb: value\n' == text
+    assert resolve_references_in_string(text) == facts._template()
+    assert facts._render() is facts._render()
+    assert_serialized(facts)
+
+    line = facts._lines['b']
+    facts['c'] = 1
+    assert line is facts._lines['b']
+    assert text + 'c: 1\n' == facts.to_json()
+    del facts['a']
+    facts.pop('c')
+    assert '---\nb: value\n' == facts.to_json() == facts._template()
+    assert_serialized(facts)
+
+
+def test_nested_facts():
+    inner = Facts(y='{0}'.format(Parameter('p')), x=1)
+    facts = Facts(a='1', nested=inner, empty=Facts())
+    assert ('---\na: 1\nempty: {}\nnested:\n  x: 1\n  y: {Parameter|p}\n' ==
+            facts.to_json())
+    assert {'Fn::Join': ['', ['---\na: 1\nempty: {}\nnested:\n  x: 1\n  y: ',
+                              {'Ref': 'p'}, '\n']]} == facts._template()
+
+    inner['z'] = [1]
+    assert facts.to_json().endswith('  y: {Parameter|p}\n  z: [1]\n')
+    inner['z'].append(2)
+    assert facts.to_json().endswith('  z: [1, 2]\n')
+    assert_serialized(facts)
+    inner['z'].append(3)
+    assert_serialized(facts)
+
+
+def assert_serialized(facts):
+    import json
+    for compact, kwargs in ((False, {'indent': 2}), (True, {'separators': (',', ':')})):
+        # a copy renders without the caches of facts
+        assert json.dumps(Facts(facts)._template(), **kwargs) == \
+            to_json(facts, compact) == to_json(facts, compact)
+
+
+def test_copied_facts_render_their_own_values():
+    import copy
+    facts = Facts(a=1)
+    facts.to_json()
+    other = copy.copy(facts)
+    other['a'] = 2
+    assert '---\na: 1\n' == facts.to_json()
+    assert '---\na: 2\n' == other.to_json()
+
+
+class Labelled(Facts):
+    def __init__(self, label, *args, **kwargs):
+        Facts.__init__(self, *args, **kwargs)
+        self.label = label
+
+
+def test_copied_facts_keep_their_attributes():
+    import copy
+    import pickle
+    facts = Labelled('web', a=1)
+    to_json(facts)
+    for other in (copy.copy(facts), copy.deepcopy(facts),
+                  pickle.loads(pickle.dumps(facts, 2))):
+        assert 'web' == other.label
+        assert '---\na: 1\n' == other.to_json()
+        assert '_rendered' not in other.__dict__ or other._rendered is not facts._rendered
+        other['a'] = 2
+        assert '---\na: 2\n' == other.to_json()
+    assert '---\na: 1\n' == facts.to_json()
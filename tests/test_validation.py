@@ -0,0 +1,99 @@
+# -*- encoding: utf-8 -*-
+import pytest
+
+import AWS
+from cfn.core import Stack
+from cfn.util import Parameter
+from cfn.validation import ValidationError, find_problems
+from tests.test_core import Node
+
+
+def test_valid_stack():
+    a = Node('a')
+    p = Parameter('p')
+    b = Node('b', prop1=[a, a.attr1, p, AWS.Region, '{0}-{1}'.format(a.attr1, p)],
+             DependsOn='a')
+    s = Stack(a, b, p)
+    s.Outputs['out'] = b.attr1
+    s.validate()
+
+
+def test_all_problems_are_reported_with_paths():
+    a = AWS.EC2.Volume('a')
+    b = Node('b', DependsOn=['a', 'gone'])
+    b.prop1 = {'list': ['{Resource|missing}', 'x{Attribute|a|nope}'],
+               'literal': {'Fn::GetAtt': ['ghost', 'attr1']}}
+    s = Stack(a, b)
+    s.Outputs['out'] = '{Parameter|unknown}'
+    with pytest.raises(ValidationError) as error:
+        s.validate()
+    assert [
+        ('Resources.b.DependsOn', "DependsOn unknown resource 'gone'"),
+        ('Outputs.out', "Ref to unknown resource or parameter 'unknown'"),
+    ] == [p for p in error.value.problems if not p[0].startswith('Resources.b.Properties')]
+    assert sorted([
+        ('Resources.b.Properties.prop1.list[0]', "Ref to unknown resource or parameter 'missing'"),
+        ('Resources.b.Properties.prop1.list[1].Fn::Join[1][1]',
+         "Fn::GetAtt of unknown attribute 'nope' of resource 'a' (AWS::EC2::Volume)"),
+        ('Resources.b.Properties.prop1.literal', "Fn::GetAtt of unknown resource 'ghost'"),
+    ]) == sorted(p for p in error.value.problems if p[0].startswith('Resources.b.Properties'))
+    assert 'Resources.b.DependsOn' in str(error.value)
+
+
+def test_renamed_resource():
+    a = Node('a')
+    b = Node('b', prop1=a)
+    s = Stack(a, b)
+    a.name = 'renamed'
+    assert [('Resources.b.Properties.prop1', "Ref to unknown resource or parameter 'renamed'")] == \
+        find_problems(s)
+
+
+def test_unnamed_reference():
+    b = Node('b', prop1=Node())
+    problems = find_problems(Stack(b))
+    assert 1 == len(problems)
+    assert 'Resources.b' == problems[0][0]
+
+
+def test_attributes_named_like_properties():
+    node = AWS.EC2.Instance('Node', AvailabilityZone='eu-west-1a')
+    volume = AWS.EC2.Volume('Volume', AvailabilityZone='{Attribute|Node|AvailabilityZone}')
+    other = AWS.EC2.Volume('Other', AvailabilityZone='{Attribute|Volume|AvailabilityZone}')
+    problem, = find_problems(Stack(node, volume, other))
+    assert "unknown attribute 'AvailabilityZone' of resource 'Volume'" in problem[1]
+
+
+def test_attributes_of_types_outside_the_catalog_are_not_checked():
+    from cfn.loader import from_template
+    stack = from_template({'Resources': {
+        'Custom': {'Type': 'Custom::Thing'},
+        'Child': {'Type': 'AWS::CloudFormation::Stack',
+                  'Properties': {'TemplateURL': 'https://bucket/child.json'}},
+        'Topic': {'Type': 'AWS::SNS::Topic'},
+        'Volume': {'Type': 'AWS::EC2::Volume', 'Properties': {'Size': 10}},
+        'User': {'Type': 'Custom::User', 'Properties': {'Values': [
+            {'Fn::GetAtt': ['Custom', 'Arn']},
+            {'Fn::GetAtt': ['Child', 'Outputs.Foo']},
+            {'Fn::GetAtt': ['Topic', 'TopicName']},
+            {'Fn::GetAtt': ['Child', 'Arn']},
+            {'Fn::GetAtt': ['Volume', 'Arn']},
+        ]}},
+    }})
+    assert [
+        ('Resources.User.Properties.Values[4]',
+         "Fn::GetAtt of unknown attribute 'Arn' of resource 'Volume' (AWS::EC2::Volume)"),
+    ] == find_problems(stack)
+
+
+def test_partitioned_stacks_are_valid():
+    import json
+    from cfn.loader import loads
+    from cfn.partition import partition
+    nodes = [AWS.EC2.Volume('Volume0', Size=10)]
+    for i in range(1, 4):
+        nodes.append(AWS.EC2.VolumeAttachment('Attachment{0}'.format(i), VolumeId=nodes[0],
+                                              InstanceId=nodes[0].AvailabilityZone))
+    nested = partition(Stack(*nodes), '{name}', max_resources=1)
+    for template in [nested.parent] + nested.children.values():
+        assert [] == find_problems(loads(json.dumps(template)))